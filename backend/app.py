@@ -1,17 +1,31 @@
-from flask import Flask, request, jsonify
+import time
+_IMPORT_START = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import pandas as pd
-import joblib
 import os
+import threading
 from datetime import datetime
 import logging
+import numpy as np
+# Serving-only imports: training, plotting and data generation load on demand in the routes that use them
 from ml.predictor import EnsemblePredictor
-from ml.data_generator import StudentDataGenerator
-from ml.model_trainer import ModelTrainer
+from ml.retraining import RetrainManager
+from ml.model_store import ModelStore
+from ml.micro_batcher import MicroBatcher
+from ml import bulk_scoring
+from ml.counterfactuals import MAX_CHANGES
+from ml.request_logging import configure_logging
+from ml.serialization import dumps
+from ml.metrics import CONTENT_TYPE, metrics
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging: records go through a background queue thread; per-request records are sampled
+configure_logging(
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+    request_sample_rate=float(os.environ.get('REQUEST_LOG_SAMPLE_RATE', 0.1))
+)
 logger = logging.getLogger(__name__)
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -19,27 +33,105 @@ CORS(app)  # Enable CORS for all routes
 # Global predictor instance
 predictor = None
 
-def initialize_app():
+MODELS_ROOT = 'models/'
+# CSV or Parquet (by extension); used for first-run training and /api/retrain
+DATA_PATH = os.environ.get('DATA_PATH', 'data/student_dataset.csv')
+model_store = ModelStore(MODELS_ROOT)
+# How often each process checks whether CURRENT was repointed by a retrain elsewhere; 0 disables
+MODEL_REFRESH_SECONDS = float(os.environ.get('MODEL_REFRESH_SECONDS', 30))
+_refresh_lock = threading.Lock()
+_last_refresh_check = time.monotonic()
+# Version whose load failed; not retried until CURRENT points somewhere else
+_failed_version = None
+
+def _parse_weights(spec):
+    """Parse 'lightgbm=1,xgboost=2' into per-model classifier weights"""
+    weights = {}
+    for item in filter(None, spec.split(',')):
+        name, _, weight = item.partition('=')
+        weights[name.strip()] = float(weight)
+    return weights
+
+# Options shared by every EnsemblePredictor the app creates
+PREDICTOR_OPTIONS = {
+    # 'native' runs the library models, 'compiled' serves small batches from the exported tree arrays
+    'inference_mode': os.environ.get('INFERENCE_MODE', 'native'),
+    # 'soft' takes the class from the averaged probabilities, 'hard' from a weighted majority vote
+    'voting': os.environ.get('CLASSIFIER_VOTING', 'soft'),
+    'classifier_weights': _parse_weights(os.environ.get('CLASSIFIER_WEIGHTS', '')),
+    # LRU/TTL cache of model outputs for repeated forms; size 0 disables it
+    'cache_size': int(os.environ.get('PREDICTION_CACHE_SIZE', 10000)),
+    'cache_ttl': float(os.environ.get('PREDICTION_CACHE_TTL', 3600)),
+    # Per-student feature attributions in every full prediction; off serves the training-time global impacts
+    'explain': os.environ.get('FEATURE_ATTRIBUTION', 'true').lower() == 'true',
+}
+
+def _predict_micro_batch(students):
+    """Score coalesced /api/predict requests in one pass, keeping the single-prediction response shape"""
+    results = predictor.batch_predict(students, use_cache=True)['results']
+    for result in results:
+        result.pop('student_index', None)
+    return results
+
+# /api/what-if: steps per feature when a range gives none, and the cap on rows in one sweep grid
+WHAT_IF_DEFAULT_STEPS = 20
+WHAT_IF_MAX_ROWS = int(os.environ.get('WHAT_IF_MAX_ROWS', 2000))
+
+def _sweep_values(spec):
+    """Values to try for one feature: a list, {'values': [...]} or {'min', 'max', 'steps'}"""
+    if isinstance(spec, list):
+        return spec
+    if isinstance(spec, dict) and isinstance(spec.get('values'), list):
+        return spec['values']
+    if isinstance(spec, dict) and 'min' in spec and 'max' in spec:
+        steps = int(spec.get('steps', WHAT_IF_DEFAULT_STEPS))
+        if steps < 2:
+            raise ValueError("steps must be at least 2")
+        return [round(value, 6) for value in np.linspace(float(spec['min']), float(spec['max']), steps).tolist()]
+    raise ValueError("each feature needs a list of values, {'values': [...]} or {'min', 'max', 'steps'}")
+
+# /api/counterfactual: students per request (every one costs a few hundred candidate rows)
+COUNTERFACTUAL_MAX_STUDENTS = int(os.environ.get('COUNTERFACTUAL_MAX_STUDENTS', 1000))
+
+# Rows scored per ensemble pass by /api/stream-predict
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 5000))
+
+# Concurrent /api/predict calls are coalesced for up to this window; 0 disables micro-batching
+MICRO_BATCH_WINDOW_MS = float(os.environ.get('MICRO_BATCH_WINDOW_MS', 0))
+micro_batcher = MicroBatcher(
+    run_batch=_predict_micro_batch,
+    run_single=lambda student: predictor.predict(student),
+    max_batch_size=int(os.environ.get('MICRO_BATCH_MAX_SIZE', 64)),
+    max_wait_ms=MICRO_BATCH_WINDOW_MS
+) if MICRO_BATCH_WINDOW_MS > 0 else None
+
+def initialize_app(allow_training=True):
     """Initialize the application and ML models"""
     global predictor
     
+    start = time.perf_counter()
     try:
         # Check if models exist, if not train them
-        model_dir = 'models/'
-        data_path = 'data/student_dataset.csv'
+        model_dir = model_store.resolve_model_dir()
+        data_path = DATA_PATH
         
         if not os.path.exists(model_dir) or not os.listdir(model_dir):
+            if not allow_training:
+                raise RuntimeError(f"No trained models found in {model_dir}; train them before starting the server")
+            
             logger.info("🔄 No trained models found. Starting training pipeline...")
             
             # Create data directory if needed
             os.makedirs('data', exist_ok=True)
             
+            from ml.data_generator import StudentDataGenerator
+            from ml.model_trainer import ModelTrainer
+            
             # Generate dataset if it doesn't exist
             if not os.path.exists(data_path):
                 logger.info("📊 Generating synthetic student dataset...")
                 generator = StudentDataGenerator(n_samples=2000)
-                df = generator.generate_realistic_dataset()
-                generator.save_dataset(df, data_path)
+                generator.save_dataset(data_path)
             
             # Train models
             trainer = ModelTrainer()
@@ -48,18 +140,26 @@ def initialize_app():
             trainer.save_models(model_dir)
             trainer.plot_feature_importance(model_dir)
             
-            predictor = trainer.create_ensemble_predictor()
+            predictor = trainer.create_ensemble_predictor(**PREDICTOR_OPTIONS)
             
         else:
             logger.info("📦 Loading pre-trained models...")
-            predictor = EnsemblePredictor(model_dir=model_dir)
+            predictor = EnsemblePredictor(model_dir=model_dir, **PREDICTOR_OPTIONS)
         
-        logger.info("✅ Application initialized successfully")
+        logger.info(f"✅ Application initialized successfully (imports {IMPORT_SECONDS * 1000:.0f} ms, "
+                    f"models {(time.perf_counter() - start) * 1000:.0f} ms)")
         
     except Exception as e:
         logger.error(f"❌ Failed to initialize application: {e}")
         raise
 
+def _json_response(payload, status=200):
+    """Response from payloads that may carry NumPy arrays, serialized in one pass"""
+    start = time.perf_counter()
+    body = dumps(payload)
+    metrics.observe('stage_duration_seconds', time.perf_counter() - start, stage='serialize')
+    return Response(body, status=status, mimetype='application/json')
+
 @app.route('/')
 def home():
     """Home endpoint"""
@@ -76,9 +176,52 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'model_loaded': predictor is not None,
+        'cache': predictor.cache.stats() if predictor is not None and predictor.cache is not None else None,
+        'micro_batching': micro_batcher.stats() if micro_batcher is not None else None,
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: only succeeds once models are loaded and able to serve"""
+    if predictor is None:
+        return jsonify({
+            'ready': False,
+            'timestamp': datetime.now().isoformat()
+        }), 503
+    
+    return jsonify({
+        'ready': True,
+        'model_version': predictor.manifest['version'] if predictor.manifest is not None else None,
+        'inference_mode': predictor.inference_mode,
+        'pid': os.getpid(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Per-stage latency histograms, request and error counts, cache stats and model version (Prometheus text format)"""
+    extra = [('process_id', 'gauge', 'Worker process serving this scrape (metrics are per process)', {}, os.getpid())]
+    if predictor is not None:
+        version = predictor.manifest['version'] if predictor.manifest is not None else 'legacy'
+        extra.append(('model_info', 'gauge', 'Model version being served',
+                      {'version': version, 'inference_mode': predictor.inference_mode}, 1))
+        if predictor.cache is not None:
+            cache = predictor.cache.stats()
+            extra += [
+                ('cache_hits_total', 'counter', 'Prediction cache hits', {}, cache['hits']),
+                ('cache_misses_total', 'counter', 'Prediction cache misses', {}, cache['misses']),
+                ('cache_evictions_total', 'counter', 'Prediction cache evictions', {}, cache['evictions']),
+                ('cache_entries', 'gauge', 'Entries in the prediction cache', {}, cache['size']),
+            ]
+    if micro_batcher is not None:
+        batching = micro_batcher.stats()
+        extra += [
+            ('micro_batch_queue_depth', 'gauge', 'Requests waiting for the micro-batcher', {}, batching['queue_depth']),
+            ('micro_batches_total', 'counter', 'Micro-batches run', {}, batching['batches']),
+        ]
+    return Response(metrics.render(extra), content_type=CONTENT_TYPE)
+
 @app.route('/api/predict', methods=['POST'])
 def predict_performance():
     """Predict student performance"""
@@ -91,15 +234,18 @@ def predict_performance():
                 'error': 'No data provided'
             }), 400
         
-        # Make prediction
-        result = predictor.predict(data)
+        # Make prediction (coalesced with concurrent requests when micro-batching is enabled)
+        if micro_batcher is not None:
+            result = micro_batcher.predict(data)
+        else:
+            result = predictor.predict(data)
         
         # Add metadata
         if result['success']:
             result['timestamp'] = datetime.now().isoformat()
             result['request_id'] = f"PRED_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
-        return jsonify(result)
+        return _json_response(result)
         
     except Exception as e:
         logger.error(f"Prediction endpoint error: {e}")
@@ -129,13 +275,16 @@ def batch_predict():
                 'error': 'Students data must be a list'
             }), 400
         
-        # Process batch prediction
-        batch_result = predictor.batch_predict(students)
+        # Process batch prediction ('columnar' returns scores only, one array per field)
+        if request.args.get('format', data.get('format')) == 'columnar':
+            batch_result = predictor.batch_predict_columnar(students)
+        else:
+            batch_result = predictor.batch_predict(students)
         batch_result['success'] = True
         batch_result['timestamp'] = datetime.now().isoformat()
         batch_result['request_id'] = f"BATCH_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
-        return jsonify(batch_result)
+        return _json_response(batch_result)
         
     except Exception as e:
         logger.error(f"Batch prediction error: {e}")
@@ -145,10 +294,119 @@ def batch_predict():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@app.route('/api/what-if', methods=['POST'])
+def what_if():
+    """Sensitivity curves for one student over value ranges of several features, scored in one ensemble pass"""
+    data = request.json
+    if not data or not isinstance(data.get('student'), dict) or not isinstance(data.get('features'), dict) \
+            or not data['features']:
+        return jsonify({
+            'success': False,
+            'error': 'Provide a student object and a features object mapping fields to value ranges'
+        }), 400
+    
+    try:
+        sweeps = {field: _sweep_values(spec) for field, spec in data['features'].items()}
+        grid_size = sum(len(values) for values in sweeps.values())
+        if grid_size > WHAT_IF_MAX_ROWS:
+            raise ValueError(f"sweep of {grid_size} rows exceeds the limit of {WHAT_IF_MAX_ROWS}")
+        result = predictor.what_if(data['student'], sweeps)
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid what-if request: {str(e)}'
+        }), 400
+    except Exception as e:
+        logger.error(f"What-if error: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'What-if analysis failed: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+    
+    result['success'] = True
+    result['timestamp'] = datetime.now().isoformat()
+    return _json_response(result)
+
+@app.route('/api/counterfactual', methods=['POST'])
+def counterfactual():
+    """Smallest change to actionable features that reaches a target performance level, per student"""
+    data = request.json
+    students = [data['student']] if isinstance((data or {}).get('student'), dict) else (data or {}).get('students')
+    if not isinstance(students, list) or not students or not isinstance(data.get('target_level'), str):
+        return jsonify({
+            'success': False,
+            'error': 'Provide a student object (or a students list) and a target_level'
+        }), 400
+    
+    try:
+        if len(students) > COUNTERFACTUAL_MAX_STUDENTS:
+            raise ValueError(f"{len(students)} students exceeds the limit of {COUNTERFACTUAL_MAX_STUDENTS}")
+        if not all(isinstance(student, dict) for student in students):
+            raise ValueError("every student must be an object")
+        max_changes = int(data.get('max_changes', MAX_CHANGES))
+        if not 1 <= max_changes <= 5:
+            raise ValueError("max_changes must be between 1 and 5")
+        features = data.get('features')
+        if features is not None and not isinstance(features, list):
+            raise ValueError("features must be a list of request fields")
+        result = predictor.counterfactuals(students, data['target_level'], max_changes=max_changes, features=features)
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid counterfactual request: {str(e)}'
+        }), 400
+    except Exception as e:
+        logger.error(f"Counterfactual error: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'Counterfactual search failed: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+    
+    result['success'] = True
+    result['timestamp'] = datetime.now().isoformat()
+    return _json_response(result)
+
+@app.route('/api/stream-predict', methods=['POST'])
+def stream_predict():
+    """Score an NDJSON or CSV upload (dataset column names) chunk by chunk, streaming results back"""
+    if predictor is None:
+        return jsonify({
+            'success': False,
+            'error': 'Models not loaded'
+        }), 503
+    
+    content_type = (request.mimetype or '').lower()
+    if content_type in ('text/csv', 'application/csv'):
+        chunks = bulk_scoring.read_csv_chunks(request.stream, STREAM_CHUNK_SIZE)
+    elif content_type in ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json-seq'):
+        chunks = bulk_scoring.read_ndjson_chunks(request.stream, STREAM_CHUNK_SIZE)
+    else:
+        return jsonify({
+            'success': False,
+            'error': 'Upload must be text/csv or application/x-ndjson'
+        }), 415
+    
+    output_format = request.args.get('format', 'csv' if 'text/csv' in request.headers.get('Accept', '') else 'ndjson')
+    if output_format not in ('ndjson', 'csv'):
+        return jsonify({
+            'success': False,
+            'error': 'format must be ndjson or csv'
+        }), 400
+    
+    # Pin the predictor for the whole stream so a hot-swap cannot mix model versions
+    results = bulk_scoring.score_chunks(predictor, chunks)
+    if output_format == 'csv':
+        return Response(stream_with_context(bulk_scoring.format_csv(results)), mimetype='text/csv')
+    return Response(stream_with_context(bulk_scoring.format_ndjson(results)), mimetype='application/x-ndjson')
+
 @app.route('/api/generate-sample-data', methods=['GET'])
 def generate_sample_data():
     """Generate sample student data for testing"""
     try:
+        from ml.data_generator import StudentDataGenerator
+        
         n_samples = request.args.get('count', 10, type=int)
         
         generator = StudentDataGenerator(n_samples=n_samples)
@@ -204,10 +462,13 @@ def model_info():
                 'error': 'Models not loaded'
             }), 400
         
-        # Load training results if available
-        results_path = 'models/training_results.pkl'
+        # Load training results if available (manifest for stored versions, pickle for the legacy layout)
+        results_path = os.path.join(predictor.model_dir, 'training_results.pkl')
         training_results = {}
-        if os.path.exists(results_path):
+        if predictor.manifest is not None:
+            training_results = predictor.manifest['metrics']
+        elif os.path.exists(results_path):
+            import joblib
             training_results = joblib.load(results_path)
         
         return jsonify({
@@ -217,6 +478,7 @@ def model_info():
                 'regression_models': list(predictor.regression_models.keys()),
                 'classification_models': list(predictor.classification_models.keys()),
                 'feature_count': len(predictor.feature_columns),
+                'model_version': predictor.manifest['version'] if predictor.manifest is not None else None,
                 'training_results': training_results
             },
             'timestamp': datetime.now().isoformat()
@@ -230,27 +492,101 @@ def model_info():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+def _load_version_predictor(model_dir):
+    """Load a freshly trained model version with the serving options"""
+    return EnsemblePredictor(model_dir=model_dir, **PREDICTOR_OPTIONS)
+
+def _swap_predictor(new_predictor, version):
+    """Atomically replace the serving predictor and drop outputs cached for the old models"""
+    global predictor
+    previous_predictor = predictor
+    predictor = new_predictor
+    if previous_predictor is not None:
+        for cache in (previous_predictor.cache, previous_predictor.explanation_cache):
+            if cache is not None:
+                cache.clear()
+    logger.info(f"🔁 Now serving model version {version}")
+
+@app.before_request
+def _follow_current_version():
+    """Pick up a version another worker promoted, checked at most once per MODEL_REFRESH_SECONDS"""
+    global _last_refresh_check, _failed_version
+    if predictor is None or not MODEL_REFRESH_SECONDS:
+        return
+    now = time.monotonic()
+    if now - _last_refresh_check < MODEL_REFRESH_SECONDS or not _refresh_lock.acquire(blocking=False):
+        return
+    
+    try:
+        _last_refresh_check = now
+        version = model_store.current_version()
+        if version != _failed_version:
+            _failed_version = None
+        serving_version = predictor.manifest['version'] if predictor.manifest is not None else None
+        if version is None or version in (serving_version, _failed_version):
+            _refresh_lock.release()
+            return
+        # Requests keep the current predictor while the new version loads; the loader releases the lock
+        threading.Thread(target=_load_current_version, args=(version,), name='model-refresh', daemon=True).start()
+    except Exception as e:
+        logger.error(f"❌ Failed to check the current model version: {e}")
+        _refresh_lock.release()
+
+def _load_current_version(version):
+    """Load a promoted version in the background and swap it in once ready, unless CURRENT moved on meanwhile"""
+    global _failed_version
+    try:
+        new_predictor = _load_version_predictor(model_store.version_dir(version))
+        if model_store.current_version() == version:
+            _swap_predictor(new_predictor, version)
+    except Exception as e:
+        _failed_version = version
+        logger.error(f"❌ Failed to load model version {version}, not retrying until CURRENT changes: {e}")
+    finally:
+        _refresh_lock.release()
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    """Request count and latency per route template (not raw path, to keep label cardinality bounded)"""
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    metrics.increment('http_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+    if 'request_start' in g:
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - g.request_start, endpoint=endpoint)
+    return response
+
+retrain_manager = RetrainManager(
+    load_predictor=_load_version_predictor,
+    on_swap=_swap_predictor,
+    models_root=MODELS_ROOT,
+    min_r2=float(os.environ.get('RETRAIN_MIN_R2', 0.5)),
+    min_accuracy=float(os.environ.get('RETRAIN_MIN_ACCURACY', 0.5))
+)
+
 @app.route('/api/retrain', methods=['POST'])
 def retrain_models():
-    """Retrain models with new data"""
+    """Start retraining in a background process and return a job ID"""
     try:
         # This would typically involve new data, but for now we'll retrain with existing
-        data_path = 'data/student_dataset.csv'
-        
-        trainer = ModelTrainer()
-        X, y_reg, y_clf_encoded, y_clf_original = trainer.load_and_preprocess_data(data_path)
-        trainer.train_models(X, y_reg, y_clf_encoded)
-        trainer.save_models()
-        
-        # Update global predictor
-        global predictor
-        predictor = trainer.create_ensemble_predictor()
+        job = retrain_manager.submit(DATA_PATH)
         
         return jsonify({
             'success': True,
-            'message': 'Models retrained successfully',
+            'message': 'Retraining started',
+            'job': job,
+            'status_url': f"/api/retrain/{job['job_id']}",
             'timestamp': datetime.now().isoformat()
-        })
+        }), 202
+        
+    except RuntimeError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 409
         
     except Exception as e:
         logger.error(f"Model retraining error: {e}")
@@ -260,6 +596,23 @@ def retrain_models():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@app.route('/api/retrain/<job_id>', methods=['GET'])
+def retrain_status(job_id):
+    """Status of a background retraining job"""
+    job = retrain_manager.status(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown retraining job: {job_id}'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job,
+        'serving_version': model_store.current_version(),
+        'timestamp': datetime.now().isoformat()
+    })
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
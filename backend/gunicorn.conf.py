@@ -0,0 +1,40 @@
+"""
+Gunicorn settings for serving EduPredict in production
+"""
+
+import multiprocessing
+import os
+
+# Each worker is a separate process with its own GIL; default to one per core
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+# Load models in the master before forking so workers share them copy-on-write
+preload_app = True
+
+# One native thread per worker by default: the workers already cover the cores, and
+# OpenMP thread pools started in the master do not survive fork safely
+os.environ.setdefault('OMP_NUM_THREADS', os.environ.get('MODEL_THREADS_PER_WORKER', '1'))
+
+# Recycle workers gracefully; jitter keeps them from restarting all at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    server.log.info(f"🚀 EduPredict serving with {workers} workers x {threads} threads")
+
+
+def post_fork(server, worker):
+    server.log.info(f"👷 Worker {worker.pid} started")
+
+
+def worker_exit(server, worker):
+    server.log.info(f"👋 Worker {worker.pid} exited")
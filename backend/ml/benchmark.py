@@ -0,0 +1,269 @@
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from importlib import metadata
+import numpy as np
+from typing import Dict, List, Any, Optional
+
+from ml.data_generator import StudentDataGenerator
+from ml.feature_schema import FIELD_MAPPING
+from ml.model_store import ModelStore
+
+# Relative slowdown tolerated before a metric counts as a regression
+DEFAULT_THRESHOLD = 0.10
+
+BATCH_SIZES = (1, 8, 64, 512)
+
+# Metrics where bigger is better; every other metric is a time or a size
+HIGHER_IS_BETTER_SUFFIXES = ('_per_s',)
+
+# Dataset column -> request field, for turning generated rows into API-shaped requests
+REQUEST_FIELDS = {}
+for _field, _column in FIELD_MAPPING.items():
+    REQUEST_FIELDS.setdefault(_column, _field)
+
+
+def generate_students(n: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Synthetic request dicts from the data generator, reproducible for a given seed"""
+    df = next(StudentDataGenerator(random_state=seed).generate_chunks(n, chunk_size=n))
+    columns = [col for col in df.columns if col in REQUEST_FIELDS]
+    return [{REQUEST_FIELDS[col]: (value.item() if isinstance(value, np.generic) else value)
+             for col, value in zip(columns, row)}
+            for row in df[columns].itertuples(index=False)]
+
+
+def _percentiles(samples_ms: List[float], prefix: str) -> Dict[str, float]:
+    """p50/p90/p99/mean of a list of millisecond timings"""
+    samples = np.asarray(samples_ms)
+    return {
+        f'{prefix}.p50_ms': float(np.percentile(samples, 50)),
+        f'{prefix}.p90_ms': float(np.percentile(samples, 90)),
+        f'{prefix}.p99_ms': float(np.percentile(samples, 99)),
+        f'{prefix}.mean_ms': float(samples.mean()),
+    }
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def bench_cold_start(model_dir: str, repeats: int = 3) -> Dict[str, float]:
+    """Import time, model load time and resident memory of a fresh interpreter, as a new worker would see them"""
+    script = ("import resource, time; start = time.perf_counter(); import app; imported = time.perf_counter(); "
+              f"app.EnsemblePredictor(model_dir={model_dir!r}, **app.PREDICTOR_OPTIONS); "
+              "print(imported - start, time.perf_counter() - imported, "
+              "resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)")
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', script], cwd=backend_dir, capture_output=True,
+                                text=True, check=True).stdout
+        runs.append([float(value) for value in output.strip().splitlines()[-1].split()])
+    import_s, load_s, rss = np.median(runs, axis=0)
+    return {
+        'cold_start.import_s': float(import_s),
+        'cold_start.load_s': float(load_s),
+        'cold_start.rss_mb': float(rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024),
+    }
+
+
+def bench_single(predictor, students: List[Dict[str, Any]], warmup: int = 20) -> Dict[str, float]:
+    """Per-request latency of predict() and of preprocess_input() alone"""
+    for student in students[:warmup]:
+        predictor.predict(student)
+
+    predict_ms, preprocess_ms = [], []
+    for student in students:
+        start = time.perf_counter()
+        predictor.preprocess_input(student)
+        preprocess_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        predictor.predict(student)
+        predict_ms.append((time.perf_counter() - start) * 1000)
+
+    return {**_percentiles(predict_ms, 'predict.single'), **_percentiles(preprocess_ms, 'preprocess.single')}
+
+
+def bench_batches(predictor, students: List[Dict[str, Any]], batch_sizes=BATCH_SIZES,
+                  min_rows: int = 2000) -> Dict[str, float]:
+    """Throughput of batch_predict at several batch sizes"""
+    results = {}
+    for batch_size in batch_sizes:
+        predictor.batch_predict(students[:batch_size])
+        n_batches = max(3, min_rows // batch_size)
+        batch_ms = []
+        for i in range(n_batches):
+            offset = (i * batch_size) % max(len(students) - batch_size, 1)
+            batch = students[offset:offset + batch_size]
+            start = time.perf_counter()
+            predictor.batch_predict(batch)
+            batch_ms.append((time.perf_counter() - start) * 1000)
+        # Median-based, so one descheduled batch does not swing the throughput figure
+        median_ms = float(np.percentile(batch_ms, 50))
+        results[f'batch.{batch_size}.p50_ms'] = median_ms
+        results[f'batch.{batch_size}.rows_per_s'] = batch_size / (median_ms / 1000)
+    return results
+
+
+def bench_training(n_rows: int, n_threads: Optional[int] = None, seed: int = 11) -> Dict[str, float]:
+    """Per-model and total training time on a generated dataset"""
+    from ml.model_trainer import ModelTrainer, load_params
+
+    params = load_params()
+    # Keep CatBoost from writing its catboost_info training logs into the working tree
+    params['catboost_regression'] = {**params['catboost_regression'], 'allow_writing_files': False}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, 'train.csv')
+        StudentDataGenerator(random_state=seed).save_dataset_chunked(data_path, n_rows, chunk_size=n_rows)
+        trainer = ModelTrainer(params=params)
+        X, y_reg, y_clf, _ = trainer.load_and_preprocess_data(data_path)
+        trainer.train_models(X, y_reg, y_clf, n_threads=n_threads)
+
+    results = {f'training.{key}.fit_s': seconds for key, seconds in trainer.timings.items() if key != 'total'}
+    results['training.total_s'] = trainer.timings['total']
+    results['training.peak_rss_mb'] = _peak_rss_mb()
+    return results
+
+
+def _best_of(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    """Per-metric best value over repeated runs, which filters out noise from other processes"""
+    return {metric: (max if _higher_is_better(metric) else min)(run[metric] for run in runs)
+            for metric in runs[0]}
+
+
+def _higher_is_better(metric: str) -> bool:
+    """Throughputs improve upwards, times and sizes downwards"""
+    return metric.endswith(HIGHER_IS_BETTER_SUFFIXES)
+
+
+def run_benchmarks(model_dir: str, n_requests: int = 500, train_rows: int = 5000, repeats: int = 3,
+                   skip_training: bool = False, n_threads: Optional[int] = None) -> Dict[str, Any]:
+    """Run every benchmark; returns run metadata plus a flat metric -> value map"""
+    from ml.predictor import EnsemblePredictor
+
+    students = generate_students(max(n_requests, max(BATCH_SIZES) * 2))
+    results = bench_cold_start(model_dir)
+
+    # Prediction cache off: every request measures the full model path
+    predictor = EnsemblePredictor(model_dir=model_dir, cache_size=0)
+    results.update(_best_of([{**bench_single(predictor, students[:n_requests]), **bench_batches(predictor, students)}
+                             for _ in range(repeats)]))
+    results['serving.peak_rss_mb'] = _peak_rss_mb()
+
+    if not skip_training:
+        results.update(bench_training(train_rows, n_threads))
+
+    return {'meta': _run_metadata(model_dir, n_requests, train_rows, repeats), 'results': results}
+
+
+def _run_metadata(model_dir: str, n_requests: int, train_rows: int, repeats: int) -> Dict[str, Any]:
+    """What the numbers depend on: commit, machine and library versions"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    versions = {}
+    for package in ('numpy', 'pandas', 'scikit-learn', 'xgboost', 'lightgbm', 'catboost'):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        'commit': commit,
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'libraries': versions,
+        'model_dir': model_dir,
+        'n_requests': n_requests,
+        'train_rows': train_rows,
+        'repeats': repeats,
+    }
+
+
+def compare(current: Dict[str, float], baseline: Dict[str, float], default_threshold: float = DEFAULT_THRESHOLD,
+            thresholds: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """Relative change of every metric present in both runs, flagged when worse than its threshold"""
+    thresholds = thresholds or {}
+    rows = []
+    for metric in sorted(set(current) & set(baseline)):
+        old, new = baseline[metric], current[metric]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = -change if _higher_is_better(metric) else change
+        threshold = thresholds.get(metric, default_threshold)
+        rows.append({'metric': metric, 'baseline': old, 'current': new, 'change': change,
+                     'threshold': threshold, 'regression': worse > threshold})
+    return rows
+
+
+def _parse_thresholds(specs: List[str]) -> Dict[str, float]:
+    """metric=fraction pairs, e.g. predict.single.p99_ms=0.25"""
+    thresholds = {}
+    for spec in specs:
+        metric, _, value = spec.partition('=')
+        thresholds[metric.strip()] = float(value)
+    return thresholds
+
+
+# e.g. python -m ml.benchmark --output bench/main.json
+#      python -m ml.benchmark --output bench/branch.json --baseline bench/main.json --threshold predict.single.p99_ms=0.25
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serving and training benchmarks")
+    parser.add_argument('--model-dir', help='model directory (default: the current store version)')
+    parser.add_argument('--requests', type=int, default=500, help='single-request samples')
+    parser.add_argument('--train-rows', type=int, default=5000)
+    parser.add_argument('--repeats', type=int, default=3, help='serving runs; the best value per metric is kept')
+    parser.add_argument('--threads', type=int, help='training thread budget')
+    parser.add_argument('--skip-training', action='store_true')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--default-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative regression allowed for every metric (0.10 = 10%%)')
+    parser.add_argument('--threshold', action='append', default=[], metavar='METRIC=FRACTION',
+                        help='per-metric override, repeatable')
+    args = parser.parse_args()
+
+    model_dir = args.model_dir or ModelStore('models/').resolve_model_dir()
+    report = run_benchmarks(model_dir, n_requests=args.requests, train_rows=args.train_rows, repeats=args.repeats,
+                            skip_training=args.skip_training, n_threads=args.threads)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print("\n📊 BENCHMARK RESULTS")
+    for metric, value in report['results'].items():
+        print(f"  {metric:<42} {value:12.3f}")
+    print(f"✅ Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(report['results'], baseline['results'], args.default_threshold,
+                       _parse_thresholds(args.threshold))
+        print(f"\n🔍 Compared with {args.baseline} (commit {baseline['meta'].get('commit')})")
+        for row in rows:
+            flag = '❌' if row['regression'] else '  '
+            print(f"{flag} {row['metric']:<42} {row['baseline']:12.3f} -> {row['current']:12.3f} "
+                  f"({row['change'] * 100:+6.1f}%, limit {row['threshold'] * 100:.0f}%)")
+        regressions = [row['metric'] for row in rows if row['regression']]
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ No regressions")
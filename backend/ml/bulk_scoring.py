@@ -0,0 +1,142 @@
+import csv
+import io
+import json
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Iterator, IO
+from ml.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Identifier columns echoed back so callers can join results to their own records
+ID_COLUMNS = ['student_id', 'id']
+RESULT_FIELDS = ['row', 'student_id', 'success', 'final_score', 'performance_level', 'confidence', 'error']
+
+
+def read_csv_chunks(stream: IO[bytes], chunk_size: int = 5000) -> Iterator[pd.DataFrame]:
+    """CSV upload in fixed-size DataFrame chunks, header row using dataset column names"""
+    header = stream.readline()
+    lines = []
+    quotes = 0
+    for line in stream:
+        lines.append(line)
+        quotes += line.count(b'"')
+        # Chunks only end outside quoted fields, so a quoted newline never splits a record
+        if len(lines) >= chunk_size and quotes % 2 == 0:
+            yield _parse_csv_chunk(header, lines)
+            lines = []
+    if lines:
+        yield _parse_csv_chunk(header, lines)
+
+
+def _parse_csv_chunk(header: bytes, lines: List[bytes]) -> pd.DataFrame:
+    """One chunk through the C parser; a chunk with malformed lines is re-read record by record"""
+    try:
+        return pd.read_csv(io.BytesIO(header + b''.join(lines)))
+    except (pd.errors.ParserError, UnicodeDecodeError):
+        pass
+
+    columns = next(csv.reader([header.decode('utf-8-sig', errors='replace')]))
+    records, errors = [], []
+    for fields in csv.reader(io.StringIO(b''.join(lines).decode('utf-8', errors='replace'), newline='')):
+        if not fields:
+            continue  # Blank lines are skipped, as read_csv does
+        # Extra fields make the row an error; the leading ones are kept so its identifier is still echoed
+        errors.append(f"Line has {len(fields)} fields, expected {len(columns)}" if len(fields) > len(columns) else None)
+        records.append(fields[:len(columns)])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    writer.writerows(records)
+    buffer.seek(0)
+    frame = pd.read_csv(buffer)
+    frame['_invalid'] = errors
+    return frame
+
+
+def read_ndjson_chunks(stream: IO[bytes], chunk_size: int = 5000) -> Iterator[pd.DataFrame]:
+    """NDJSON upload (one student object per line) in fixed-size DataFrame chunks"""
+    records = []
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        # Unparseable lines are kept as error markers so row numbers stay aligned
+        records.append(record if isinstance(record, dict) else {'_invalid': 'Line is not a JSON object'})
+        if len(records) >= chunk_size:
+            yield pd.DataFrame.from_records(records)
+            records = []
+    if records:
+        yield pd.DataFrame.from_records(records)
+
+
+def score_chunks(predictor, chunks: Iterator[pd.DataFrame]) -> Iterator[Dict[str, Any]]:
+    """Run each chunk through the ensemble in one pass and yield one result per input row"""
+    row_offset = 0
+    total_rows = 0
+    for frame in chunks:
+        X, invalid, errors = predictor.schema.transform_frame(frame)
+        if '_invalid' in frame.columns:
+            # Line-level errors take precedence over the field errors of whatever was salvaged from the line
+            line_errors = frame['_invalid'].to_numpy(dtype=object)
+            unreadable = pd.notna(line_errors)
+            errors[unreadable] = line_errors[unreadable]
+            invalid |= unreadable
+        ids = _row_ids(frame)
+
+        scores = None
+        valid_rows = np.flatnonzero(~invalid)
+        if len(valid_rows):
+            scores = predictor.score_matrix(X[valid_rows])
+        position = {row: i for i, row in enumerate(valid_rows)}
+
+        for i in range(len(frame)):
+            result = {'row': row_offset + i, 'student_id': ids[i]}
+            if invalid[i]:
+                result.update({'success': False, 'error': errors[i]})
+            else:
+                j = position[i]
+                result.update({
+                    'success': True,
+                    'final_score': round(float(scores['final_scores'][j]), 1),
+                    'performance_level': scores['performance_levels'][j],
+                    'confidence': round(float(scores['confidences'][j]) * 100, 1)
+                })
+            yield result
+
+        row_offset += len(frame)
+        total_rows += len(frame)
+    logger.info(f"✅ Streamed scores for {total_rows} students")
+
+
+def format_ndjson(results: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """One JSON object per line"""
+    for result in results:
+        yield dumps(result) + b'\n'
+
+
+def format_csv(results: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Header line followed by one CSV line per result"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=RESULT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for result in results:
+        writer.writerow(result)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _row_ids(frame: pd.DataFrame) -> List[Any]:
+    """Caller-supplied identifiers for each row, or None"""
+    for col in ID_COLUMNS:
+        if col in frame.columns:
+            return [None if pd.isna(value) else (value.item() if isinstance(value, np.generic) else value)
+                    for value in frame[col]]
+    return [None] * len(frame)
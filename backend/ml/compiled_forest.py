@@ -0,0 +1,427 @@
+import json
+import os
+import tempfile
+import numpy as np
+from typing import Dict, List, Any, Tuple
+
+# Every node is stored as "go left when x < threshold" (compared in float64);
+# leaves point both children at themselves so a fixed number of steps is safe.
+NODE_ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'default_left']
+
+# Arrays persisted by save(); children is stored too so loaded forests allocate nothing node-sized
+FOREST_ARRAYS = NODE_ARRAYS + ['children', 'roots', 'tree_output']
+
+# Rows in a parity probe; each puts every feature exactly on, or one float32 step below, one of its split thresholds
+PARITY_PROBE_ROWS = 256
+
+# Cover-weighted mean leaf value below every node, for path attributions; forests saved before it existed lack it
+EXPECTED_ARRAY = 'expected'
+
+# Change in expected output when stepping to each child, saved alongside expected so attributions allocate nothing
+# node-sized either; derived on load for forests saved before it was stored
+CHILD_DELTA_ARRAY = 'child_delta'
+
+
+class CompiledForest:
+    """All fitted boosted ensembles flattened into one array-based forest"""
+
+    def __init__(self, feature, threshold, left, right, value, default_left,
+                 roots, tree_output, outputs: List[Dict[str, Any]], max_depth: int, children=None, expected=None,
+                 child_delta=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.default_left = default_left
+        self.roots = roots
+        self.tree_output = tree_output
+        self.outputs = outputs
+        self.max_depth = int(max_depth)
+        self.expected = expected
+
+        # Children interleaved as [left, right] so one gather picks the next node
+        if children is None:
+            children = np.column_stack([left, right]).ravel().astype(np.int32)
+        self.children = children
+
+        # Leaf sums per output column are one matmul with a tree -> column assignment matrix
+        n_columns = sum(output['n_columns'] for output in outputs)
+        self.assignment = np.zeros((len(roots), n_columns))
+        self.assignment[np.arange(len(roots)), tree_output] = 1.0
+
+        self.regression_names = [o['name'] for o in outputs if o['task'] == 'regression']
+        self.classification_names = [o['name'] for o in outputs if o['task'] == 'classification']
+
+        # Trees of the single-column regression outputs, and which regressor each belongs to
+        regression_columns = {o['column']: i for i, o in enumerate(o for o in outputs if o['task'] == 'regression')}
+        self.regression_trees = np.flatnonzero(np.isin(tree_output, list(regression_columns)))
+        self.tree_regressor = np.array([regression_columns[c] for c in tree_output[self.regression_trees]],
+                                       dtype=np.int64)
+        # Change in expected output when stepping to each child, laid out like children
+        if child_delta is None and expected is not None:
+            child_delta = expected[self.children] - np.repeat(expected, 2)
+        self.child_delta = child_delta
+
+    @classmethod
+    def from_models(cls, regression_models: Dict[str, Any], classification_models: Dict[str, Any]) -> 'CompiledForest':
+        """Export fitted XGBoost / LightGBM / CatBoost sklearn models into one forest"""
+        trees, outputs = [], []
+        column = 0
+        for task, models in (('regression', regression_models), ('classification', classification_models)):
+            for name, model in models.items():
+                model_trees, n_columns, scale, bias = _export_model(model)
+                for tree, tree_column in model_trees:
+                    trees.append((tree, column + tree_column))
+                outputs.append({
+                    'name': name,
+                    'task': task,
+                    'column': column,
+                    'n_columns': n_columns,
+                    'scale': scale,
+                    'bias': bias
+                })
+                column += n_columns
+        return cls._from_trees(trees, outputs)
+
+    @classmethod
+    def _from_trees(cls, trees, outputs) -> 'CompiledForest':
+        """Concatenate per-tree node arrays into global arrays with offsets"""
+        sizes = [len(tree['feature']) for tree, _ in trees]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+        arrays = {}
+        for key in NODE_ARRAYS:
+            parts = []
+            for (tree, _), offset in zip(trees, offsets):
+                part = np.asarray(tree[key])
+                if key in ('left', 'right'):
+                    part = part.astype(np.int32) + offset
+                parts.append(part)
+            arrays[key] = np.concatenate(parts)
+        expected = None
+        if all(EXPECTED_ARRAY in tree for tree, _ in trees):
+            expected = np.concatenate([np.asarray(tree[EXPECTED_ARRAY]) for tree, _ in trees]).astype(np.float64)
+        return cls(
+            feature=arrays['feature'].astype(np.int32),
+            threshold=arrays['threshold'].astype(np.float64),
+            left=arrays['left'].astype(np.int32),
+            right=arrays['right'].astype(np.int32),
+            value=arrays['value'].astype(np.float64),
+            default_left=arrays['default_left'].astype(bool),
+            roots=offsets,
+            tree_output=np.array([tree_column for _, tree_column in trees], dtype=np.int32),
+            outputs=outputs,
+            max_depth=max(tree['depth'] for tree, _ in trees),
+            expected=expected
+        )
+
+    def raw_predict(self, X: np.ndarray) -> np.ndarray:
+        """Traverse every tree for every row at once and return summed leaf values per output column"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        has_missing = np.isnan(X).any()
+
+        # Row offsets turn (row, feature) lookups into a single flat gather
+        X_flat = X.ravel()
+        row_offsets = (np.arange(len(X), dtype=np.int32) * X.shape[1])[:, None]
+        node = np.repeat(self.roots[None, :], len(X), axis=0)
+        for _ in range(self.max_depth):
+            feature_values = X_flat[row_offsets + self.feature[node]]
+            go_right = feature_values >= self.threshold[node]
+            if has_missing:
+                go_right = np.where(np.isnan(feature_values), ~self.default_left[node], go_right)
+            node = self.children[2 * node + go_right]
+
+        return self.value[node] @ self.assignment
+
+    def regression_contributions(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-feature attributions of every regressor's score (n_regressors, n, n_features) and its expected score"""
+        if self.expected is None:
+            raise ValueError("Forest was compiled without node expectations")
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        n_rows, n_features = X.shape
+        regression = [output for output in self.outputs if output['task'] == 'regression']
+        has_missing = np.isnan(X).any()
+
+        # Every split credits its feature with the change in expected tree output between the node and the
+        # child the row takes, so attributions plus the expected score add up to the prediction
+        tree_scale = np.array([output['scale'] for output in regression])[self.tree_regressor]
+        cells = ((np.arange(n_rows)[:, None] * len(regression) + self.tree_regressor) * n_features)
+        contributions = np.zeros(n_rows * len(regression) * n_features)
+
+        X_flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+        node = np.repeat(self.roots[self.regression_trees][None, :], n_rows, axis=0)
+        for _ in range(self.max_depth):
+            feature = self.feature[node]
+            feature_values = X_flat[row_offsets + feature]
+            go_right = feature_values >= self.threshold[node]
+            if has_missing:
+                go_right = np.where(np.isnan(feature_values), ~self.default_left[node], go_right)
+            step = 2 * node + go_right
+            contributions += np.bincount((cells + feature).ravel(),
+                                         weights=(self.child_delta[step] * tree_scale).ravel(),
+                                         minlength=len(contributions))
+            node = self.children[step]
+
+        root_expected = self.expected[self.roots[self.regression_trees]] * tree_scale
+        expected = np.array([output['bias'] for output in regression]) + np.bincount(
+            self.tree_regressor, weights=root_expected, minlength=len(regression))
+        return contributions.reshape(n_rows, len(regression), n_features).transpose(1, 0, 2), expected
+
+    def predict(self, X: np.ndarray, chunk_size: int = 2048) -> Tuple[np.ndarray, np.ndarray]:
+        """Regression scores (n, n_regressors) and class probabilities (n_classifiers, n, n_classes)"""
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X[None, :]
+        raw = np.vstack([self.raw_predict(X[start:start + chunk_size])
+                         for start in range(0, max(len(X), 1), chunk_size)])
+
+        regression, classification = [], []
+        for output in self.outputs:
+            margin = raw[:, output['column']:output['column'] + output['n_columns']] * output['scale'] + output['bias']
+            if output['task'] == 'regression':
+                regression.append(margin[:, 0])
+            else:
+                classification.append(_softmax(margin))
+
+        regression_predictions = np.column_stack(regression) if regression else np.empty((len(X), 0))
+        classification_probas = np.stack(classification) if classification else np.empty((0, len(X), 0))
+        return regression_predictions, classification_probas
+
+    def save(self, forest_dir: str):
+        """Write every node array as its own .npy file so it can be memory-mapped on load"""
+        os.makedirs(forest_dir, exist_ok=True)
+        for key in FOREST_ARRAYS:
+            np.save(os.path.join(forest_dir, f'{key}.npy'), getattr(self, key))
+        if self.expected is not None:
+            np.save(os.path.join(forest_dir, f'{EXPECTED_ARRAY}.npy'), self.expected)
+            np.save(os.path.join(forest_dir, f'{CHILD_DELTA_ARRAY}.npy'), self.child_delta)
+        with open(os.path.join(forest_dir, 'forest.json'), 'w') as f:
+            json.dump({'outputs': self.outputs, 'max_depth': self.max_depth}, f, indent=2)
+
+    @classmethod
+    def load(cls, forest_dir: str, mmap: bool = True) -> 'CompiledForest':
+        """Load a forest written by save(); with mmap the node arrays are shared page-cache views"""
+        with open(os.path.join(forest_dir, 'forest.json')) as f:
+            meta = json.load(f)
+        arrays = {key: np.load(os.path.join(forest_dir, f'{key}.npy'), mmap_mode='r' if mmap else None)
+                  for key in FOREST_ARRAYS}
+        for key in (EXPECTED_ARRAY, CHILD_DELTA_ARRAY):
+            path = os.path.join(forest_dir, f'{key}.npy')
+            if os.path.exists(path):
+                arrays[key] = np.load(path, mmap_mode='r' if mmap else None)
+        return cls(outputs=meta['outputs'], max_depth=meta['max_depth'], **arrays)
+
+
+def parity_probe(forest: CompiledForest, n_features: int, n_rows: int = PARITY_PROBE_ROWS,
+                 seed: int = 0) -> np.ndarray:
+    """float32 rows on the forest's split thresholds, where `<` versus `<=` and rounding mistakes would show"""
+    rng = np.random.default_rng(seed)
+    internal = forest.left != np.arange(len(forest.left))
+    probe = np.zeros((n_rows + 3, n_features), dtype=np.float32)
+    probe[1], probe[2] = 5.0, 50.0
+    for j in range(n_features):
+        thresholds = np.unique(np.asarray(forest.threshold)[internal & (forest.feature == j)].astype(np.float32))
+        if len(thresholds):
+            values = rng.choice(thresholds, n_rows)
+            below = rng.random(n_rows) < 0.5
+            probe[3:, j] = np.where(below, np.nextafter(values, np.float32(-np.inf)), values)
+    return probe
+
+
+def _softmax(margin: np.ndarray) -> np.ndarray:
+    """Row-wise softmax of raw multiclass margins"""
+    exp = np.exp(margin - margin.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _export_model(model) -> Tuple[List[Tuple[Dict[str, Any], int]], int, float, float]:
+    """Dispatch on the model's library without importing it"""
+    library = getattr(model, 'library', None) or type(model).__module__.split('.')[0]
+    if library == 'xgboost':
+        return _export_xgboost(model)
+    if library == 'lightgbm':
+        return _export_lightgbm(model)
+    if library == 'catboost':
+        return _export_catboost(model)
+    raise ValueError(f"Cannot compile model of type {type(model).__name__}")
+
+
+def _export_xgboost(model):
+    """XGBoost: go left when x < split (float32), missing follows default_left"""
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+    params = learner['learner_model_param']
+    gbtree = learner['gradient_booster']
+    if gbtree['name'] != 'gbtree':
+        raise ValueError(f"Unsupported XGBoost booster: {gbtree['name']}")
+
+    n_columns = max(int(params['num_class']), 1)
+    trees = []
+    for tree, tree_class in zip(gbtree['model']['trees'], gbtree['model']['tree_info']):
+        left = np.array(tree['left_children'])
+        right = np.array(tree['right_children'])
+        is_leaf = left == -1
+        node_ids = np.arange(len(left))
+        value = np.where(is_leaf, np.array(tree['split_conditions'], dtype=np.float32), 0.0)
+        depth = _depth(left, right, is_leaf)
+        trees.append(({
+            'feature': np.where(is_leaf, 0, tree['split_indices']),
+            'threshold': np.where(is_leaf, np.inf, np.array(tree['split_conditions'], dtype=np.float32)),
+            'left': np.where(is_leaf, node_ids, left),
+            'right': np.where(is_leaf, node_ids, right),
+            'value': value,
+            'default_left': np.array(tree['default_left'], dtype=bool) | is_leaf,
+            'depth': depth,
+            EXPECTED_ARRAY: _expected_values(np.where(is_leaf, node_ids, left), np.where(is_leaf, node_ids, right),
+                                             is_leaf, value, tree['sum_hessian'], depth)
+        }, tree_class))
+    return trees, n_columns, 1.0, float(params['base_score'])
+
+
+def _export_lightgbm(model):
+    """LightGBM: go left when x <= threshold (float64)"""
+    dump = model.booster_.dump_model()
+    n_columns = dump['num_tree_per_iteration']
+    trees = []
+    for tree_info in dump['tree_info']:
+        nodes = {key: [] for key in NODE_ARRAYS}
+        covers = []
+
+        def visit(node, depth):
+            idx = len(nodes['feature'])
+            for key in NODE_ARRAYS:
+                nodes[key].append(0)
+            covers.append(node.get('leaf_count', node.get('internal_count', 0)))
+            if 'leaf_value' in node:
+                nodes['threshold'][idx] = np.inf
+                nodes['left'][idx] = nodes['right'][idx] = idx
+                nodes['value'][idx] = node['leaf_value']
+                nodes['default_left'][idx] = True
+                return idx, depth
+            if node['decision_type'] != '<=':
+                raise ValueError("Categorical LightGBM splits are not supported")
+            threshold = node['threshold']
+            nodes['feature'][idx] = node['split_feature']
+            nodes['threshold'][idx] = np.nextafter(threshold, np.inf)
+            # missing_type 'None' means NaN is treated as zero by LightGBM
+            if node['missing_type'] == 'None':
+                nodes['default_left'][idx] = 0.0 <= threshold
+            else:
+                nodes['default_left'][idx] = node['default_left']
+            nodes['left'][idx], left_depth = visit(node['left_child'], depth + 1)
+            nodes['right'][idx], right_depth = visit(node['right_child'], depth + 1)
+            return idx, max(left_depth, right_depth)
+
+        _, depth = visit(tree_info['tree_structure'], 0)
+        nodes['depth'] = depth
+        left, right = np.array(nodes['left']), np.array(nodes['right'])
+        nodes[EXPECTED_ARRAY] = _expected_values(left, right, left == np.arange(len(left)), np.array(nodes['value']),
+                                                 covers, depth)
+        trees.append((nodes, tree_info['tree_index'] % n_columns))
+    return trees, n_columns, 1.0, 0.0
+
+
+def _export_catboost(model):
+    """CatBoost oblivious trees: bit i of the leaf index is set when x > border of split i"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'model.json')
+        model.save_model(path, format='json')
+        with open(path) as f:
+            dump = json.load(f)
+
+    float_features = dump['features_info']['float_features']
+    flat_index = {f['feature_index']: f['flat_feature_index'] for f in float_features}
+    # NaN is compared as -inf ("Min"/"AsIs") unless the feature was trained with "Max"
+    nan_left = {f['feature_index']: f.get('nan_value_treatment') != 'Max' for f in float_features}
+    scale, biases = dump['scale_and_bias']
+    if len(biases) != 1:
+        raise ValueError("Only single-output CatBoost models are supported")
+
+    trees = []
+    for tree in dump['oblivious_trees']:
+        splits = tree['splits']
+        for split in splits:
+            if split['split_type'] != 'FloatFeature':
+                raise ValueError(f"Unsupported CatBoost split type: {split['split_type']}")
+        depth = len(splits)
+        n_internal = 2 ** depth - 1
+        n_nodes = 2 ** (depth + 1) - 1
+        node_ids = np.arange(n_nodes)
+
+        # Heap layout: children of i are 2i+1 / 2i+2, level d tests splits[d]
+        level = np.floor(np.log2(node_ids + 1)).astype(int)
+        internal = node_ids < n_internal
+        feature = np.zeros(n_nodes, dtype=np.int32)
+        threshold = np.full(n_nodes, np.inf)
+        default_left = np.ones(n_nodes, dtype=bool)
+        for d, split in enumerate(splits):
+            at_level = internal & (level == d)
+            feature[at_level] = flat_index[split['float_feature_index']]
+            threshold[at_level] = np.nextafter(float(split['border']), np.inf)
+            default_left[at_level] = nan_left[split['float_feature_index']]
+
+        # Leaf at heap position p encodes the right/left decisions as bits, root decision first
+        value = np.zeros(n_nodes)
+        cover = np.zeros(n_nodes)
+        leaf_values = np.asarray(tree['leaf_values'])
+        # Training weight per leaf; models without it count every leaf equally
+        leaf_weights = np.asarray(tree.get('leaf_weights') or np.ones(len(leaf_values)))
+        for position in range(n_internal, n_nodes):
+            path = position - n_internal
+            leaf_index = 0
+            for d in range(depth):
+                if (path >> (depth - 1 - d)) & 1:
+                    leaf_index |= 1 << d
+            value[position] = leaf_values[leaf_index]
+            cover[position] = leaf_weights[leaf_index]
+        left = np.where(internal, 2 * node_ids + 1, node_ids)
+        right = np.where(internal, 2 * node_ids + 2, node_ids)
+
+        trees.append(({
+            'feature': feature,
+            'threshold': threshold,
+            'left': left,
+            'right': right,
+            'value': value,
+            'default_left': default_left,
+            'depth': depth,
+            EXPECTED_ARRAY: _expected_values(left, right, ~internal, value, cover, depth)
+        }, 0))
+    return trees, 1, float(scale), float(biases[0])
+
+
+def _expected_values(left: np.ndarray, right: np.ndarray, is_leaf: np.ndarray, value: np.ndarray,
+                     cover, depth: int) -> np.ndarray:
+    """Cover-weighted mean leaf value below every node; each pass settles one more level above the leaves"""
+    expected = np.where(is_leaf, value, 0.0).astype(np.float64)
+    cover = np.where(is_leaf, np.asarray(cover, dtype=np.float64), 0.0)
+    internal = np.flatnonzero(~is_leaf)
+    left, right = left[internal], right[internal]
+    for _ in range(depth):
+        total = cover[left] + cover[right]
+        weighted = cover[left] * expected[left] + cover[right] * expected[right]
+        expected[internal] = np.where(total > 0, weighted / np.where(total > 0, total, 1.0),
+                                      (expected[left] + expected[right]) / 2)
+        cover[internal] = total
+    return expected
+
+
+def _depth(left: np.ndarray, right: np.ndarray, is_leaf: np.ndarray) -> int:
+    """Maximum root-to-leaf depth of an XGBoost tree"""
+    depth = np.zeros(len(left), dtype=int)
+    max_depth = 0
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        if is_leaf[node]:
+            max_depth = max(max_depth, depth[node])
+            continue
+        for child in (left[node], right[node]):
+            depth[child] = depth[node] + 1
+            stack.append(child)
+    return int(max_depth)
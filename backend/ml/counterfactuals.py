@@ -0,0 +1,264 @@
+import numpy as np
+from typing import Dict, List, Any, Callable, Optional, Tuple
+from ml.compiled_forest import CompiledForest
+from ml.feature_schema import FeatureSchema
+
+# Performance levels from lowest to highest, as the data generator bins final scores
+LEVEL_ORDER = ['Low', 'Medium', 'High', 'Excellent']
+
+# Request fields a student can act on: (direction of improvement, lowest value, highest value, step),
+# with the bounds and steps of the prediction form
+ACTIONABLE_FEATURES = {
+    'studyHoursDaily': (1, 0, 12, 0.5),
+    'attendanceRate': (1, 0, 100, 1),
+    'homeworkCompletion': (1, 0, 100, 1),
+    'classParticipation': (1, 1, 10, 1),
+    'assignmentQuality': (1, 1, 10, 1),
+    'noteTakingQuality': (1, 1, 10, 1),
+    'studyConsistency': (1, 1, 10, 1),
+    'metacognitionSkills': (1, 1, 10, 1),
+    'criticalThinking': (1, 1, 10, 1),
+    'timeManagement': (1, 1, 10, 1),
+    'sleepHours': (1, 4, 12, 0.5),
+    'sleepQuality': (1, 1, 10, 1),
+    'motivationLevel': (1, 1, 10, 1),
+    'stressManagement': (1, 1, 10, 1),
+    'focusConcentration': (1, 1, 10, 1),
+    'procrastinationTendency': (-1, 1, 10, 1),
+    'academicAnxiety': (-1, 1, 10, 1),
+}
+
+# Features changed at most per student, and partial plans kept per student after every search level
+MAX_CHANGES = 3
+BEAM_WIDTH = 6
+
+# Split-crossing values tried per feature when expanding a plan; refinement then tries every one
+EXPANSION_CANDIDATES = 8
+
+# Features kept per student after the first level, ranked by how far one move alone raised the target's probability
+SCREENED_FEATURES = 6
+
+
+class CounterfactualSearch:
+    """Cheapest change to actionable features that moves the ensemble's performance level to a target"""
+
+    def __init__(self, forest: CompiledForest, schema: FeatureSchema, level_classes: List[str],
+                 score: Callable[[np.ndarray], Dict[str, Any]], features: Dict[str, Tuple] = None):
+        self.schema = schema
+        self.score = score
+        unknown = [level for level in level_classes if level not in LEVEL_ORDER]
+        if unknown:
+            raise ValueError(f"Performance levels without an order: {unknown}")
+        self.level_classes = [str(level) for level in level_classes]
+        self.class_ranks = np.array([LEVEL_ORDER.index(level) for level in self.level_classes])
+
+        # Between two split thresholds no tree changes its path, so the only values worth trying for a feature
+        # are those that just cross one of its thresholds, snapped to the form's step
+        internal = forest.left != np.arange(len(forest.left))
+        self.features = {}
+        for field, (direction, lower, upper, step) in (features or ACTIONABLE_FEATURES).items():
+            if field not in schema.field_slots:
+                continue
+            idx = schema.field_slots[field][0]
+            thresholds = forest.threshold[internal & (forest.feature == idx)]
+            if not len(thresholds):
+                continue  # No tree splits on it: changing it cannot move any prediction
+            crossings = np.ceil(thresholds / step) * step - (step if direction < 0 else 0)
+            cuts = np.unique(crossings[(crossings >= lower) & (crossings <= upper)]).astype(np.float32)
+            if len(cuts):
+                self.features[field] = (idx, direction, float(upper - lower), cuts)
+
+    def _moves(self, field: str, current: float, limit: int = None) -> np.ndarray:
+        """Split-crossing values of a field in its improving direction, nearest first, evenly thinned to limit"""
+        _, direction, _, cuts = self.features[field]
+        moves = cuts[cuts > current] if direction > 0 else cuts[cuts < current][::-1]
+        if limit is not None and len(moves) > limit:
+            moves = moves[np.unique(np.linspace(0, len(moves) - 1, limit).round().astype(int))]
+        return moves
+
+    def _evaluate(self, X: np.ndarray, targets: np.ndarray) -> Tuple[Dict[str, Any], np.ndarray, np.ndarray]:
+        """Ensemble outputs of every row, whether it reaches its target level and its probability of doing so"""
+        scores = self.score(X)
+        rank_of = dict(zip(self.level_classes, self.class_ranks))
+        ranks = np.array([rank_of.get(level, -1) for level in scores['performance_levels']])
+        at_or_above = self.class_ranks[None, :] >= targets[:, None]
+        progress = (scores['class_probabilities'] * at_or_above).sum(axis=1)
+        return scores, ranks >= targets, progress
+
+    def search(self, X: np.ndarray, target_levels: List[str], max_changes: int = MAX_CHANGES,
+               beam_width: int = BEAM_WIDTH, fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Best change per row and the number of candidate rows scored; every search level is one batched pass"""
+        X = np.asarray(X, dtype=np.float32)
+        for level in target_levels:
+            if level not in self.level_classes:
+                raise ValueError(f"Unknown performance level: {level} (expected one of {self.level_classes})")
+        if fields is not None:
+            unknown = [field for field in fields if field not in ACTIONABLE_FEATURES]
+            if unknown:
+                raise ValueError(f"Not actionable features: {unknown}")
+        fields = [field for field in self.features if fields is None or field in fields]
+        targets = np.array([LEVEL_ORDER.index(level) for level in target_levels])
+
+        current, reached, start_progress = self._evaluate(X, targets)
+        evaluated = len(X)
+        # Per row: (cost, changes) of the cheapest plan found so far; cost is the summed fraction of each range moved
+        best: List[Optional[Tuple[float, Dict[str, float]]]] = [(0.0, {}) if ok else None for ok in reached]
+        best_cost = np.where(reached, 0.0, np.inf)
+        beams = [[] if ok else [(0.0, {})] for ok in reached]
+        row_fields = [fields] * len(X)
+
+        for depth in range(max_changes):
+            rows, owners, plans, costs, moved = [], [], [], [], []
+            for i, beam in enumerate(beams):
+                for cost, changes in beam:
+                    row = X[i].copy()
+                    for field, value in changes.items():
+                        row[self.features[field][0]] = value
+                    for field in row_fields[i]:
+                        if field in changes:
+                            continue
+                        idx, _, span, _ = self.features[field]
+                        moves = self._moves(field, float(X[i, idx]), EXPANSION_CANDIDATES)
+                        move_costs = cost + np.abs(moves - X[i, idx]) / span
+                        # Branch and bound: a plan already dearer than a known solution only gets dearer
+                        keep = move_costs < best_cost[i]
+                        if not keep.any():
+                            continue
+                        block = np.repeat(row[None, :], int(keep.sum()), axis=0)
+                        block[:, idx] = moves[keep]
+                        rows.append(block)
+                        owners.append(np.full(len(block), i))
+                        plans.extend({**changes, field: float(value)} for value in moves[keep])
+                        costs.append(move_costs[keep])
+                        moved.extend([field] * len(block))
+            if not rows:
+                break
+
+            owners = np.concatenate(owners)
+            costs = np.concatenate(costs)
+            _, reached, progress = self._evaluate(np.vstack(rows), targets[owners])
+            evaluated += len(owners)
+
+            for j in np.flatnonzero(reached):
+                i = owners[j]
+                if costs[j] < best_cost[i]:
+                    best_cost[i] = costs[j]
+                    best[i] = (float(costs[j]), plans[j])
+
+            if depth == 0:
+                # Screening: deeper levels only combine the features whose single moves raised it most
+                gains = [{} for _ in range(len(X))]
+                for j in np.flatnonzero(progress > start_progress[owners] + 1e-6):
+                    gain = gains[owners[j]]
+                    gain[moved[j]] = max(gain.get(moved[j], 0.0), progress[j])
+                row_fields = [sorted(gain, key=gain.get, reverse=True)[:SCREENED_FEATURES] for gain in gains]
+
+            # Next beam per row: open plans still cheaper than its best solution, most likely to reach first
+            beams = [[] for _ in range(len(X))]
+            seen = [set() for _ in range(len(X))]
+            open_plans = np.flatnonzero(~reached & (costs < best_cost[owners]))
+            for j in open_plans[np.lexsort((costs[open_plans], -progress[open_plans], owners[open_plans]))]:
+                i = owners[j]
+                key = frozenset(plans[j].items())
+                if len(beams[i]) < beam_width and key not in seen[i]:
+                    seen[i].add(key)
+                    beams[i].append((float(costs[j]), plans[j]))
+
+        best, refined = self._refine(X, targets, best)
+        evaluated += refined
+        return self._describe(X, target_levels, current, best), evaluated
+
+    def _refine(self, X: np.ndarray, targets: np.ndarray, best: List[Optional[Tuple[float, Dict[str, float]]]]):
+        """Pull every changed feature back to the nearest crossing value that still reaches the target, or drop it"""
+        best = list(best)
+        order = [sorted(plan[1]) if plan is not None else [] for plan in best]
+        evaluated = 0
+        for position in range(max(len(fields) for fields in order) if order else 0):
+            rows, owners, plans = [], [], []
+            for i, plan in enumerate(best):
+                if len(order[i]) <= position or order[i][position] not in plan[1]:
+                    continue
+                changes = plan[1]
+                field = order[i][position]
+                idx = self.features[field][0]
+                original = float(X[i, idx])
+                # Leaving the feature alone first, then every crossing short of the chosen value, nearest first
+                moves = self._moves(field, original)
+                moves = np.concatenate([[original], moves[np.abs(moves - original) < abs(changes[field] - original)]])
+                row = X[i].copy()
+                for other, value in changes.items():
+                    row[self.features[other][0]] = value
+                block = np.repeat(row[None, :], len(moves), axis=0)
+                block[:, idx] = moves
+                rows.append(block)
+                owners.append(np.full(len(block), i))
+                plans.extend({**changes, field: float(value)} for value in moves)
+            if not rows:
+                break
+
+            owners = np.concatenate(owners)
+            _, reached, _ = self._evaluate(np.vstack(rows), targets[owners])
+            evaluated += len(owners)
+            # Rows of one plan are contiguous and nearest first, so its first reaching row is the cheapest
+            refined = set()
+            for j in np.flatnonzero(reached):
+                i = owners[j]
+                if i in refined:
+                    continue
+                refined.add(i)
+                changes = {field: value for field, value in plans[j].items()
+                           if value != float(X[i, self.features[field][0]])}
+                best[i] = (self._cost(X[i], changes), changes)
+        return best, evaluated
+
+    def _cost(self, row: np.ndarray, changes: Dict[str, float]) -> float:
+        """Summed fraction of each feature's range moved"""
+        return float(sum(abs(value - row[self.features[field][0]]) / self.features[field][2]
+                         for field, value in changes.items()))
+
+    def _describe(self, X: np.ndarray, target_levels: List[str], current: Dict[str, Any],
+                  best: List[Optional[Tuple[float, Dict[str, float]]]]) -> List[Dict[str, Any]]:
+        """API form of every row's plan, with the ensemble's prediction after applying it"""
+        solved = [i for i, plan in enumerate(best) if plan is not None and plan[1]]
+        after = None
+        if solved:
+            rows = X[solved].copy()
+            for row, i in zip(rows, solved):
+                for field, value in best[i][1].items():
+                    row[self.features[field][0]] = value
+            after = self.score(rows)
+        position = {i: k for k, i in enumerate(solved)}
+
+        results = []
+        for i, plan in enumerate(best):
+            result = {
+                'target_level': target_levels[i],
+                'current': {
+                    'final_score': round(float(current['final_scores'][i]), 1),
+                    'performance_level': current['performance_levels'][i]
+                },
+                'reached': plan is not None,
+                'already_at_target': plan is not None and not plan[1],
+                'changes': [],
+                'cost': None,
+                'predicted': None
+            }
+            if i in position:
+                k = position[i]
+                cost, changes = plan
+                result['changes'] = [{
+                    'feature': field,
+                    'from': round(float(X[i, self.features[field][0]]), 2),
+                    'to': round(value, 2),
+                    'change': round(value - float(X[i, self.features[field][0]]), 2)
+                } for field, value in sorted(changes.items(), key=lambda item: -self._cost(X[i], dict([item])))]
+                result['cost'] = round(cost, 4)
+                result['predicted'] = {
+                    'final_score': round(float(after['final_scores'][k]), 1),
+                    'performance_level': after['performance_levels'][k],
+                    'confidence': round(float(after['confidences'][k]) * 100, 1)
+                }
+            elif plan is not None:
+                result['cost'] = 0.0
+            results.append(result)
+        return results
@@ -1,7 +1,38 @@
 import pandas as pd
 import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from typing import Iterator, Optional
 import json
+from ml.dataset_io import ParquetChunkWriter, is_parquet, write_dataset
+
+# (high, average, low) performer means for the features with archetype patterns
+PATTERN_FEATURES = {
+    'study_hours_daily': (7.5, 4.0, 2.0),
+    'attendance_rate': (95, 80, 65),
+    'homework_completion': (95, 75, 55),
+    'class_participation': (9, 6, 3),
+    'assignment_quality': (9, 6, 4),
+    'working_memory': (8.5, 6.5, 4.5),
+    'critical_thinking': (9, 6, 4),
+    'academic_aptitude': (85, 70, 55),
+    'time_management': (8, 6, 4),
+    'study_consistency': (8, 6, 4),
+    'motivation_level': (9, 6, 4),
+    'sleep_hours': (7.5, 6.5, 5.5),
+    'stress_management': (8, 6, 4),
+    'focus_concentration': (8, 6, 4),
+    'peer_support': (8, 6, 4),
+}
+
+# Share of high/average/low performers, and per-archetype (std, clip low, clip high) as fractions of the mean
+ARCHETYPE_SHARES = [0.25, 0.50, 0.25]
+ARCHETYPE_SPREAD = [(0.15, 0.7, 1.3), (0.2, 0.6, 1.4), (0.25, 0.5, 1.5)]
+
+COLUMN_ORDER = list(PATTERN_FEATURES) + ['faculty_support', 'school_resources', 'age', 'gender',
+                                         'extracurricular_hours', 'final_score', 'performance_level', 'created_at']
+
 
 class StudentDataGenerator:
     def __init__(self, n_samples=5000, random_state=42):
@@ -133,7 +164,8 @@ class StudentDataGenerator:
         np.random.shuffle(combined)
         return combined
 
-    def _calculate_strong_scores(self, df):
+    @staticmethod
+    def _calculate_strong_scores(df, rng=None):
         """Calculate scores with VERY STRONG, CLEAR patterns"""
         
         # MAJOR factors with strong weights
@@ -173,11 +205,13 @@ class StudentDataGenerator:
         base_score = 70 + (total_impact * 0.8)
         
         # Add small amount of randomness
-        final_score = base_score + np.random.normal(0, 3, len(df))
+        random = np.random if rng is None else rng
+        final_score = base_score + random.normal(0, 3, len(df['study_hours_daily']))
         
         return final_score.clip(40, 98).round(1)
     
-    def _categorize_performance(self, scores):
+    @staticmethod
+    def _categorize_performance(scores):
         """Categorize scores into performance levels"""
         return pd.cut(scores, bins=[0, 65, 75, 85, 100], 
                     labels=['Low', 'Medium', 'High', 'Excellent'], 
@@ -220,13 +254,107 @@ class StudentDataGenerator:
             print(f"  {stat}: {value:.1f}")
     
     def save_dataset(self, filename='data/student_dataset.csv'):
-        """Save generated dataset"""
+        """Save generated dataset (CSV, or typed Parquet for .parquet paths)"""
         df = self.generate_realistic_dataset()
-        df.to_csv(filename, index=False)
+        write_dataset(df, filename)
         print(f"\n✅ Dataset saved with {len(df)} samples to {filename}")
         return df
 
+    def generate_chunks(self, n_samples: Optional[int] = None, chunk_size: int = 100000,
+                        n_jobs: int = 1) -> Iterator[pd.DataFrame]:
+        """Yield the dataset in fixed-size blocks; chunk k is always seeded from (random_state, k)"""
+        for chunk in self._run_chunks(_generate_chunk, n_samples, chunk_size, n_jobs):
+            yield chunk
+    
+    def save_dataset_chunked(self, filename='data/student_dataset.csv', n_samples: Optional[int] = None,
+                             chunk_size: int = 100000, n_jobs: int = 1) -> int:
+        """Stream a dataset of any size to CSV or Parquet with bounded memory; for CSV, workers also format the text"""
+        n_rows = 0
+        if is_parquet(filename):
+            with ParquetChunkWriter(filename) as writer:
+                for chunk in self._run_chunks(_generate_chunk, n_samples, chunk_size, n_jobs):
+                    writer.write(chunk)
+                    n_rows += len(chunk)
+            print(f"\n✅ Dataset saved with {n_rows} samples to {filename}")
+            return n_rows
+        
+        with open(filename, 'wb') as f:
+            f.write((','.join(COLUMN_ORDER) + '\n').encode())
+            for csv_bytes, rows in self._run_chunks(_generate_csv_chunk, n_samples, chunk_size, n_jobs):
+                f.write(csv_bytes)
+                n_rows += rows
+        print(f"\n✅ Dataset saved with {n_rows} samples to {filename}")
+        return n_rows
+    
+    def _run_chunks(self, work, n_samples, chunk_size, n_jobs):
+        """Run one task per chunk in order, in-process or across processes with a bounded window"""
+        n_samples = self.n_samples if n_samples is None else n_samples
+        created_at = datetime.now()
+        tasks = [(self.random_state, index, min(chunk_size, n_samples - start), created_at)
+                 for index, start in enumerate(range(0, n_samples, chunk_size))]
+        
+        if n_jobs == 1:
+            for task in tasks:
+                yield work(*task)
+            return
+        
+        n_jobs = n_jobs if n_jobs > 0 else os.cpu_count()
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            # At most 2 * n_jobs chunks in flight, so memory stays bounded however many rows are requested
+            pending = []
+            for task in tasks:
+                pending.append(executor.submit(work, *task))
+                if len(pending) >= 2 * n_jobs:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
+
+
+def _generate_chunk(random_state: int, chunk_index: int, size: int, created_at: datetime) -> pd.DataFrame:
+    """One reproducible block of students, drawn with its own numpy Generator"""
+    rng = np.random.default_rng(np.random.SeedSequence(random_state, spawn_key=(chunk_index,)))
+    
+    # Patterned features: every value independently comes from a high/average/low performer distribution
+    means = np.array(list(PATTERN_FEATURES.values()), dtype=np.float64).T        # (3 archetypes, features)
+    spread = np.array(ARCHETYPE_SPREAD)
+    archetypes = rng.choice(3, size=(size, means.shape[1]), p=ARCHETYPE_SHARES)
+    mean = means[archetypes, np.arange(means.shape[1])]
+    values = mean + mean * spread[archetypes, 0] * rng.standard_normal((size, means.shape[1]))
+    np.clip(values, mean * spread[archetypes, 1], mean * spread[archetypes, 2], out=values)
+    
+    data = {name: values[:, i] for i, name in enumerate(PATTERN_FEATURES)}
+    data['faculty_support'] = rng.normal(7, 1.5, size).clip(3, 10)
+    data['school_resources'] = rng.normal(6, 1.5, size).clip(2, 10)
+    data['age'] = rng.integers(18, 25, size)
+    data['gender'] = pd.Categorical.from_codes((rng.random(size) >= 0.48).astype(np.int8), ['Male', 'Female'])
+    data['extracurricular_hours'] = rng.poisson(5, size).clip(0, 20)
+    
+    data['final_score'] = StudentDataGenerator._calculate_strong_scores(data, rng=rng)
+    data['performance_level'] = StudentDataGenerator._categorize_performance(data['final_score'])
+    
+    df = pd.DataFrame(data, columns=COLUMN_ORDER[:-1])
+    df['created_at'] = created_at
+    return df
+
+
+def _generate_csv_chunk(random_state: int, chunk_index: int, size: int, created_at: datetime):
+    """Generate a block and render it as CSV bytes (without header) in the worker"""
+    df = _generate_chunk(random_state, chunk_index, size, created_at)
+    return df.to_csv(header=False, index=False).encode(), len(df)
+
 # Generate sample data
 if __name__ == "__main__":
-    generator = StudentDataGenerator(n_samples=5000)
-    df = generator.save_dataset()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Generate a synthetic student dataset')
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--output', default='data/student_dataset.csv')
+    parser.add_argument('--chunk-size', type=int, default=0, help='stream in chunks of this many rows (0: single DataFrame)')
+    parser.add_argument('--jobs', type=int, default=1, help='worker processes for chunked mode (0: one per core)')
+    args = parser.parse_args()
+    
+    generator = StudentDataGenerator(n_samples=args.rows)
+    if args.chunk_size:
+        generator.save_dataset_chunked(args.output, chunk_size=args.chunk_size, n_jobs=args.jobs)
+    else:
+        df = generator.save_dataset(args.output)
\ No newline at end of file
@@ -0,0 +1,140 @@
+import os
+import pandas as pd
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: CSV keeps working without it
+    pa = None
+    pq = None
+
+# On-disk types of the generated dataset. Features are float32, the precision the boosters split on;
+# categoricals are dictionary-encoded in Parquet.
+DATASET_SCHEMA = {
+    'study_hours_daily': 'float32',
+    'attendance_rate': 'float32',
+    'homework_completion': 'float32',
+    'class_participation': 'float32',
+    'assignment_quality': 'float32',
+    'working_memory': 'float32',
+    'critical_thinking': 'float32',
+    'academic_aptitude': 'float32',
+    'time_management': 'float32',
+    'study_consistency': 'float32',
+    'motivation_level': 'float32',
+    'sleep_hours': 'float32',
+    'stress_management': 'float32',
+    'focus_concentration': 'float32',
+    'peer_support': 'float32',
+    'faculty_support': 'float32',
+    'school_resources': 'float32',
+    'age': 'int16',
+    'gender': 'category',
+    'extracurricular_hours': 'int16',
+    'final_score': 'float64',
+    'performance_level': 'category',
+    'created_at': 'datetime64[ns]',
+}
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+PARQUET_COMPRESSION = 'zstd'
+
+
+def is_parquet(path: str) -> bool:
+    """Format is chosen by file extension"""
+    return path.lower().endswith(PARQUET_EXTENSIONS)
+
+
+def require_pyarrow():
+    """Fail with an actionable message when Parquet is requested without pyarrow"""
+    if pa is None:
+        raise ImportError("Parquet datasets need pyarrow: pip install pyarrow")
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str] = DATASET_SCHEMA) -> pd.DataFrame:
+    """Cast the known columns to their on-disk types; other columns are left as they are"""
+    return df.astype({col: dtype for col, dtype in schema.items() if col in df.columns})
+
+
+def write_dataset(df: pd.DataFrame, path: str):
+    """Write CSV or typed, compressed Parquet depending on the extension"""
+    if is_parquet(path):
+        require_pyarrow()
+        apply_schema(df).to_parquet(path, index=False, compression=PARQUET_COMPRESSION)
+    else:
+        df.to_csv(path, index=False)
+
+
+def _csv_dtypes(path: str, columns: Optional[List[str]], float_dtype: Optional[str]) -> Dict[str, str]:
+    """Schema types for the CSV columns being read, with float32 features widened to float_dtype if given"""
+    header = pd.read_csv(path, nrows=0).columns
+    return {col: float_dtype if float_dtype and dtype == 'float32' else dtype
+            for col, dtype in DATASET_SCHEMA.items()
+            if col in header and dtype != 'datetime64[ns]' and (columns is None or col in columns)}
+
+
+def read_dataset(path: str, columns: Optional[List[str]] = None, float_dtype: Optional[str] = None) -> pd.DataFrame:
+    """Read only the requested columns in the schema's types; float_dtype overrides the float32 features"""
+    if is_parquet(path):
+        require_pyarrow()
+        df = pd.read_parquet(path, columns=columns)
+        if float_dtype:
+            df = df.astype({col: float_dtype for col in df.columns if df[col].dtype == 'float32'})
+        return df
+    return pd.read_csv(path, usecols=columns, dtype=_csv_dtypes(path, columns, float_dtype))
+
+
+def iter_dataset_chunks(path: str, columns: Optional[List[str]] = None,
+                        chunk_size: int = 100000) -> Iterator[pd.DataFrame]:
+    """Fixed-size DataFrame chunks, typed like read_dataset, without loading the whole file"""
+    if is_parquet(path):
+        require_pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+        return
+    yield from pd.read_csv(path, usecols=columns, dtype=_csv_dtypes(path, columns, None), chunksize=chunk_size)
+
+
+def dataset_columns(path: str) -> List[str]:
+    """Column names without reading any data"""
+    if is_parquet(path):
+        require_pyarrow()
+        return pq.read_schema(path).names
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+class ParquetChunkWriter:
+    """Appends DataFrame chunks to one Parquet file, one row group per chunk"""
+
+    def __init__(self, path: str):
+        require_pyarrow()
+        self.path = path
+        self._writer = None
+
+    def write(self, df: pd.DataFrame):
+        table = pa.Table.from_pandas(apply_schema(df), preserve_index=False)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema, compression=PARQUET_COMPRESSION)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Convert an existing dataset, e.g. python -m ml.dataset_io data/student_dataset.csv data/student_dataset.parquet
+if __name__ == "__main__":
+    import sys
+
+    source, target = sys.argv[1], sys.argv[2]
+    df = read_dataset(source)
+    write_dataset(df, target)
+    print(f"✅ Converted {len(df)} rows: {source} ({os.path.getsize(source) / 1e6:.1f} MB) -> "
+          f"{target} ({os.path.getsize(target) / 1e6:.1f} MB)")
@@ -0,0 +1,68 @@
+import numpy as np
+from typing import Dict, List, Any, Tuple
+from ml.compiled_forest import CompiledForest
+
+# Features listed per student in feature_impact and feature_contributions
+TOP_FEATURES = 10
+
+# Rows per pass when attributing a whole reference set at training time
+BASELINE_CHUNK_ROWS = 512
+
+
+def feature_label(column: str) -> str:
+    """Display name of a feature column, e.g. study_hours_daily -> Study Hours Daily"""
+    return column.replace('_', ' ').title()
+
+
+def impact_shares(magnitudes: np.ndarray, feature_columns: List[str], top: int = TOP_FEATURES) -> Dict[str, float]:
+    """Each feature's share (in %) of the total absolute attribution, largest first"""
+    total = float(np.sum(magnitudes))
+    if total <= 0:
+        return {}
+    order = np.argsort(-magnitudes, kind='stable')[:top]
+    return {feature_label(feature_columns[i]): round(float(magnitudes[i]) / total * 100, 1) for i in order}
+
+
+class FeatureExplainer:
+    """Attributions of the ensemble score (the mean of the regressors) to the input features"""
+
+    def __init__(self, forest: CompiledForest, feature_columns: List[str]):
+        self.forest = forest
+        self.feature_columns = list(feature_columns)
+
+    def explain(self, X: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Score-point attributions (n, n_features) and the expected score they start from"""
+        contributions, expected = self.forest.regression_contributions(X)
+        return contributions.mean(axis=0), float(expected.mean())
+
+    def explain_students(self, X: np.ndarray) -> List[Dict[str, Any]]:
+        """Per-row feature_impact shares and signed feature_contributions, as the API returns them"""
+        contributions, expected = self.explain(X)
+        explanations = []
+        for row in contributions:
+            magnitudes = np.abs(row)
+            order = np.argsort(-magnitudes, kind='stable')[:TOP_FEATURES]
+            explanations.append({
+                'feature_impact': impact_shares(magnitudes, self.feature_columns),
+                'feature_contributions': {
+                    'baseline_score': round(expected, 1),
+                    'contributions': {feature_label(self.feature_columns[i]): round(float(row[i]), 2)
+                                      for i in order}
+                }
+            })
+        return explanations
+
+    def global_baseline(self, X: np.ndarray) -> Dict[str, Any]:
+        """Mean absolute attribution per feature over a reference set, stored with the model at training time"""
+        X = np.asarray(X, dtype=np.float64)
+        totals = np.zeros(len(self.feature_columns))
+        expected = 0.0
+        for start in range(0, len(X), BASELINE_CHUNK_ROWS):
+            contributions, expected = self.explain(X[start:start + BASELINE_CHUNK_ROWS])
+            totals += np.abs(contributions).sum(axis=0)
+        return {
+            'expected_score': expected,
+            'rows': int(len(X)),
+            'mean_abs_contribution': {col: float(total / max(len(X), 1))
+                                      for col, total in zip(self.feature_columns, totals)}
+        }
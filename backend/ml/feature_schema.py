@@ -0,0 +1,230 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Tuple
+
+# Frontend (camelCase) request fields mapped to dataset columns
+FIELD_MAPPING = {
+    # Cognitive Abilities
+    'cognitiveAbility': 'cognitive_ability',
+    'workingMemory': 'working_memory',
+    'processingSpeed': 'processing_speed', 
+    'verbalReasoning': 'verbal_reasoning',
+    'quantitativeReasoning': 'quantitative_reasoning',
+
+    # Academic Behaviors
+    'studyHoursDaily': 'study_hours_daily',
+    'attendanceRate': 'attendance_rate',
+    'homeworkCompletion': 'homework_completion',
+    'classParticipation': 'class_participation',
+    'assignmentQuality': 'assignment_quality',
+    'noteTakingQuality': 'note_taking_quality',
+    'studyConsistency': 'study_consistency',
+    'academicSelfEfficacy': 'academic_self_efficacy',
+
+    # Learning Strategies
+    'metacognitionSkills': 'metacognition_skills',
+    'criticalThinking': 'critical_thinking',
+    'timeManagement': 'time_management',
+    'learningAdaptability': 'learning_adaptability',
+    'informationSynthesis': 'information_synthesis',
+
+    # Personal Wellbeing
+    'sleepHours': 'sleep_hours',
+    'sleepQuality': 'sleep_quality',
+    'motivationLevel': 'motivation_level',
+    'stressManagement': 'stress_management',
+    'resilience': 'resilience',
+    'focusConcentration': 'focus_concentration',
+    'procrastinationTendency': 'procrastination_tendency',
+    'academicAnxiety': 'academic_anxiety',
+
+    # Support & Environment
+    'peerAcademicSupport': 'peer_academic_support',
+    'facultySupport': 'faculty_support',
+    'learningEnvironmentQuality': 'learning_environment_quality',
+    'technologyAccess': 'technology_access',
+    'financialStability': 'financial_stability',
+
+    # Background Info
+    'age': 'age',
+    'gender': 'gender',
+    'firstGeneration': 'first_generation',
+    'transferStudent': 'transfer_student',
+    'employmentHours': 'employment_hours',
+    'commuteTimeMinutes': 'commute_time_minutes',
+    'extracurricularHours': 'extracurricular_hours',
+    'academicMajor': 'academic_major',
+}
+
+# Balanced defaults used when a request field is missing or null
+DEFAULT_VALUES = {
+    # Cognitive Abilities
+    'cognitive_ability': 100,
+    'working_memory': 6,
+    'processing_speed': 6,
+    'verbal_reasoning': 6,
+    'quantitative_reasoning': 6,
+
+    # Academic Behaviors
+    'study_hours_daily': 4.5,
+    'attendance_rate': 80.0,
+    'homework_completion': 75.0,
+    'class_participation': 6,
+    'assignment_quality': 7,
+    'note_taking_quality': 6,
+    'study_consistency': 6,
+    'academic_self_efficacy': 7,
+
+    # Learning Strategies
+    'metacognition_skills': 6,
+    'critical_thinking': 7,
+    'time_management': 6,
+    'learning_adaptability': 7,
+    'information_synthesis': 6,
+
+    # Personal Wellbeing
+    'sleep_hours': 7.0,
+    'sleep_quality': 7,
+    'motivation_level': 7,
+    'stress_management': 6,
+    'resilience': 7,
+    'focus_concentration': 7,
+    'procrastination_tendency': 5,
+    'academic_anxiety': 4,
+
+    # Support & Environment
+    'peer_academic_support': 6,
+    'faculty_support': 6,
+    'learning_environment_quality': 7,
+    'technology_access': 8,
+    'financial_stability': 6,
+
+    # Background Info
+    'age': 20,
+    'gender': 'Male',
+    'first_generation': 0,
+    'transfer_student': 0,
+    'employment_hours': 10,
+    'commute_time_minutes': 25,
+    'extracurricular_hours': 5,
+    'academic_major': 'STEM'
+}
+
+CATEGORICAL_COLUMNS = ['gender', 'academic_major']
+BINARY_COLUMNS = ['first_generation', 'transfer_student']
+
+
+class FeatureSchema:
+    """Precompiled request-to-feature-row layout, built once per loaded model"""
+    
+    def __init__(self, feature_columns: List[str], encoders: Dict[str, Any]):
+        self.feature_columns = list(feature_columns)
+        self.n_features = len(self.feature_columns)
+        column_index = {col: idx for idx, col in enumerate(self.feature_columns)}
+        
+        # Categorical codes resolved once from the fitted label encoders
+        self.category_codes = {}
+        for col in CATEGORICAL_COLUMNS:
+            if col in encoders:
+                self.category_codes[col] = {label: code for code, label in enumerate(encoders[col].classes_)}
+        
+        self.column_index = column_index
+        
+        # Default row: balanced defaults for mapped columns, 0 for everything else
+        self.default_row = np.zeros(self.n_features, dtype=np.float32)
+        
+        # (request field, column index, category codes, is binary) for every mapped feature column
+        self.slots = []
+        for frontend_field, dataset_field in FIELD_MAPPING.items():
+            if dataset_field not in column_index:
+                continue
+            idx = column_index[dataset_field]
+            codes = self.category_codes.get(dataset_field)
+            default = DEFAULT_VALUES.get(dataset_field, 0)
+            self.default_row[idx] = codes.get(default, 0) if codes is not None else default
+            self.slots.append((frontend_field, idx, codes, dataset_field in BINARY_COLUMNS))
+        self.field_slots = {field: (idx, codes, is_binary) for field, idx, codes, is_binary in self.slots}
+    
+    def transform(self, student_data: Dict[str, Any]) -> np.ndarray:
+        """Convert one request dict into a float32 feature row in training column order"""
+        row = self.default_row.copy()
+        self._fill_row(row, student_data)
+        return row
+    
+    def transform_batch(self, students: List[Dict[str, Any]], out: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Convert many request dicts into a (n_students, n_features) float32 block; returns (X, invalid row mask)"""
+        if out is None:
+            out = np.empty((len(students), self.n_features), dtype=np.float32)
+        out[:] = self.default_row
+        invalid = np.zeros(len(students), dtype=bool)
+        for i, (row, student_data) in enumerate(zip(out, students)):
+            try:
+                self._fill_row(row, student_data)
+            except ValueError:
+                # One malformed student must not fail the batch; its row is reset and flagged
+                row[:] = self.default_row
+                invalid[i] = True
+        return out, invalid
+    
+    def _fill_row(self, row: np.ndarray, student_data: Dict[str, Any]):
+        """Write the provided (non-null) request fields into a preallocated row"""
+        for frontend_field, idx, codes, is_binary in self.slots:
+            value = student_data.get(frontend_field)
+            if value is None:
+                continue
+            try:
+                if codes is not None:
+                    row[idx] = codes.get(value, 0)  # Unknown categories encode as 0
+                elif is_binary:
+                    row[idx] = int(value)
+                else:
+                    row[idx] = value
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for {frontend_field}: {value!r}") from None
+    
+    def encode_values(self, frontend_field: str, values: List[Any]) -> Tuple[int, np.ndarray]:
+        """Column index of a request field and the given values encoded as _fill_row would write them"""
+        if frontend_field not in self.field_slots:
+            raise ValueError(f"Unknown feature: {frontend_field}")
+        idx, codes, is_binary = self.field_slots[frontend_field]
+        if codes is not None:
+            encoded = [codes.get(value, 0) for value in values]  # Unknown categories encode as 0
+        elif is_binary:
+            encoded = [int(value) for value in values]
+        else:
+            encoded = [float(value) for value in values]
+        return idx, np.asarray(encoded, dtype=np.float32)
+    
+    def transform_frame(self, frame: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vectorized conversion of rows keyed by dataset column names; returns (X, invalid row mask, row errors)"""
+        out = np.tile(self.default_row, (len(frame), 1))
+        invalid = np.zeros(len(frame), dtype=bool)
+        errors = np.full(len(frame), None, dtype=object)
+        for col, idx in self.column_index.items():
+            if col not in frame.columns:
+                continue
+            values = frame[col]
+            if values.dtype == object:
+                # Lists and objects (from NDJSON) can neither be looked up as categories nor parsed as numbers
+                scalar = values.map(pd.api.types.is_scalar).to_numpy(dtype=bool)
+                if not scalar.all():
+                    self._flag_rows(invalid, errors, ~scalar, col, values)
+                    values = values.where(scalar)
+            present = values.notna().to_numpy()
+            codes = self.category_codes.get(col)
+            if codes is not None:
+                column = values.map(codes).fillna(0).to_numpy(dtype=np.float32)  # Unknown categories encode as 0
+            else:
+                column = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float32)
+                self._flag_rows(invalid, errors, present & np.isnan(column), col, values)
+                if col in BINARY_COLUMNS:
+                    column = np.trunc(column)
+            out[present, idx] = column[present]
+        return out, invalid, errors
+    
+    def _flag_rows(self, invalid: np.ndarray, errors: np.ndarray, bad: np.ndarray, col: str, values: pd.Series):
+        """Mark rows invalid, keeping the first offending column of each as its error"""
+        first = np.flatnonzero(bad & ~invalid)
+        for i in first:
+            errors[i] = f"Invalid value for {col}: {values.iat[i]!r}"
+        invalid[first] = True
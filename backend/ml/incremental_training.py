@@ -0,0 +1,271 @@
+import os
+import tempfile
+import time
+import numpy as np
+import xgboost as xgb
+import lightgbm as lgb
+from catboost import CatBoostRegressor
+from sklearn.preprocessing import LabelEncoder
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from ml.dataset_io import dataset_columns, iter_dataset_chunks
+from ml.model_store import LightGBMBoosterModel, ModelStore, XGBoostBoosterModel, load_artifacts
+from ml.model_trainer import XGBOOST_NATIVE_NAMES, ModelTrainer, training_threads
+
+
+class _ChunkIter(xgb.DataIter):
+    """Feeds batches (input_data keyword arguments) to XGBoost, which caches them as on-disk pages"""
+
+    def __init__(self, make_batches, cache_prefix: str):
+        self._make_batches = make_batches
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> int:
+        if self._batches is None:
+            self._batches = self._make_batches()
+        batch = next(self._batches, None)
+        if batch is None:
+            return 0
+        input_data(**batch)
+        return 1
+
+    def reset(self):
+        self._batches = None
+
+
+class OutOfCoreTrainer(ModelTrainer):
+    """Trains the ensemble from a chunked dataset with bounded memory, or continues saved models on new data"""
+
+    def __init__(self, chunk_size: int = 100000, test_size: float = 0.2, max_eval_rows: int = 100000,
+                 random_state: int = 42, n_threads: Optional[int] = None, external_memory: bool = False,
+                 cache_dir: Optional[str] = None, params: Optional[Dict[str, Dict[str, Any]]] = None):
+        super().__init__(params)
+        self.chunk_size = chunk_size
+        self.test_size = test_size
+        self.max_eval_rows = max_eval_rows
+        self.random_state = random_state
+        self.n_threads = n_threads or training_threads()
+        self.external_memory = external_memory
+        self.cache_dir = cache_dir
+        self.categorical_features = []
+        self.n_chunks = 0
+        self.class_weights = None
+
+    def scan_dataset(self, data_path: str, encoders: Optional[Dict[str, Any]] = None,
+                     feature_columns: Optional[List[str]] = None):
+        """One pass over the categorical columns: feature layout, encoders, chunk count and class weights"""
+        columns = dataset_columns(data_path)
+        sample = next(iter_dataset_chunks(data_path, columns=columns, chunk_size=1000))
+        numerical_features, categorical_features = self._feature_types(sample)
+        self.feature_columns = feature_columns or numerical_features + categorical_features
+        self.categorical_features = [col for col in self.feature_columns if col in categorical_features]
+
+        labels = {col: set() for col in self.categorical_features + ['performance_level']}
+        class_counts = {}
+        n_rows = n_train = 0
+        self.n_chunks = 0
+        for chunk in iter_dataset_chunks(data_path, columns=list(labels), chunk_size=self.chunk_size):
+            for col, seen in labels.items():
+                seen.update(chunk[col].unique())
+            train_mask = ~self._held_out(self.n_chunks, len(chunk))
+            for label, count in chunk['performance_level'][train_mask].value_counts().items():
+                if count:
+                    class_counts[label] = class_counts.get(label, 0) + int(count)
+            n_rows += len(chunk)
+            n_train += int(train_mask.sum())
+            self.n_chunks += 1
+
+        # Saved encoders are kept when continuing, so codes keep their meaning
+        if encoders:
+            self.encoders = dict(encoders)
+        else:
+            for col, seen in labels.items():
+                self.encoders[col] = LabelEncoder().fit(np.array(sorted(seen), dtype=object))
+
+        # Same 'balanced' weights compute_class_weight gives the in-memory trainer, indexed by class code
+        self.class_weights = np.ones(len(self.encoders['performance_level'].classes_))
+        for label, count in class_counts.items():
+            code = self.encoders['performance_level'].transform([label])[0]
+            self.class_weights[code] = n_train / (len(class_counts) * count)
+
+        print(f"📁 Scanned {n_rows} samples in {self.n_chunks} chunks of up to {self.chunk_size}")
+        print(f"🔧 Features: {len(self.feature_columns)} ({len(self.categorical_features)} categorical)")
+
+    def _held_out(self, chunk_index: int, size: int) -> np.ndarray:
+        """Evaluation rows of a chunk; seeded by chunk index so every pass makes the same split"""
+        rng = np.random.default_rng([self.random_state, chunk_index])
+        return rng.random(size) < self.test_size
+
+    def _encode(self, chunk) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """float32 feature matrix plus regression and encoded classification targets"""
+        X = np.empty((len(chunk), len(self.feature_columns)), dtype=np.float32)
+        for j, col in enumerate(self.feature_columns):
+            if col in self.categorical_features:
+                X[:, j] = self.encoders[col].transform(chunk[col].astype(object))
+            else:
+                X[:, j] = chunk[col].to_numpy(dtype=np.float32)
+        y_reg = chunk['final_score'].to_numpy(dtype=np.float64)
+        y_clf = self.encoders['performance_level'].transform(chunk['performance_level'].astype(object))
+        return X, y_reg, np.asarray(y_clf)
+
+    def iter_training_chunks(self, data_path: str) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Training rows of each chunk; only one chunk is in memory at a time"""
+        columns = self.feature_columns + ['final_score', 'performance_level']
+        for i, chunk in enumerate(iter_dataset_chunks(data_path, columns=columns, chunk_size=self.chunk_size)):
+            train_mask = ~self._held_out(i, len(chunk))
+            X, y_reg, y_clf = self._encode(chunk)
+            yield X[train_mask], y_reg[train_mask], y_clf[train_mask]
+
+    def evaluation_rows(self, data_path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Held-out rows, capped at max_eval_rows"""
+        columns = self.feature_columns + ['final_score', 'performance_level']
+        parts, n_rows = [], 0
+        for i, chunk in enumerate(iter_dataset_chunks(data_path, columns=columns, chunk_size=self.chunk_size)):
+            held_out = self._held_out(i, len(chunk))
+            X, y_reg, y_clf = self._encode(chunk[held_out])
+            take = min(len(X), self.max_eval_rows - n_rows)
+            parts.append((X[:take], y_reg[:take], y_clf[:take]))
+            n_rows += take
+            if n_rows >= self.max_eval_rows:
+                break
+        return tuple(np.concatenate(part) for part in zip(*parts))
+
+    def train_from_chunks(self, data_path: str, init_models: Optional[Dict[str, Dict[str, Any]]] = None,
+                          rounds: Optional[int] = None):
+        """Fit (or, given init_models, continue) every ensemble member from chunked data"""
+        init_models = init_models or {'regression': {}, 'classification': {}}
+        start = time.perf_counter()
+
+        print(f"🔥 Training from {self.n_chunks} chunks with {self.n_threads} threads...")
+        with tempfile.TemporaryDirectory(dir=self.cache_dir) as cache_dir:
+            self._timed('xgboost_regression', lambda: self._fit_xgboost(
+                'xgboost_regression', data_path, cache_dir, init_models['regression'].get('xgboost'), rounds))
+            self._timed('xgboost_classification', lambda: self._fit_xgboost(
+                'xgboost_classification', data_path, cache_dir, init_models['classification'].get('xgboost'), rounds))
+        self._timed('catboost_regression', lambda: self._fit_catboost(
+            data_path, init_models['regression'].get('catboost'), rounds))
+        self._timed('lightgbm_classification', lambda: self._fit_lightgbm(
+            data_path, init_models['classification'].get('lightgbm'), rounds))
+
+        # Same registration order as the in-memory trainer
+        self.regression_models = {name: self.regression_models[name] for name in ('xgboost', 'catboost')}
+        self.classification_models = {name: self.classification_models[name] for name in ('lightgbm', 'xgboost')}
+        self.timings['total'] = time.perf_counter() - start
+        print(f"✅ Training wall time: {self.timings['total']:.2f}s")
+
+        self._evaluate_models(*self.evaluation_rows(data_path))
+
+    def _timed(self, key: str, fit):
+        """Run one fit, register the model and record its wall time"""
+        start = time.perf_counter()
+        model = fit()
+        self.timings[key] = time.perf_counter() - start
+        name, task = key.split('_')
+        models = self.regression_models if task == 'regression' else self.classification_models
+        models[name] = model
+        print(f"  ⏱️  {name.upper():<10} {task:<14} | {self.timings[key]:6.2f}s on {self.n_threads} threads")
+
+    def _rounds_per_chunk(self, key: str, rounds: Optional[int]) -> List[int]:
+        """Trees added by each chunk in the chunk-wise boosters, summing to exactly the full model's count"""
+        total = rounds or self.params[key].get('n_estimators') or self.params[key]['iterations']
+        n_chunks = max(self.n_chunks, 1)
+        return [total // n_chunks + (1 if i < total % n_chunks else 0) for i in range(n_chunks)]
+
+    def _fit_xgboost(self, key: str, data_path: str, cache_dir: str, init_model, rounds: Optional[int]):
+        """Chunks are streamed into a quantized matrix (one byte per value), or into on-disk pages"""
+        task = key.split('_')[1]
+        if task == 'regression':
+            batches = lambda: ({'data': X, 'label': y_reg} for X, y_reg, _ in self.iter_training_chunks(data_path))
+        else:
+            # Unweighted, like the in-memory trainer's XGBoost classifier; only LightGBM is class-weighted
+            batches = lambda: ({'data': X, 'label': y_clf} for X, _, y_clf in self.iter_training_chunks(data_path))
+        if self.external_memory:
+            # Memory stays flat for any dataset size, at the cost of re-reading pages every round
+            data = xgb.DMatrix(_ChunkIter(batches, os.path.join(cache_dir, key)))
+        else:
+            data = xgb.QuantileDMatrix(_ChunkIter(batches, None), max_bin=256)
+
+        params = {XGBOOST_NATIVE_NAMES.get(name, name): value for name, value in self.params[key].items()
+                  if name != 'n_estimators'}
+        params.update({'tree_method': 'hist', 'nthread': self.n_threads})
+        if task == 'classification':
+            n_classes = len(self.encoders['performance_level'].classes_)
+            params.update({'objective': 'multi:softprob', 'num_class': n_classes})
+        else:
+            params['objective'] = 'reg:squarederror'
+
+        booster = xgb.train(params, data, num_boost_round=rounds or self.params[key]['n_estimators'],
+                            xgb_model=init_model.get_booster() if init_model is not None else None)
+
+        return XGBoostBoosterModel(booster, task)
+
+    def _fit_catboost(self, data_path: str, init_model, rounds: Optional[int]):
+        """Chunk-wise boosting: each chunk adds trees on top of the model so far"""
+        per_chunk = self._rounds_per_chunk('catboost_regression', rounds)
+        params = {**self.params['catboost_regression'], 'thread_count': self.n_threads}
+        model = init_model
+        for (X, y_reg, _), chunk_rounds in zip(self.iter_training_chunks(data_path), per_chunk):
+            if chunk_rounds:
+                model = CatBoostRegressor(**{**params, 'iterations': chunk_rounds}).fit(X, y_reg, init_model=model)
+        return model
+
+    def _fit_lightgbm(self, data_path: str, init_model, rounds: Optional[int]):
+        """Chunk-wise boosting with class weights applied as sample weights"""
+        per_chunk = self._rounds_per_chunk('lightgbm_classification', rounds)
+        params = {name: value for name, value in self.params['lightgbm_classification'].items()
+                  if name != 'n_estimators'}
+        params.update({'objective': 'multiclass', 'num_class': len(self.encoders['performance_level'].classes_),
+                       'n_jobs': self.n_threads})
+        booster = init_model.booster_ if init_model is not None else None
+        for (X, _, y_clf), chunk_rounds in zip(self.iter_training_chunks(data_path), per_chunk):
+            if chunk_rounds:
+                booster = lgb.train(params, lgb.Dataset(X, y_clf, weight=self.class_weights[y_clf]),
+                                    num_boost_round=chunk_rounds, init_model=booster, keep_training_booster=True)
+        return LightGBMBoosterModel(booster, 'classification')
+
+    def train(self, data_path: str):
+        """Full out-of-core training run"""
+        self.scan_dataset(data_path)
+        self.train_from_chunks(data_path)
+
+    def continue_training(self, model_dir: str, data_path: str, rounds: int = 50):
+        """Add `rounds` trees per model, fitted on new data, to a saved model version"""
+        bundle = load_artifacts(model_dir)
+        self.scan_dataset(data_path, encoders=bundle['encoders'], feature_columns=bundle['feature_columns'])
+        print(f"🔁 Continuing {bundle['manifest']['version']} with {rounds} more trees per model")
+        self.train_from_chunks(data_path, init_models={'regression': bundle['regression_models'],
+                                                       'classification': bundle['classification_models']},
+                               rounds=rounds)
+
+
+# e.g. python -m ml.incremental_training --data data/large.parquet --chunk-size 100000
+#      python -m ml.incremental_training --data data/new_term.parquet --continue-from current --rounds 50
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train or continue the ensemble from chunked data")
+    parser.add_argument('--data', required=True, help='CSV or Parquet dataset')
+    parser.add_argument('--models-root', default='models/')
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--continue-from', help="model version to continue, or 'current'")
+    parser.add_argument('--rounds', type=int, default=50, help='trees added per model when continuing')
+    parser.add_argument('--external-memory', action='store_true',
+                        help='page XGBoost training data to disk instead of keeping it quantized in memory')
+    parser.add_argument('--promote', action='store_true', help='make the new version the serving one')
+    args = parser.parse_args()
+
+    store = ModelStore(args.models_root)
+    trainer = OutOfCoreTrainer(chunk_size=args.chunk_size, external_memory=args.external_memory)
+    if args.continue_from:
+        base_dir = (store.resolve_model_dir() if args.continue_from == 'current'
+                    else store.version_dir(args.continue_from))
+        trainer.continue_training(base_dir, args.data, rounds=args.rounds)
+    else:
+        trainer.train(args.data)
+
+    version = store.new_version()
+    trainer.save_models(store.version_dir(version))
+    if args.promote:
+        store.set_current(version)
+        print(f"🚀 Version {version} is now current")
@@ -0,0 +1,131 @@
+import bisect
+import threading
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+# Latency buckets in seconds, 50µs to 2.5s: per-stage timings sit at the low end, whole requests higher up
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# name -> (type, help); every metric the service reports is declared here
+METRICS = {
+    'stage_duration_seconds': ('histogram', 'Time spent per prediction pipeline stage'),
+    'model_duration_seconds': ('histogram', 'Time spent in each model call'),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by endpoint'),
+    'http_requests_total': ('counter', 'HTTP requests by endpoint and status code'),
+    'prediction_errors_total': ('counter', 'Predictions that failed inside the predictor'),
+    'model_errors_total': ('counter', 'Model calls that raised and were dropped from the ensemble'),
+    'students_scored_total': ('counter', 'Students scored, across single, batch and streaming requests'),
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe is a bisect and three additions"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """Counts per upper bound, +Inf last, as the exposition format expects"""
+        total, out = 0, []
+        for count in self.counts:
+            total += count
+            out.append(total)
+        return out
+
+
+class MetricsRegistry:
+    """Per-process counters and histograms, rendered in the Prometheus text exposition format"""
+
+    def __init__(self, namespace: str = 'edupredict', buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = buckets
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record one timing in the named histogram"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        """Add to the named counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self, extra: Optional[Iterable[Tuple[str, str, str, Dict[str, Any], float]]] = None) -> str:
+        """Text exposition of every series, plus values read elsewhere given as (name, type, help, labels, value)"""
+        with self._lock:
+            histograms = [(key, list(h.cumulative()), h.sum, h.count) for key, h in self._histograms.items()]
+            counters = list(self._counters.items())
+
+        lines = []
+        declared = set()
+
+        def declare(name, kind, help_text):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), cumulative, total, count in sorted(histograms):
+            full_name = f'{self.namespace}_{name}'
+            declare(full_name, 'histogram', METRICS.get(name, ('', name))[1])
+            for bound, value in zip(list(self.buckets) + ['+Inf'], cumulative):
+                lines.append(f'{full_name}_bucket{_labels(labels + (("le", _number(bound)),))} {value}')
+            lines.append(f'{full_name}_sum{_labels(labels)} {_number(total)}')
+            lines.append(f'{full_name}_count{_labels(labels)} {count}')
+
+        for (name, labels), value in sorted(counters):
+            full_name = f'{self.namespace}_{name}'
+            declare(full_name, 'counter', METRICS.get(name, ('', name))[1])
+            lines.append(f'{full_name}{_labels(labels)} {_number(value)}')
+
+        for name, kind, help_text, labels, value in extra or ():
+            full_name = f'{self.namespace}_{name}'
+            declare(full_name, kind, help_text)
+            lines.append(f'{full_name}{_labels(tuple(sorted(labels.items())))} {_number(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels: Tuple[Tuple[str, Any], ...]) -> str:
+    """{name="value",...} with the format's escaping, or nothing"""
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _number(value) -> str:
+    """Integral values without a trailing .0, +Inf as is"""
+    if isinstance(value, str):
+        return value
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Shared by the predictor, rule engine and app in this process; each gunicorn worker keeps its own
+metrics = MetricsRegistry()
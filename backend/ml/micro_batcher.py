@@ -0,0 +1,124 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+
+class MicroBatcher:
+    """Coalesces concurrent single predictions into one vectorized batch call"""
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]], run_single: Optional[Callable[[Any], Any]] = None,
+                 max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.run_batch = run_batch
+        self.run_single = run_single or (lambda item: run_batch([item])[0])
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.fallbacks = 0
+        self.largest_batch = 0
+        self.total_wait_ms = 0.0
+        self.batch_size_counts = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS + [float('inf')]}
+
+    def submit(self, item: Any) -> Future:
+        """Queue one item; the returned future resolves with its own result"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def predict(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Submit and wait for one item"""
+        return self.submit(item).result(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and batch-size metrics for health and metrics endpoints"""
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait_seconds * 1000,
+                'batches': self.batches,
+                'items': self.items,
+                'fallbacks': self.fallbacks,
+                'largest_batch': self.largest_batch,
+                'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+                'avg_queue_wait_ms': round(self.total_wait_ms / self.items, 3) if self.items else 0.0,
+                'batch_size_histogram': {str(bucket): count for bucket, count in self.batch_size_counts.items()}
+            }
+
+    def _ensure_worker(self):
+        """Start the collector thread lazily, once per process (threads do not survive fork)"""
+        if self._worker is not None and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def _run(self):
+        """Collect up to max_batch_size items or until max_wait elapses, then run them together"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait_seconds
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[tuple]):
+        """Run one batch and fan the results back out to the waiting futures"""
+        started = time.perf_counter()
+        items = [item for item, _, _ in batch]
+        try:
+            results = self.run_batch(items)
+        except Exception as e:
+            # One bad item must not fail its neighbours: retry each on its own
+            logger.warning(f"⚠️ Micro-batch of {len(batch)} failed ({e}), running items individually")
+            results = None
+
+        for index, (item, future, _) in enumerate(batch):
+            if results is not None:
+                future.set_result(results[index])
+                continue
+            try:
+                future.set_result(self.run_single(item))
+            except Exception as e:
+                future.set_exception(e)
+
+        self._record(batch, started, fallback=results is None)
+
+    def _record(self, batch: List[tuple], started: float, fallback: bool):
+        """Update batch metrics under the lock"""
+        size = len(batch)
+        with self._lock:
+            self.batches += 1
+            self.items += size
+            self.fallbacks += int(fallback)
+            self.largest_batch = max(self.largest_batch, size)
+            self.total_wait_ms += sum((started - queued_at) * 1000 for _, _, queued_at in batch)
+            for bucket in self.batch_size_counts:
+                if size <= bucket:
+                    self.batch_size_counts[bucket] += 1
+                    break
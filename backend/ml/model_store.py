@@ -0,0 +1,334 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+import numpy as np
+from typing import Dict, List, Any, Optional
+from ml.compiled_forest import CompiledForest, parity_probe
+from ml.explanations import FeatureExplainer
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+FOREST_DIR = 'forest'
+CURRENT_POINTER = 'CURRENT'
+VERSIONS_DIR = 'versions'
+
+# Each library's own on-disk model format
+NATIVE_FORMATS = {'xgboost': 'ubj', 'catboost': 'cbm', 'lightgbm': 'txt'}
+
+
+class StoredLabelEncoder:
+    """LabelEncoder stand-in rebuilt from the class list kept in the manifest"""
+
+    def __init__(self, classes: List[Any]):
+        self.classes_ = np.asarray(classes, dtype=object)
+        self._index = {label: code for code, label in enumerate(classes)}
+
+    def transform(self, values) -> np.ndarray:
+        """Labels to integer codes"""
+        return np.array([self._index[value] for value in values], dtype=int)
+
+    def inverse_transform(self, codes) -> np.ndarray:
+        """Integer codes back to labels"""
+        return self.classes_[np.asarray(codes, dtype=int)]
+
+
+class LightGBMBoosterModel:
+    """sklearn-style predict/predict_proba over a Booster loaded from LightGBM's text format"""
+
+    library = 'lightgbm'
+
+    def __init__(self, booster, task: str):
+        self.booster_ = booster
+        self.task = task
+        self.classes_ = np.arange(max(booster.num_model_per_iteration(), 2))
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities, two columns for binary models"""
+        proba = self.booster_.predict(X)
+        if proba.ndim == 1:
+            proba = np.column_stack([1 - proba, proba])
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        """Class labels for classifiers, raw predictions for regressors"""
+        if self.task == 'classification':
+            return self.predict_proba(X).argmax(axis=1)
+        return self.booster_.predict(X)
+
+
+class XGBoostBoosterModel:
+    """sklearn-style predict/predict_proba over a Booster trained with xgb.train"""
+
+    library = 'xgboost'
+
+    def __init__(self, booster, task: str):
+        self._booster = booster
+        self.task = task
+        if task == 'classification':
+            n_classes = int(json.loads(booster.save_config())['learner']['learner_model_param']['num_class'])
+            self.classes_ = np.arange(max(n_classes, 2))
+            self.n_classes_ = len(self.classes_)
+
+    def get_booster(self):
+        return self._booster
+
+    def save_model(self, path: str):
+        self._booster.save_model(path)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities, two columns for binary models"""
+        proba = self._booster.inplace_predict(X)
+        if proba.ndim == 1:
+            proba = np.column_stack([1 - proba, proba])
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        """Class labels for classifiers, raw predictions for regressors"""
+        if self.task == 'classification':
+            return self.predict_proba(X).argmax(axis=1)
+        return self._booster.inplace_predict(X)
+
+
+class LazyModel:
+    """Defers loading a native model (and importing its library) until first use"""
+
+    def __init__(self, library: str, load):
+        self.library = library
+        self._load = load
+        self._model = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        """Load the wrapped model once, thread-safely"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def __getattr__(self, name):
+        """Anything not defined here is served by the loaded model"""
+        return getattr(self.resolve(), name)
+
+
+def model_library(model) -> str:
+    """Library a fitted model belongs to, from its class module"""
+    if isinstance(model, LazyModel):
+        return model.library
+    return getattr(model, 'library', None) or type(model).__module__.split('.')[0]
+
+
+def save_artifacts(model_dir: str, regression_models: Dict[str, Any], classification_models: Dict[str, Any],
+                   feature_columns: List[str], encoders: Dict[str, Any],
+                   metrics: Optional[Dict[str, Any]] = None, extra: Optional[Dict[str, Any]] = None,
+                   reference_data: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """Write models in native formats, the compiled forest and a checksummed manifest"""
+    os.makedirs(model_dir, exist_ok=True)
+    models = {'regression': {}, 'classification': {}}
+    files = []
+
+    for task, group, suffix in (('regression', regression_models, 'regressor'),
+                                ('classification', classification_models, 'classifier')):
+        for name, model in group.items():
+            if isinstance(model, LazyModel):
+                model = model.resolve()
+            library = model_library(model)
+            filename = f'{name}_{suffix}.{NATIVE_FORMATS[library]}'
+            path = os.path.join(model_dir, filename)
+            if library == 'lightgbm':
+                model.booster_.save_model(path)
+            else:
+                model.save_model(path)
+            models[task][name] = {'file': filename, 'library': library, 'estimator': type(model).__name__}
+            files.append(filename)
+
+    # Array forest for compiled inference; only shipped if it reproduces the native models
+    forest = CompiledForest.from_models(regression_models, classification_models)
+    forest_info = None
+    explanations = None
+    if _forest_matches(forest, regression_models, classification_models, len(feature_columns)):
+        forest_dir = os.path.join(model_dir, FOREST_DIR)
+        forest.save(forest_dir)
+        files += [os.path.join(FOREST_DIR, filename) for filename in sorted(os.listdir(forest_dir))]
+        forest_info = {'dir': FOREST_DIR, 'trees': int(len(forest.roots)), 'nodes': int(len(forest.feature))}
+        # Global feature impacts over held-out rows, served when per-student attributions are unavailable
+        if reference_data is not None and len(reference_data):
+            explanations = FeatureExplainer(forest, feature_columns).global_baseline(reference_data)
+    else:
+        logger.error("❌ Compiled forest disagrees with native models, not saving it")
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'version': os.path.basename(os.path.normpath(model_dir)),
+        'created_at': datetime.now().isoformat(),
+        'feature_columns': list(feature_columns),
+        'encoders': {col: [_native(label) for label in encoder.classes_] for col, encoder in encoders.items()},
+        'models': models,
+        'forest': forest_info,
+        'explanations': explanations,
+        'metrics': _native(metrics or {}),
+        'checksums': {filename: _sha256(os.path.join(model_dir, filename)) for filename in files}
+    }
+    manifest.update(extra or {})
+
+    # The manifest is written last and atomically, so its presence marks a complete directory
+    manifest_path = os.path.join(model_dir, MANIFEST_FILE)
+    with open(f'{manifest_path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f'{manifest_path}.tmp', manifest_path)
+    return manifest
+
+
+def load_artifacts(model_dir: str, lazy: bool = False, verify: bool = True, mmap: bool = True) -> Dict[str, Any]:
+    """Load a manifest directory; the forest is memory-mapped and native models may load lazily"""
+    start_time = time.perf_counter()
+    with open(os.path.join(model_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model store format: {manifest.get('format_version')}")
+
+    if verify:
+        for filename, checksum in manifest['checksums'].items():
+            if _sha256(os.path.join(model_dir, filename)) != checksum:
+                raise ValueError(f"Checksum mismatch for {filename} in {model_dir}")
+
+    bundle = {
+        'manifest': manifest,
+        'feature_columns': manifest['feature_columns'],
+        'encoders': {col: StoredLabelEncoder(classes) for col, classes in manifest['encoders'].items()},
+        'regression_models': {},
+        'classification_models': {},
+        'forest': None
+    }
+    for task in ('regression', 'classification'):
+        for name, info in manifest['models'][task].items():
+            path = os.path.join(model_dir, info['file'])
+            model = LazyModel(info['library'], lambda info=info, path=path, task=task: _load_native(info, path, task))
+            bundle[f'{task}_models'][name] = model if lazy else model.resolve()
+
+    if manifest.get('forest'):
+        bundle['forest'] = CompiledForest.load(os.path.join(model_dir, manifest['forest']['dir']), mmap=mmap)
+
+    logger.info(f"📦 Loaded model version {manifest['version']} in {(time.perf_counter() - start_time) * 1000:.1f} ms")
+    return bundle
+
+
+class ModelStore:
+    """Versioned model directories under one root, with a CURRENT pointer to the serving version"""
+
+    def __init__(self, root: str = 'models/'):
+        self.root = root
+
+    def new_version(self) -> str:
+        """Sortable, unique version name"""
+        return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:12]}"
+
+    def version_dir(self, version: str) -> str:
+        """Directory holding one stored version"""
+        return os.path.join(self.root, VERSIONS_DIR, version)
+
+    def list_versions(self) -> List[str]:
+        """Complete (manifest-bearing) versions, oldest first"""
+        versions_root = os.path.join(self.root, VERSIONS_DIR)
+        if not os.path.isdir(versions_root):
+            return []
+        return sorted(version for version in os.listdir(versions_root)
+                      if os.path.exists(os.path.join(versions_root, version, MANIFEST_FILE)))
+
+    def current_version(self) -> Optional[str]:
+        """Version the CURRENT pointer refers to, if any"""
+        pointer_path = os.path.join(self.root, CURRENT_POINTER)
+        if not os.path.exists(pointer_path):
+            return None
+        with open(pointer_path) as f:
+            version = f.read().strip()
+        return version if version and os.path.isdir(self.version_dir(version)) else None
+
+    def resolve_model_dir(self) -> str:
+        """Directory being served; falls back to the legacy flat layout without a pointer"""
+        version = self.current_version()
+        return self.version_dir(version) if version else self.root
+
+    def set_current(self, version: str):
+        """Atomically repoint CURRENT at a version directory"""
+        if not os.path.exists(os.path.join(self.version_dir(version), MANIFEST_FILE)):
+            raise ValueError(f"Model version {version} is incomplete or missing")
+        pointer_path = os.path.join(self.root, CURRENT_POINTER)
+        tmp_path = f'{pointer_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, pointer_path)
+
+    def load(self, version: Optional[str] = None, **load_options) -> Dict[str, Any]:
+        """Load a stored version (the current one by default)"""
+        version = version or self.current_version()
+        if version is None:
+            raise ValueError(f"No current model version under {self.root}")
+        return load_artifacts(self.version_dir(version), **load_options)
+
+
+def _load_native(info: Dict[str, str], path: str, task: str):
+    """Rebuild a fitted model from its native file, importing only its own library"""
+    library = info['library']
+    if library == 'xgboost':
+        import xgboost as xgb
+        if info['estimator'] == XGBoostBoosterModel.__name__:
+            return XGBoostBoosterModel(xgb.Booster(model_file=path), task)
+        model = getattr(xgb, info['estimator'])()
+        model.load_model(path)
+        return model
+    if library == 'catboost':
+        import catboost
+        model = getattr(catboost, info['estimator'])()
+        model.load_model(path, format='cbm')
+        return model
+    if library == 'lightgbm':
+        import lightgbm as lgb
+        return LightGBMBoosterModel(lgb.Booster(model_file=path), task)
+    raise ValueError(f"Unknown model library: {library}")
+
+
+def _forest_matches(forest: CompiledForest, regression_models, classification_models, n_features: int) -> bool:
+    """Compare forest and native outputs on rows sitting on every feature's split thresholds"""
+    probe = parity_probe(forest, n_features)
+    forest_regression, forest_probas = forest.predict(probe)
+    for i, (name, model) in enumerate(regression_models.items()):
+        difference = np.abs(forest_regression[:, i] - model.predict(probe)).max()
+        if difference > 1e-2:
+            logger.error(f"❌ Compiled {name} regressor differs from the native model by up to {difference:.3g}")
+            return False
+    for i, (name, model) in enumerate(classification_models.items()):
+        difference = np.abs(forest_probas[i] - model.predict_proba(probe)).max()
+        if difference > 1e-4:
+            logger.error(f"❌ Compiled {name} classifier differs from the native model by up to {difference:.3g}")
+            return False
+    return True
+
+
+def _sha256(path: str) -> str:
+    """Streaming SHA-256 of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _native(value):
+    """NumPy scalars and containers to JSON-friendly Python values"""
+    if isinstance(value, dict):
+        return {str(k): _native(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_native(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
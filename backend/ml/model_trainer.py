@@ -1,6 +1,5 @@
 import pandas as pd
 import numpy as np
-import joblib
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.metrics import accuracy_score, classification_report, mean_absolute_error, r2_score
@@ -8,21 +7,144 @@ from sklearn.utils.class_weight import compute_class_weight
 import xgboost as xgb
 from lightgbm import LGBMClassifier
 from catboost import CatBoostRegressor
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import json
+import time
+from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
 
 # Import the data generator
 from ml.data_generator import StudentDataGenerator
+from ml.model_store import save_artifacts
+from ml.dataset_io import dataset_columns, read_dataset
+from ml.score_index import ScoreIndex
+
+# Hyperparameters of each ensemble member; thread counts are set by the training scheduler
+DEFAULT_PARAMS = {
+    'xgboost_regression': {
+        'n_estimators': 300,
+        'max_depth': 8,
+        'learning_rate': 0.05,
+        'subsample': 0.8,
+        'colsample_bytree': 0.8,
+        'random_state': 42
+    },
+    'catboost_regression': {
+        'iterations': 300,
+        'depth': 8,
+        'learning_rate': 0.05,
+        'l2_leaf_reg': 3,
+        'random_seed': 42,
+        'verbose': False
+    },
+    # LightGBM with OPTIMIZED parameters to prevent "no splits" warnings
+    'lightgbm_classification': {
+        'n_estimators': 200,
+        'max_depth': 7,
+        'learning_rate': 0.05,
+        'num_leaves': 31,              # Explicitly set to prevent warnings
+        'min_child_samples': 20,       # Prevent overfitting on small leaves
+        'subsample': 0.8,
+        'colsample_bytree': 0.8,
+        'reg_alpha': 0.1,              # L1 regularization
+        'reg_lambda': 0.1,             # L2 regularization
+        'random_state': 42,
+        'verbose': -1                  # Suppress LightGBM output
+    },
+    'xgboost_classification': {
+        'n_estimators': 200,
+        'max_depth': 7,
+        'learning_rate': 0.05,
+        'subsample': 0.8,
+        'colsample_bytree': 0.8,
+        'reg_alpha': 0.1,
+        'reg_lambda': 0.1,
+        'random_state': 42,
+        'verbosity': 0                 # Suppress XGBoost warnings
+    },
+}
+
+# Written by the hyperparameter search (ml/tuning.py); overrides DEFAULT_PARAMS when present
+TUNED_PARAMS_FILE = os.environ.get('TUNED_PARAMS_PATH', 'models/best_params.json')
+
+MODEL_CLASSES = {
+    'xgboost_regression': xgb.XGBRegressor,
+    'catboost_regression': CatBoostRegressor,
+    'lightgbm_classification': LGBMClassifier,
+    'xgboost_classification': xgb.XGBClassifier,
+}
+
+# Name of each library's thread-count parameter
+THREAD_PARAMS = {
+    'xgboost_regression': 'n_jobs',
+    'catboost_regression': 'thread_count',
+    'lightgbm_classification': 'n_jobs',
+    'xgboost_classification': 'n_jobs',
+}
+
+# sklearn-style names in DEFAULT_PARAMS that XGBoost's native API spells differently
+XGBOOST_NATIVE_NAMES = {'random_state': 'seed', 'reg_alpha': 'alpha', 'reg_lambda': 'lambda'}
+
+# Relative single-thread fit time with the default parameters (measured on the 5k-row dataset);
+# used to split the thread budget and to start the longest fits first
+FIT_COST = {
+    'xgboost_regression': 4,
+    'catboost_regression': 2.5,
+    'lightgbm_classification': 1,
+    'xgboost_classification': 8,
+}
+
+# Held-out rows kept for the global feature impacts stored in the manifest
+MAX_REFERENCE_ROWS = 2000
+
+
+def load_params(path: str = TUNED_PARAMS_FILE) -> Dict[str, Dict[str, Any]]:
+    """DEFAULT_PARAMS overlaid with the best configuration a search persisted, if any"""
+    tuned = {}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            tuned = {key: result['params'] for key, result in json.load(f).items()}
+        print(f"🎛️  Using tuned hyperparameters from {path}")
+    return {key: {**params, **tuned.get(key, {})} for key, params in DEFAULT_PARAMS.items()}
+
+
+def training_threads() -> int:
+    """Thread budget for one training run: TRAINING_THREADS, else every core"""
+    return int(os.environ.get('TRAINING_THREADS', 0)) or os.cpu_count() or 1
+
+
+def allocate_threads(n_threads: int, costs: Dict[str, float]) -> Dict[str, int]:
+    """Split a thread budget across concurrent fits in proportion to their cost, at least one each"""
+    total = sum(costs.values())
+    shares = {key: max(1, int(n_threads * cost / total)) for key, cost in costs.items()}
+    spare = n_threads - sum(shares.values())
+    heaviest_first = sorted(costs, key=costs.get, reverse=True)
+    for i in range(max(spare, 0)):
+        shares[heaviest_first[i % len(heaviest_first)]] += 1
+    return shares
+
+
+def _fit_model(key: str, X, y, n_threads: int, params: Dict[str, Any], extra_params: Optional[Dict[str, Any]] = None):
+    """Build and fit one ensemble member; returns the model and its fit time in seconds"""
+    params = {**params, **(extra_params or {}), THREAD_PARAMS[key]: n_threads}
+    model = MODEL_CLASSES[key](**params)
+    start = time.perf_counter()
+    model.fit(X, y)
+    return model, time.perf_counter() - start
+
 
 class ModelTrainer:
-    def __init__(self):
+    def __init__(self, params: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.params = params or load_params()
         self.regression_models = {}
         self.classification_models = {}
         self.scalers = {}
         self.encoders = {}
         self.feature_columns = []
         self.results = {}
+        self.timings = {}
+        self.reference_data = None
+        self.score_index = None
         
     def load_and_preprocess_data(self, data_path='data/student_dataset.csv'):
         """Load and preprocess the dataset, generate if missing"""
@@ -36,21 +158,15 @@ class ModelTrainer:
             generator = StudentDataGenerator(n_samples=5000)
             df = generator.save_dataset(data_path)
         else:
-            df = pd.read_csv(data_path)
+            # Only the columns training uses are read (CSV or Parquet, by extension); features stay float64,
+            # the precision a freshly generated dataset is trained on
+            df = read_dataset(data_path, columns=[col for col in dataset_columns(data_path)
+                                                  if col not in ('created_at', 'improvement_potential')],
+                              float_dtype='float64')
             
         print(f"📁 Loaded dataset with {len(df)} samples")
         
-        # Get all numerical features (exclude targets and non-predictive columns)
-        exclude_columns = ['final_score', 'performance_level', 'created_at', 'improvement_potential']
-        numerical_features = [col for col in df.select_dtypes(include=[np.number]).columns 
-                             if col not in exclude_columns]
-        
-        categorical_features = [col for col in df.select_dtypes(include=['object']).columns 
-                               if col not in exclude_columns]
-        
-        # Prepare features - only use features that actually exist in the dataset
-        available_numerical = [f for f in numerical_features if f in df.columns]
-        available_categorical = [f for f in categorical_features if f in df.columns]
+        available_numerical, available_categorical = self._feature_types(df)
         
         print(f"🔧 Using {len(available_numerical)} numerical features and {len(available_categorical)} categorical features")
         
@@ -78,42 +194,26 @@ class ModelTrainer:
         
         return X, y_regression, y_classification_encoded, y_classification
 
-    def train_models(self, X, y_reg, y_clf):
-        """Train regression and classification models with optimized parameters"""
+    @staticmethod
+    def _feature_types(df):
+        """Numerical and categorical feature columns of a dataset frame"""
+        # Get all numerical features (exclude targets and non-predictive columns)
+        exclude_columns = ['final_score', 'performance_level', 'created_at', 'improvement_potential']
+        numerical_features = [col for col in df.select_dtypes(include=[np.number]).columns 
+                             if col not in exclude_columns]
+        
+        categorical_features = [col for col in df.select_dtypes(include=['object', 'category']).columns 
+                               if col not in exclude_columns]
+        return numerical_features, categorical_features
+    
+    def train_models(self, X, y_reg, y_clf, n_threads=None):
+        """Train regression and classification models concurrently within a thread budget"""
         
         # Split data
         X_train, X_test, y_reg_train, y_reg_test, y_clf_train, y_clf_test = train_test_split(
             X, y_reg, y_clf, test_size=0.2, random_state=42
         )
         
-        print("🔥 Training Regression Models...")
-        
-        # XGBoost Regressor with optimized parameters
-        xgb_reg = xgb.XGBRegressor(
-            n_estimators=300,
-            max_depth=8,
-            learning_rate=0.05,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            random_state=42
-        )
-        xgb_reg.fit(X_train, y_reg_train)
-        self.regression_models['xgboost'] = xgb_reg
-        
-        # CatBoost Regressor with optimized parameters
-        catboost_reg = CatBoostRegressor(
-            iterations=300,
-            depth=8,
-            learning_rate=0.05,
-            l2_leaf_reg=3,
-            random_seed=42,
-            verbose=False
-        )
-        catboost_reg.fit(X_train, y_reg_train)
-        self.regression_models['catboost'] = catboost_reg
-        
-        print("🔥 Training Classification Models...")
-        
         # Calculate class weights for imbalanced classes
         class_weights = compute_class_weight(
             'balanced', 
@@ -121,40 +221,40 @@ class ModelTrainer:
             y=y_clf_train
         )
         class_weight_dict = dict(enumerate(class_weights))
-
-        # LightGBM Classifier with OPTIMIZED parameters to prevent "no splits" warnings
-        lgbm_clf = LGBMClassifier(
-            n_estimators=200,
-            max_depth=7,
-            learning_rate=0.05,
-            num_leaves=31,              # Explicitly set to prevent warnings
-            min_child_samples=20,        # Prevent overfitting on small leaves
-            subsample=0.8,
-            colsample_bytree=0.8,
-            reg_alpha=0.1,              # L1 regularization
-            reg_lambda=0.1,             # L2 regularization
-            random_state=42,
-            class_weight=class_weight_dict,
-            verbose=-1                  # Suppress LightGBM output
-        )
-        lgbm_clf.fit(X_train, y_clf_train)
-        self.classification_models['lightgbm'] = lgbm_clf
-        
-        # XGBoost Classifier with optimized parameters
-        xgb_clf = xgb.XGBClassifier(
-            n_estimators=200,
-            max_depth=7,
-            learning_rate=0.05,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            reg_alpha=0.1,
-            reg_lambda=0.1,
-            random_state=42,
-            # Remove scale_pos_weight since we're using multiclass
-            verbosity=0  # Suppress XGBoost warnings
-        )
-        xgb_clf.fit(X_train, y_clf_train)
-        self.classification_models['xgboost'] = xgb_clf
+        
+        targets = {
+            'xgboost_regression': y_reg_train,
+            'catboost_regression': y_reg_train,
+            'lightgbm_classification': y_clf_train,
+            'xgboost_classification': y_clf_train,
+        }
+        extra_params = {'lightgbm_classification': {'class_weight': class_weight_dict}}
+        
+        n_threads = n_threads or training_threads()
+        threads = allocate_threads(n_threads, {key: FIT_COST[key] for key in targets})
+        print(f"🔥 Training {len(targets)} models with a budget of {n_threads} threads...")
+        
+        # The libraries release the GIL while fitting, so threads run the fits truly in parallel;
+        # the most expensive fits start first
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(len(targets), n_threads)) as pool:
+            futures = {
+                key: pool.submit(_fit_model, key, X_train, targets[key], threads[key], self.params[key],
+                                   extra_params.get(key))
+                for key in sorted(targets, key=FIT_COST.get, reverse=True)
+            }
+            fitted = {key: future.result() for key, future in futures.items()}
+        
+        # Registered in a fixed order, whatever order the fits finished in
+        for key in targets:
+            model, seconds = fitted[key]
+            name, task = key.split('_')
+            models = self.regression_models if task == 'regression' else self.classification_models
+            models[name] = model
+            self.timings[key] = seconds
+            print(f"  ⏱️  {name.upper():<10} {task:<14} | {seconds:6.2f}s on {threads[key]} threads")
+        self.timings['total'] = time.perf_counter() - start
+        print(f"✅ Training wall time: {self.timings['total']:.2f}s")
         
         # Evaluate models
         self._evaluate_models(X_test, y_reg_test, y_clf_test)
@@ -169,20 +269,35 @@ class ModelTrainer:
         print("="*50)
         
         # Regression Evaluation
+        # Held-out rows the global feature impacts are computed over when the models are saved
+        self.reference_data = np.asarray(X_test, dtype=np.float64)[:MAX_REFERENCE_ROWS]
+        
         print("\n🎯 REGRESSION MODELS:")
+        regression_predictions = []
         for name, model in self.regression_models.items():
             y_pred = model.predict(X_test)
+            regression_predictions.append(y_pred)
             mae = mean_absolute_error(y_reg_test, y_pred)
             r2 = r2_score(y_reg_test, y_pred)
-            self.results[f'{name}_regression'] = {'MAE': mae, 'R2': r2}
+            self.results[f'{name}_regression'] = {'MAE': mae, 'R2': r2,
+                                                  'fit_seconds': self.timings.get(f'{name}_regression', 0.0)}
             print(f"  {name.upper():<10} | MAE: {mae:.2f} | R²: {r2:.3f}")
         
+        # Score distribution for serving-time percentiles; held-out rows, since scores predicted for the
+        # fitted rows are more spread out than those of new students
+        self.score_index = ScoreIndex.build(
+            np.mean(regression_predictions, axis=0),
+            y_reg_test,
+            self.encoders['performance_level'].classes_[np.asarray(y_clf_test, dtype=int)]
+        )
+        
         # Classification Evaluation
         print("\n🎯 CLASSIFICATION MODELS:")
         for name, model in self.classification_models.items():
             y_pred = model.predict(X_test)
             accuracy = accuracy_score(y_clf_test, y_pred)
-            self.results[f'{name}_classification'] = {'Accuracy': accuracy}
+            self.results[f'{name}_classification'] = {'Accuracy': accuracy,
+                                                      'fit_seconds': self.timings.get(f'{name}_classification', 0.0)}
             print(f"  {name.upper():<10} | Accuracy: {accuracy:.3f}")
             
             # Detailed classification report for the best model
@@ -193,7 +308,7 @@ class ModelTrainer:
                 available_classes = self.encoders['performance_level'].classes_[unique_classes]
                 print(classification_report(y_clf_test, y_pred, labels=unique_classes, target_names=available_classes, zero_division=0))
     
-    def create_ensemble_predictor(self):
+    def create_ensemble_predictor(self, **predictor_options):
         """Create ensemble predictor for production"""
         from ml.predictor import EnsemblePredictor
         
@@ -201,31 +316,34 @@ class ModelTrainer:
             regression_models=self.regression_models,
             classification_models=self.classification_models,
             feature_columns=self.feature_columns,
-            encoders=self.encoders
+            encoders=self.encoders,
+            score_index=self.score_index,
+            **predictor_options
         )
         
         return ensemble_predictor
     
     def save_models(self, model_dir='models/'):
         """Save all trained models and preprocessing objects"""
-        os.makedirs(model_dir, exist_ok=True)
-        
-        # Save models
-        for name, model in self.regression_models.items():
-            joblib.dump(model, f'{model_dir}/{name}_regressor.pkl')
-        
-        for name, model in self.classification_models.items():
-            joblib.dump(model, f'{model_dir}/{name}_classifier.pkl')
-        
-        # Save preprocessing objects
-        joblib.dump(self.encoders, f'{model_dir}/encoders.pkl')
-        joblib.dump(self.feature_columns, f'{model_dir}/feature_columns.pkl')
-        joblib.dump(self.results, f'{model_dir}/training_results.pkl')
+        # Native model files, compiled forest arrays and a checksummed manifest
+        save_artifacts(
+            model_dir,
+            regression_models=self.regression_models,
+            classification_models=self.classification_models,
+            feature_columns=self.feature_columns,
+            encoders=self.encoders,
+            metrics=self.results,
+            extra={'params': self.params,
+                   'score_index': self.score_index.to_dict() if self.score_index is not None else None},
+            reference_data=self.reference_data
+        )
         
         print(f"✅ All models saved to {model_dir}")
     
     def plot_feature_importance(self, model_dir='models/'):
         """Plot and save feature importance"""
+        import matplotlib.pyplot as plt
+        
         # Get feature importance from XGBoost regressor
         xgb_model = self.regression_models['xgboost']
         feature_importance = xgb_model.feature_importances_
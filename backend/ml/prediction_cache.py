@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from typing import Dict, List, Any, Optional
+
+
+class PredictionCache:
+    """Bounded, thread-safe LRU + TTL cache of model outputs keyed on the preprocessed feature row"""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: Optional[float] = 3600, decimals: int = 4):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.decimals = decimals
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def keys_for(self, X: np.ndarray) -> List[bytes]:
+        """Canonical keys: each feature row quantized, so equivalent requests collide"""
+        quantized = np.round(np.asarray(X, dtype=np.float32), self.decimals) + np.float32(0.0)  # folds -0.0 into 0.0
+        return [row.tobytes() for row in quantized]
+
+    def get_many(self, keys: List[bytes]) -> List[Any]:
+        """Look up many keys at once; missing or expired entries come back as None"""
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and (entry[0] is None or entry[0] > now):
+                    self._entries.move_to_end(key)
+                    values.append(entry[1])
+                    self.hits += 1
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                    values.append(None)
+                    self.misses += 1
+        return values
+
+    def put_many(self, keys: List[bytes], values: List[Any]):
+        """Insert entries, evicting the least recently used beyond max_size"""
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry, e.g. when the serving models change"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for health and metrics endpoints"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
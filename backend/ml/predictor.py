@@ -1,26 +1,125 @@
 import pandas as pd
 import numpy as np
-import joblib
+import os
+import threading
+import time
 from typing import Dict, List, Any
 import logging
+from ml.feature_schema import FeatureSchema, DEFAULT_VALUES
+from ml.compiled_forest import CompiledForest, parity_probe
+from ml.explanations import FeatureExplainer, impact_shares
+from ml.counterfactuals import CounterfactualSearch, MAX_CHANGES
+from ml.prediction_cache import PredictionCache
+from ml.model_store import MANIFEST_FILE, load_artifacts
+from ml.rules import RuleEngine
+from ml.score_index import ScoreIndex
+from ml.request_logging import request_log
+from ml.metrics import metrics
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Population percentile bands: (lower bound, score interpretation, improvement timeline, focus area)
+PERCENTILE_BANDS = [
+    (90, "Exceptional performance - demonstrates mastery of concepts", '4-8 weeks', 'Mastery and refinement'),
+    (70, "Strong performance - good understanding with room for excellence", '4-6 weeks', 'Excellence achievement'),
+    (40, "Solid performance - foundation established, needs refinement", '3-5 weeks', 'Advanced understanding'),
+    (15, "Developing performance - basic understanding, needs significant improvement", '4-6 weeks',
+     'Core concept mastery'),
+    (0, "Needs improvement - focus on fundamental concepts and study habits", '2-4 weeks', 'Foundation building'),
+]
+
+# Short-term target: the score this many percentile points further up the population
+IMPROVEMENT_STEP = 15
+
+# Fixed feature weights, served as feature_impact (normalized, top 10) when neither per-student attributions
+# nor a stored training-time baseline are available, as every prediction returned before attributions existed
+FALLBACK_FEATURE_WEIGHTS = {
+    'Cognitive Ability': 15.2, 'Working Memory': 9.8, 'Critical Thinking': 8.5, 'Processing Speed': 6.5,
+    'Study Hours': 11.2, 'Time Management': 9.4, 'Study Consistency': 7.8, 'Metacognition': 6.6,
+    'Motivation': 8.7, 'Academic Confidence': 6.3,
+    'Attendance': 4.2, 'Homework Completion': 3.8, 'Sleep Quality': 2.0,
+    'Focus': 7.1, 'Learning Adaptability': 5.2,
+}
+FALLBACK_FEATURE_IMPACT = dict(sorted(
+    ((name, round(weight / sum(FALLBACK_FEATURE_WEIGHTS.values()) * 100, 1))
+     for name, weight in FALLBACK_FEATURE_WEIGHTS.items()),
+    key=lambda item: item[1], reverse=True)[:10])
+
 class EnsemblePredictor:
     def __init__(self, regression_models=None, classification_models=None, 
-                 feature_columns=None, encoders=None, model_dir='models/'):
+                 feature_columns=None, encoders=None, model_dir='models/',
+                 inference_mode='native', compiled_batch_limit=16,
+                 voting='soft', classifier_weights=None,
+                 cache_size=10000, cache_ttl=3600, explain=True, score_index=None):
         self.regression_models = regression_models or {}
         self.classification_models = classification_models or {}
         self.feature_columns = feature_columns or []
         self.encoders = encoders or {}
+        self.model_dir = model_dir
+        self.inference_mode = inference_mode
+        self.compiled_batch_limit = compiled_batch_limit
+        self.forest = None
+        self.manifest = None
+        
+        if voting not in ('soft', 'hard'):
+            raise ValueError(f"Unknown voting mode: {voting}")
+        self.voting = voting
+        self.classifier_weights = classifier_weights or {}
+        
+        # Model outputs and their explanations cached per canonical feature row (disabled when cache_size is 0)
+        self.cache = PredictionCache(max_size=cache_size, ttl_seconds=cache_ttl) if cache_size else None
+        self.explanation_cache = PredictionCache(max_size=cache_size, ttl_seconds=cache_ttl) if cache_size else None
         
         # Load models if not provided
         if not self.regression_models:
             self._load_models(model_dir)
+        
+        # Training-time score distribution; without one, percentiles and targets fall back to fixed tables
+        if score_index is None and (self.manifest or {}).get('score_index'):
+            score_index = ScoreIndex.from_dict(self.manifest['score_index'])
+        self.score_index = score_index
+        
+        # Request-to-feature layout is resolved once per loaded model
+        self.schema = FeatureSchema(self.feature_columns, self.encoders)
+        self.rules = RuleEngine()
+        
+        stored_forest = self.forest
+        if inference_mode == 'compiled':
+            self.forest = self._load_compiled_forest()
+        elif inference_mode == 'native':
+            self.forest = None
+        else:
+            raise ValueError(f"Unknown inference mode: {inference_mode}")
+        
+        # Attributions and counterfactual search walk compiled trees whatever the inference mode; one forest over
+        # every model serves both, compiled here only when none was loaded
+        self.analysis_forest = self._load_analysis_forest(self.forest or stored_forest)
+        self.explainer = self._load_explainer(self.analysis_forest) if explain else None
+        
+        # Built here so a preloaded app shares it with its workers, and again on first use (once, under the lock)
+        # if that failed
+        self.counterfactual_search = None
+        self._counterfactual_lock = threading.Lock()
+        try:
+            self._load_counterfactual_search()
+        except Exception as e:
+            logger.warning(f"⚠️ Counterfactual search unavailable until first use: {e}")
+        
+        explanations = (self.manifest or {}).get('explanations') or {}
+        self.global_impact = impact_shares(
+            np.array([explanations.get('mean_abs_contribution', {}).get(col, 0.0) for col in self.feature_columns]),
+            self.feature_columns
+        ) or FALLBACK_FEATURE_IMPACT
     
     def _load_models(self, model_dir):
         """Load trained models from disk"""
+        if os.path.exists(os.path.join(model_dir, MANIFEST_FILE)):
+            self._load_stored_models(model_dir)
+            return
+        
+        # Legacy pickles need joblib and the training libraries; the model store path imports neither up front
+        import joblib
+        
         try:
             # Load regression models
             self.regression_models['xgboost'] = joblib.load(f'{model_dir}/xgboost_regressor.pkl')
@@ -40,260 +139,517 @@ class EnsemblePredictor:
             logger.error(f"❌ Error loading models: {e}")
             raise
     
-    def _convert_to_serializable(self, obj):
-        """Convert NumPy types to Python native types for JSON serialization"""
-        if isinstance(obj, (np.float32, np.float64)):
-            return float(obj)
-        elif isinstance(obj, (np.int32, np.int64)):
-            return int(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        elif isinstance(obj, dict):
-            return {k: self._convert_to_serializable(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [self._convert_to_serializable(item) for item in obj]
-        else:
-            return obj
+    def _load_stored_models(self, model_dir):
+        """Load a versioned model-store directory (native formats + manifest)"""
+        try:
+            # In compiled mode the memory-mapped forest serves first; native models load on demand
+            bundle = load_artifacts(model_dir, lazy=self.inference_mode == 'compiled')
+            self.regression_models = bundle['regression_models']
+            self.classification_models = bundle['classification_models']
+            self.encoders = bundle['encoders']
+            self.feature_columns = bundle['feature_columns']
+            self.manifest = bundle['manifest']
+            self.forest = bundle['forest']
+            
+            logger.info(f"✅ All models loaded successfully (version {self.manifest['version']})")
+            
+        except Exception as e:
+            logger.error(f"❌ Error loading models: {e}")
+            raise
+    
+    def _load_compiled_forest(self):
+        """Use the stored (already validated) forest, or compile one from the fitted models"""
+        expected_names = (list(self.regression_models), list(self.classification_models))
+        if self.forest is not None and (self.forest.regression_names, self.forest.classification_names) == expected_names:
+            logger.info(f"✅ Compiled forest ready: {len(self.forest.roots)} trees, {len(self.forest.feature)} nodes")
+            return self.forest
+        
+        forest = CompiledForest.from_models(self.regression_models, self.classification_models)
+        
+        # The forest must reproduce the native models before it may serve traffic
+        probe = np.vstack([self.schema.default_row, parity_probe(forest, self.schema.n_features)])
+        forest_regression, forest_probas = forest.predict(probe)
+        native_regression, native_probas = self._run_native_models(probe)
+        if (not np.allclose(forest_regression, native_regression, atol=1e-2)
+                or not np.allclose(forest_probas, native_probas, atol=1e-4)):
+            logger.error("❌ Compiled forest disagrees with native models, using native inference")
+            return None
+        
+        logger.info(f"✅ Compiled forest ready: {len(forest.roots)} trees, {len(forest.feature)} nodes")
+        return forest
+    
+    def _load_analysis_forest(self, forest):
+        """The loaded forest when it covers every model, else one compiled from the fitted models"""
+        if forest is not None and (forest.regression_names, forest.classification_names) == \
+                (list(self.regression_models), list(self.classification_models)):
+            return forest
+        try:
+            return CompiledForest.from_models(self.regression_models, self.classification_models)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not compile the models for attributions and counterfactuals: {e}")
+            return None
+    
+    def _load_explainer(self, forest):
+        """Explain with the loaded forest when it carries node expectations, else compile the regressors"""
+        try:
+            if (forest is None or forest.expected is None
+                    or forest.regression_names != list(self.regression_models)):
+                forest = CompiledForest.from_models(self.regression_models, {})
+            return FeatureExplainer(forest, self.feature_columns)
+        except Exception as e:
+            logger.warning(f"⚠️ Per-student feature attributions unavailable, serving global impacts: {e}")
+            return None
+    
+    def _load_counterfactual_search(self) -> CounterfactualSearch:
+        """Searcher over the analysis forest's thresholds"""
+        if self.counterfactual_search is not None:
+            return self.counterfactual_search
+        with self._counterfactual_lock:
+            # Concurrent first requests wait here for one build instead of each compiling the models
+            if self.counterfactual_search is None:
+                if self.analysis_forest is None:
+                    self.analysis_forest = CompiledForest.from_models(self.regression_models,
+                                                                      self.classification_models)
+                self.counterfactual_search = CounterfactualSearch(
+                    self.analysis_forest, self.schema, list(self.encoders['performance_level'].classes_), self.score_matrix
+                )
+        return self.counterfactual_search
     
     def preprocess_input(self, student_data: Dict[str, Any]) -> pd.DataFrame:
         """Preprocess student data for prediction with new features"""
-        
-        # Updated field mapping to match new frontend fields
-        field_mapping = {
-            # Cognitive Abilities
-            'cognitiveAbility': 'cognitive_ability',
-            'workingMemory': 'working_memory',
-            'processingSpeed': 'processing_speed', 
-            'verbalReasoning': 'verbal_reasoning',
-            'quantitativeReasoning': 'quantitative_reasoning',
-            
-            # Academic Behaviors
-            'studyHoursDaily': 'study_hours_daily',
-            'attendanceRate': 'attendance_rate',
-            'homeworkCompletion': 'homework_completion',
-            'classParticipation': 'class_participation',
-            'assignmentQuality': 'assignment_quality',
-            'noteTakingQuality': 'note_taking_quality',
-            'studyConsistency': 'study_consistency',
-            'academicSelfEfficacy': 'academic_self_efficacy',
-            
-            # Learning Strategies
-            'metacognitionSkills': 'metacognition_skills',
-            'criticalThinking': 'critical_thinking',
-            'timeManagement': 'time_management',
-            'learningAdaptability': 'learning_adaptability',
-            'informationSynthesis': 'information_synthesis',
-            
-            # Personal Wellbeing
-            'sleepHours': 'sleep_hours',
-            'sleepQuality': 'sleep_quality',
-            'motivationLevel': 'motivation_level',
-            'stressManagement': 'stress_management',
-            'resilience': 'resilience',
-            'focusConcentration': 'focus_concentration',
-            'procrastinationTendency': 'procrastination_tendency',
-            'academicAnxiety': 'academic_anxiety',
-            
-            # Support & Environment
-            'peerAcademicSupport': 'peer_academic_support',
-            'facultySupport': 'faculty_support',
-            'learningEnvironmentQuality': 'learning_environment_quality',
-            'technologyAccess': 'technology_access',
-            'financialStability': 'financial_stability',
-            
-            # Background Info
-            'age': 'age',
-            'gender': 'gender',
-            'firstGeneration': 'first_generation',
-            'transferStudent': 'transfer_student',
-            'employmentHours': 'employment_hours',
-            'commuteTimeMinutes': 'commute_time_minutes',
-            'extracurricularHours': 'extracurricular_hours',
-            'academicMajor': 'academic_major',
+        return pd.DataFrame(self.schema.transform(student_data)[None, :], columns=self.feature_columns)
+    
+    def preprocess_batch(self, students: List[Dict[str, Any]]):
+        """Map and encode many students into a single float32 feature matrix; returns (X, invalid row mask)"""
+        return self.schema.transform_batch(students)
+    
+    def _validate_students(self, students: List[Dict[str, Any]], check_rules: bool = True):
+        """Feature matrix plus, per student, why it cannot be scored (None for usable students)"""
+        X, invalid = self.preprocess_batch(students)
+        errors = self.rules.row_errors(students) if check_rules else [None] * len(students)
+        for i in np.flatnonzero(invalid):
+            try:
+                self.schema.transform(students[i])
+            except ValueError as e:
+                errors[i] = str(e)
+        return X, errors
+    
+    def _invalid_student(self, error: str) -> Dict[str, Any]:
+        """Failure entry for a student whose fields could not be read"""
+        return {
+            'success': False,
+            'error': error
         }
-        
-        # Create mapped data with balanced defaults
-        mapped_data = {}
-        for frontend_field, dataset_field in field_mapping.items():
-            if frontend_field in student_data and student_data[frontend_field] is not None:
-                mapped_data[dataset_field] = student_data[frontend_field]
-            else:
-                mapped_data[dataset_field] = self._get_balanced_default_value(dataset_field)
-        
-        # Convert to DataFrame
-        df = pd.DataFrame([mapped_data])
-        
-        # Encode categorical variables
-        categorical_columns = ['gender', 'academic_major']
-        for col in categorical_columns:
-            if col in self.encoders and col in df.columns:
-                try:
-                    if df[col].iloc[0] in self.encoders[col].classes_:
-                        df[col] = self.encoders[col].transform([df[col].iloc[0]])[0]
-                    else:
-                        df[col] = 0
-                except Exception as e:
-                    logger.warning(f"Error encoding {col}: {e}")
-                    df[col] = 0
-        
-        # Ensure binary columns are integers
-        binary_columns = ['first_generation', 'transfer_student']
-        for col in binary_columns:
-            if col in df.columns:
-                df[col] = df[col].astype(int)
-        
-        # Ensure all feature columns are present
-        for col in self.feature_columns:
-            if col not in df.columns:
-                df[col] = 0
-        
-        # Reorder columns to match training data
-        df = df[self.feature_columns] if all(col in df.columns for col in self.feature_columns) else df
-        
-        return df
+    
     def _get_balanced_default_value(self, field_name: str) -> Any:
         """Get balanced default values for missing fields"""
-        defaults = {
-            # Cognitive Abilities
-            'cognitive_ability': 100,
-            'working_memory': 6,
-            'processing_speed': 6,
-            'verbal_reasoning': 6,
-            'quantitative_reasoning': 6,
-            
-            # Academic Behaviors
-            'study_hours_daily': 4.5,
-            'attendance_rate': 80.0,
-            'homework_completion': 75.0,
-            'class_participation': 6,
-            'assignment_quality': 7,
-            'note_taking_quality': 6,
-            'study_consistency': 6,
-            'academic_self_efficacy': 7,
-            
-            # Learning Strategies
-            'metacognition_skills': 6,
-            'critical_thinking': 7,
-            'time_management': 6,
-            'learning_adaptability': 7,
-            'information_synthesis': 6,
-            
-            # Personal Wellbeing
-            'sleep_hours': 7.0,
-            'sleep_quality': 7,
-            'motivation_level': 7,
-            'stress_management': 6,
-            'resilience': 7,
-            'focus_concentration': 7,
-            'procrastination_tendency': 5,
-            'academic_anxiety': 4,
-            
-            # Support & Environment
-            'peer_academic_support': 6,
-            'faculty_support': 6,
-            'learning_environment_quality': 7,
-            'technology_access': 8,
-            'financial_stability': 6,
-            
-            # Background Info
-            'age': 20,
-            'gender': 'Male',
-            'first_generation': 0,
-            'transfer_student': 0,
-            'employment_hours': 10,
-            'commute_time_minutes': 25,
-            'extracurricular_hours': 5,
-            'academic_major': 'STEM'
-        }
-        return defaults.get(field_name, 0)  
+        return DEFAULT_VALUES.get(field_name, 0)
+    
     def predict(self, student_data: Dict[str, Any]) -> Dict[str, Any]:
         """Make prediction for student data"""
+        start_time = time.perf_counter()
         try:
-            logger.info(f"📊 Making prediction for data: {student_data}")
-            
-            # Preprocess input
-            X = self.preprocess_input(student_data)
-            logger.info(f"✅ Preprocessed data shape: {X.shape}")
-            
-            # Regression predictions (score)
-            regression_predictions = []
-            for name, model in self.regression_models.items():
-                try:
-                    pred = model.predict(X)[0]
-                    # Convert to Python float immediately
-                    pred = float(pred)
-                    regression_predictions.append(pred)
-                    logger.info(f"📈 {name} regression prediction: {pred}")
-                except Exception as e:
-                    logger.error(f"❌ {name} regression failed: {e}")
-                    regression_predictions.append(70.0)  # Default fallback
-            
-            # Ensemble regression (weighted average)
-            final_score = float(np.mean(regression_predictions))
-            logger.info(f"🎯 Final ensemble score: {final_score}")
+            results, timing = self._predict_many([student_data])
+            result = results[0]
             
-            # Classification predictions (performance level)
-            classification_predictions = []
-            classification_probas = []
-            
-            for name, model in self.classification_models.items():
-                try:
-                    pred = int(model.predict(X)[0])  # Convert to Python int
-                    proba = [float(p) for p in model.predict_proba(X)[0]]  # Convert to Python floats
-                    classification_predictions.append(pred)
-                    classification_probas.append(proba)
-                    logger.info(f"📊 {name} classification: {pred}, confidence: {np.max(proba):.2f}")
-                except Exception as e:
-                    logger.error(f"❌ {name} classification failed: {e}")
-                    classification_predictions.append(1)  # Default to Medium
-                    classification_probas.append([0.33, 0.34, 0.33])
-            
-            # Ensemble classification (majority vote)
-            final_class = max(set(classification_predictions), key=classification_predictions.count)
-            avg_proba = [float(p) for p in np.mean(classification_probas, axis=0)]  # Convert to Python floats
-            confidence = float(np.max(avg_proba))
-            
-            # Decode performance level
-            try:
-                performance_level = str(self.encoders['performance_level'].inverse_transform([final_class])[0])
-            except:
-                performance_level = 'Medium'  # Fallback
-            
-            # Generate insights and recommendations
-            insights = self._generate_insights(student_data, final_score, performance_level)
-            feature_impact = self._analyze_feature_impact(student_data, X)
-            
-            result = {
-                'success': True,
-                'predictions': {
-                    'final_score': round(final_score, 1),
-                    'performance_level': performance_level,
-                    'confidence': round(confidence * 100, 1),
-                    'score_range': self._calculate_score_range(regression_predictions),
-                    'model_breakdown': {
-                        'xgboost_score': round(regression_predictions[0], 1),
-                        'catboost_score': round(regression_predictions[1], 1),
-                        'ensemble_score': round(final_score, 1)
-                    }
-                },
-                'insights': insights,
-                'feature_impact': feature_impact,
-                'recommendations': self._generate_recommendations(student_data, final_score, performance_level)
-            }
-            
-            # Convert all NumPy types to Python native types
-            result = self._convert_to_serializable(result)
-            
-            logger.info(f"✅ Prediction successful: {result['predictions']}")
+            if result['success'] and request_log.should_log():
+                request_log.record(
+                    'prediction',
+                    students=1,
+                    latency_ms=round((time.perf_counter() - start_time) * 1000, 3),
+                    **{stage: round(ms, 3) for stage, ms in timing.items()},
+                    final_score=result['predictions']['final_score'],
+                    performance_level=result['predictions']['performance_level'],
+                    model_version=self.manifest['version'] if self.manifest is not None else None
+                )
             return result
             
         except Exception as e:
-            logger.error(f"❌ Prediction error: {e}")
+            logger.error("❌ Prediction error: %s", e)
+            metrics.increment('prediction_errors_total')
             return {
                 'success': False,
                 'error': str(e)
             }
     
+    def batch_predict(self, students: List[Dict[str, Any]], use_cache: bool = False) -> Dict[str, Any]:
+        """Score many students with a single pass of every model over one feature matrix"""
+        start_time = time.perf_counter()
+        
+        results: List[Dict[str, Any]] = [None] * len(students)
+        valid_indices = []
+        for index, student in enumerate(students):
+            if isinstance(student, dict):
+                valid_indices.append(index)
+            else:
+                results[index] = {
+                    'success': False,
+                    'error': 'Student data must be an object'
+                }
+        
+        timing = {'preprocess_ms': 0.0, 'inference_ms': 0.0, 'postprocess_ms': 0.0}
+        if valid_indices:
+            batch_results, timing = self._predict_many([students[i] for i in valid_indices], use_cache=use_cache)
+            for index, result in zip(valid_indices, batch_results):
+                results[index] = result
+        
+        for index, result in enumerate(results):
+            result['student_index'] = index
+        
+        total_ms = (time.perf_counter() - start_time) * 1000
+        successful = sum(result['success'] for result in results)
+        
+        if request_log.should_log():
+            request_log.record(
+                'batch_prediction',
+                students=len(students),
+                successful=successful,
+                latency_ms=round(total_ms, 3),
+                **{stage: round(ms, 3) for stage, ms in timing.items()},
+                model_version=self.manifest['version'] if self.manifest is not None else None
+            )
+        
+        return {
+            'results': results,
+            'batch_size': len(students),
+            'successful': successful,
+            'failed': len(students) - successful,
+            'timing': {
+                'total_ms': round(total_ms, 2),
+                'preprocess_ms': round(timing['preprocess_ms'], 2),
+                'inference_ms': round(timing['inference_ms'], 2),
+                'postprocess_ms': round(timing['postprocess_ms'], 2),
+                'per_student_ms': round(total_ms / len(students), 4) if students else 0.0
+            }
+        }
+    
+    def _predict_many(self, students: List[Dict[str, Any]], use_cache: bool = True):
+        """Shared batch core: preprocess once, run each model once, then build per-student results"""
+        stage_start = time.perf_counter()
+        X, errors = self._validate_students(students)
+        if any(errors):
+            # Students with unusable fields get a failure entry; the rest of the batch is scored as usual
+            valid = [i for i, error in enumerate(errors) if error is None]
+            results = [self._invalid_student(error) for error in errors]
+            timing = {'preprocess_ms': (time.perf_counter() - stage_start) * 1000, 'inference_ms': 0.0,
+                      'postprocess_ms': 0.0}
+            if valid:
+                valid_results, timing = self._predict_many([students[i] for i in valid], use_cache)
+                for i, result in zip(valid, valid_results):
+                    results[i] = result
+            return results, timing
+        preprocess_end = time.perf_counter()
+        
+        regression_predictions, final_scores, performance_levels, confidences, _ = self._ensemble_outputs(X, use_cache)
+        inference_end = time.perf_counter()
+        
+        # Insight and recommendation rules for the whole batch in one pass
+        rule_insights, recommendations = self.rules.evaluate(students, final_scores, performance_levels)
+        rules_end = time.perf_counter()
+        
+        explanations = self._analyze_feature_impact(X, use_cache)
+        explain_end = time.perf_counter()
+        
+        rankings = self._rank_scores(final_scores)
+        
+        results = []
+        for i, student_data in enumerate(students):
+            results.append(self._build_result(
+                student_data,
+                explanations[i],
+                rankings[i],
+                [float(p) for p in regression_predictions[i]],
+                float(final_scores[i]),
+                performance_levels[i],
+                float(confidences[i]),
+                rule_insights[i],
+                recommendations[i]
+            ))
+        postprocess_end = time.perf_counter()
+        metrics.observe('stage_duration_seconds', preprocess_end - stage_start, stage='preprocess')
+        metrics.observe('stage_duration_seconds', explain_end - rules_end, stage='explain')
+        metrics.observe('stage_duration_seconds', postprocess_end - explain_end, stage='build_result')
+        
+        timing = {
+            'preprocess_ms': (preprocess_end - stage_start) * 1000,
+            'inference_ms': (inference_end - preprocess_end) * 1000,
+            'postprocess_ms': (postprocess_end - inference_end) * 1000
+        }
+        return results, timing
+    
+    def batch_predict_columnar(self, students: List[Dict[str, Any]], use_cache: bool = False) -> Dict[str, Any]:
+        """Scores only, one array per field instead of one object per student, for compact batch responses"""
+        start_time = time.perf_counter()
+        valid_indices = [index for index, student in enumerate(students) if isinstance(student, dict)]
+        X, invalid = self.preprocess_batch([students[i] for i in valid_indices])
+        valid_indices = [index for index, bad in zip(valid_indices, invalid) if not bad]
+        X = X[~invalid]
+        scores = self.score_matrix(X, use_cache=use_cache)
+        
+        columns = {
+            'student_index': np.asarray(valid_indices, dtype=np.int64),
+            'final_score': np.round(scores['final_scores'], 1),
+            'performance_level': scores['performance_levels'],
+            'confidence': np.round(scores['confidences'] * 100, 1)
+        }
+        for i, name in enumerate(self.regression_models):
+            columns[f'{name}_score'] = np.round(scores['regression_predictions'][:, i], 1)
+        
+        total_ms = (time.perf_counter() - start_time) * 1000
+        return {
+            'columns': columns,
+            'batch_size': len(students),
+            'successful': len(valid_indices),
+            'failed': len(students) - len(valid_indices),
+            'failed_indices': sorted(set(range(len(students))) - set(valid_indices)),
+            'timing': {
+                'total_ms': round(total_ms, 2),
+                'per_student_ms': round(total_ms / len(students), 4) if students else 0.0
+            }
+        }
+    
+    def what_if(self, student_data: Dict[str, Any], sweeps: Dict[str, List[Any]]) -> Dict[str, Any]:
+        """Sensitivity curves: the student re-scored with one feature at a time set to each given value"""
+        start_time = time.perf_counter()
+        base = self.schema.transform(student_data)[None, :]
+        
+        # Whole perturbation grid as one matrix: the unchanged row, then one block of copies per feature
+        spans, blocks, offset = {}, [base], 1
+        for field, values in sweeps.items():
+            idx, encoded = self.schema.encode_values(field, values)
+            block = np.repeat(base, len(encoded), axis=0)
+            block[:, idx] = encoded
+            blocks.append(block)
+            spans[field] = (offset, offset + len(encoded))
+            offset += len(encoded)
+        X = np.vstack(blocks)
+        grid_end = time.perf_counter()
+        
+        scores = self.score_matrix(X)
+        inference_end = time.perf_counter()
+        
+        # Changes are taken between the rounded scores, so each one is exactly its final_score minus the baseline's
+        final_scores = np.round(np.asarray(scores['final_scores'], dtype=np.float64), 1)
+        curves = {}
+        for field, (begin, end) in spans.items():
+            curves[field] = {
+                'values': list(sweeps[field]),
+                'final_score': final_scores[begin:end],
+                'score_change': np.round(final_scores[begin:end] - final_scores[0], 1),
+                'performance_level': scores['performance_levels'][begin:end],
+                'confidence': np.round(scores['confidences'][begin:end] * 100, 1)
+            }
+        
+        total_ms = (time.perf_counter() - start_time) * 1000
+        return {
+            'baseline': {
+                'final_score': float(final_scores[0]),
+                'performance_level': scores['performance_levels'][0],
+                'confidence': round(float(scores['confidences'][0]) * 100, 1)
+            },
+            'curves': curves,
+            'grid_size': len(X),
+            'timing': {
+                'total_ms': round(total_ms, 2),
+                'grid_ms': round((grid_end - start_time) * 1000, 2),
+                'inference_ms': round((inference_end - grid_end) * 1000, 2)
+            }
+        }
+    
+    def counterfactuals(self, students: List[Dict[str, Any]], target_level: str, max_changes: int = MAX_CHANGES,
+                        features: List[str] = None) -> Dict[str, Any]:
+        """Smallest change to actionable features that brings each student to the target performance level"""
+        start_time = time.perf_counter()
+        search = self._load_counterfactual_search()
+        X, errors = self._validate_students(students, check_rules=False)
+        valid = [i for i, error in enumerate(errors) if error is None]
+        plans, evaluated = [self._invalid_student(error) for error in errors], 0
+        if valid:
+            valid_plans, evaluated = search.search(X[valid], [target_level] * len(valid), max_changes=max_changes,
+                                                   fields=features)
+            for i, plan in zip(valid, valid_plans):
+                plans[i] = {'success': True, **plan}
+        elapsed = time.perf_counter() - start_time
+        metrics.observe('stage_duration_seconds', elapsed, stage='counterfactual')
+        
+        return {
+            'results': plans,
+            'batch_size': len(students),
+            'reached': sum(plan.get('reached', False) for plan in plans),
+            'candidates_evaluated': evaluated,
+            'timing': {
+                'total_ms': round(elapsed * 1000, 2),
+                'per_student_ms': round(elapsed * 1000 / len(students), 4) if students else 0.0
+            }
+        }
+    
+    def score_matrix(self, X: np.ndarray, use_cache: bool = False) -> Dict[str, Any]:
+        """Ensemble scores, levels and confidences for a preprocessed feature matrix, without insights"""
+        regression_predictions, final_scores, performance_levels, confidences, class_probabilities = \
+            self._ensemble_outputs(X, use_cache)
+        return {
+            'regression_predictions': regression_predictions,
+            'final_scores': final_scores,
+            'performance_levels': performance_levels,
+            'confidences': confidences,
+            'class_probabilities': class_probabilities
+        }
+    
+    def _ensemble_outputs(self, X: np.ndarray, use_cache: bool):
+        """Run every model on X and combine them into per-row ensemble outputs"""
+        start = time.perf_counter()
+        if use_cache and self.cache is not None:
+            regression_predictions, classification_probas = self._run_models_cached(X)
+        else:
+            regression_predictions, classification_probas = self._run_models(X)
+        models_end = time.perf_counter()
+        
+        # Ensemble regression (average of all regressors, failed models count as 70)
+        regression_predictions = np.where(np.isnan(regression_predictions), 70.0, regression_predictions)
+        final_scores = regression_predictions.mean(axis=1)
+        
+        # Ensemble classification from the (weighted) probability matrix
+        final_classes, avg_probas = self._ensemble_classify(classification_probas)
+        confidences = avg_probas.max(axis=1)
+        performance_levels = self._decode_performance_levels(final_classes)
+        
+        metrics.observe('stage_duration_seconds', models_end - start, stage='models')
+        metrics.observe('stage_duration_seconds', time.perf_counter() - models_end, stage='ensemble')
+        metrics.increment('students_scored_total', len(X))
+        return regression_predictions, final_scores, performance_levels, confidences, avg_probas
+    
+    def _run_models_cached(self, X: np.ndarray):
+        """Serve model outputs from the prediction cache, scoring only the missed rows"""
+        keys = self.cache.keys_for(X)
+        cached = self.cache.get_many(keys)
+        missed = [i for i, value in enumerate(cached) if value is None]
+        
+        if missed:
+            missed_regression, missed_probas = self._run_models(X[missed])
+            # Only fully successful outputs are cached, so a transient model failure is not remembered
+            complete = ~(np.isnan(missed_regression).any(axis=1) | np.isnan(missed_probas).any(axis=(0, 2)))
+            self.cache.put_many(
+                [keys[i] for i, ok in zip(missed, complete) if ok],
+                [(missed_regression[j], missed_probas[:, j]) for j, ok in enumerate(complete) if ok]
+            )
+            for j, i in enumerate(missed):
+                cached[i] = (missed_regression[j], missed_probas[:, j])
+        
+        regression_predictions = np.stack([regression for regression, _ in cached])
+        classification_probas = np.stack([probas for _, probas in cached], axis=1)
+        return regression_predictions, classification_probas
+    
+    def _run_models(self, X: np.ndarray):
+        """Score X with the compiled forest for small batches, native models otherwise"""
+        if self.forest is not None and len(X) <= self.compiled_batch_limit:
+            start = time.perf_counter()
+            outputs = self.forest.predict(X)
+            metrics.observe('model_duration_seconds', time.perf_counter() - start, model='compiled_forest', task='all')
+            return outputs
+        return self._run_native_models(X)
+    
+    def _run_native_models(self, X: np.ndarray):
+        """Run every regressor and classifier exactly once over the whole feature matrix"""
+        n_rows = len(X)
+        
+        # Regression predictions (score), one column per model
+        regression_predictions = np.empty((n_rows, len(self.regression_models)))
+        for i, (name, model) in enumerate(self.regression_models.items()):
+            start = time.perf_counter()
+            try:
+                regression_predictions[:, i] = model.predict(X)
+            except Exception as e:
+                logger.error("❌ %s regression failed: %s", name, e)
+                metrics.increment('model_errors_total', model=name, task='regression')
+                regression_predictions[:, i] = np.nan  # Replaced by the default score when ensembling
+            metrics.observe('model_duration_seconds', time.perf_counter() - start, model=name, task='regression')
+        
+        # Class probabilities (performance level), one matrix per model; classes come from argmax later
+        n_classes = len(self.encoders['performance_level'].classes_) if 'performance_level' in self.encoders else 3
+        classification_probas = np.empty((len(self.classification_models), n_rows, n_classes))
+        for i, (name, model) in enumerate(self.classification_models.items()):
+            start = time.perf_counter()
+            try:
+                classification_probas[i] = model.predict_proba(X)
+            except Exception as e:
+                logger.error("❌ %s classification failed: %s", name, e)
+                metrics.increment('model_errors_total', model=name, task='classification')
+                classification_probas[i] = np.nan  # Failed models drop out of the vote
+            metrics.observe('model_duration_seconds', time.perf_counter() - start, model=name, task='classification')
+        
+        return regression_predictions, classification_probas
+    
+    def _ensemble_classify(self, classification_probas: np.ndarray):
+        """Soft or hard vote over per-model probability matrices with per-model weights"""
+        n_models, n_rows, n_classes = classification_probas.shape
+        weights = np.array([float(self.classifier_weights.get(name, 1.0)) for name in self.classification_models])
+        
+        # Weight of every model for every row; failed models (NaN) get zero weight
+        row_weights = weights[:, None] * ~np.isnan(classification_probas[:, :, 0])
+        probas = np.nan_to_num(classification_probas)
+        total_weight = row_weights.sum(axis=0)
+        
+        avg_probas = np.einsum('mn,mnk->nk', row_weights, probas)
+        avg_probas = np.where(
+            total_weight[:, None] > 0,
+            avg_probas / np.where(total_weight > 0, total_weight, 1.0)[:, None],
+            1.0 / n_classes  # No model answered: uniform probabilities
+        )
+        
+        if self.voting == 'soft':
+            final_classes = avg_probas.argmax(axis=1)
+        else:
+            # Weighted majority vote over each model's argmax, ties go to the lowest class index
+            model_votes = probas.argmax(axis=2)[:, :, None] == np.arange(n_classes)
+            votes = (model_votes * row_weights[:, :, None]).sum(axis=0)
+            final_classes = votes.argmax(axis=1)
+        
+        return final_classes, avg_probas
+    
+    def _decode_performance_levels(self, classes: np.ndarray) -> List[str]:
+        """Decode encoded performance classes back to their labels"""
+        try:
+            return [str(level) for level in self.encoders['performance_level'].inverse_transform(classes)]
+        except Exception:
+            return ['Medium'] * len(classes)  # Fallback
+    
+    def _rank_scores(self, final_scores: np.ndarray) -> List[Dict[str, Any]]:
+        """Population percentile and next target score for every student, in one lookup for the batch"""
+        if self.score_index is None:
+            return [None] * len(final_scores)
+        percentiles = self.score_index.percentiles(final_scores)
+        targets = np.maximum(self.score_index.scores_at(np.minimum(percentiles + IMPROVEMENT_STEP, 99)), final_scores)
+        return [{'percentile': float(p), 'target_score': float(t)} for p, t in zip(percentiles, targets)]
+    
+    def _build_result(self, student_data: Dict[str, Any], explanation: Dict[str, Any], ranking: Dict[str, Any],
+                      regression_predictions: List[float], final_score: float,
+                      performance_level: str, confidence: float,
+                      rule_insights: Dict[str, List[str]], recommendations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Assemble the API response for one student from ensemble outputs and fired rules"""
+        insights = self._generate_insights(student_data, final_score, performance_level, rule_insights, ranking)
+        
+        result = {
+            'success': True,
+            'predictions': {
+                'final_score': round(final_score, 1),
+                'performance_level': performance_level,
+                'confidence': round(confidence * 100, 1),
+                'score_range': self._calculate_score_range(regression_predictions),
+                'model_breakdown': {
+                    'xgboost_score': round(regression_predictions[0], 1),
+                    'catboost_score': round(regression_predictions[1], 1),
+                    'ensemble_score': round(final_score, 1)
+                }
+            },
+            'insights': insights,
+            'feature_impact': explanation['feature_impact'],
+            'feature_contributions': explanation['feature_contributions'],
+            'recommendations': recommendations
+        }
+        
+        # Every value is already a native type; ml.serialization handles any NumPy ones in one pass
+        return result
+    
     def _calculate_score_range(self, predictions: List[float]) -> Dict[str, float]:
         """Calculate confidence interval for score prediction"""
         min_score = float(min(predictions))
@@ -304,121 +660,53 @@ class EnsemblePredictor:
             'range': round(max_score - min_score, 1)
         }
     
-    def _generate_insights(self, student_data: Dict[str, Any], predicted_score: float, performance_level: str) -> Dict[str, Any]:
+    def _generate_insights(self, student_data: Dict[str, Any], predicted_score: float, performance_level: str,
+                           rule_insights: Dict[str, List[str]] = None,
+                           ranking: Dict[str, Any] = None) -> Dict[str, Any]:
         """Generate meaningful insights using cognitive and behavioral data"""
+        if rule_insights is None:
+            rule_insights = self.rules.evaluate([student_data], [predicted_score], [performance_level])[0][0]
+        if ranking is None:
+            ranking = self._rank_scores(np.array([predicted_score]))[0]
         
         insights = {
-            'strengths': [],
-            'weaknesses': [],
-            'opportunities': [],
+            'strengths': rule_insights['strengths'],
+            'weaknesses': rule_insights['weaknesses'],
+            'opportunities': rule_insights['opportunities'],
             'comparison': {},
             'performance_analysis': {}
         }
         
-        # Get cognitive data
-        cognitive_ability = student_data.get('cognitiveAbility', 100)
-        working_memory = student_data.get('workingMemory', 6)
-        processing_speed = student_data.get('processingSpeed', 6)
-        motivation_level = student_data.get('motivationLevel', 7)
-        time_management = student_data.get('timeManagement', 6)
-        focus_concentration = student_data.get('focusConcentration', 7)
-        sleep_quality = student_data.get('sleepQuality', 7)
-        
-        # Cognitive Strengths
-        if cognitive_ability >= 110:
-            insights['strengths'].append(f"Exceptional cognitive ability ({cognitive_ability}) - strong learning potential")
-        elif cognitive_ability >= 100:
-            insights['strengths'].append(f"Above average cognitive ability ({cognitive_ability}) - good academic foundation")
-        
-        if working_memory >= 8:
-            insights['strengths'].append(f"Strong working memory ({working_memory}/10) - excellent information retention")
-        elif working_memory >= 7:
-            insights['strengths'].append(f"Good working memory ({working_memory}/10) - effective learning capacity")
-        
-        if processing_speed >= 8:
-            insights['strengths'].append(f"Fast processing speed ({processing_speed}/10) - quick learning adaptation")
-        
-        # Behavioral Strengths
-        if motivation_level >= 8:
-            insights['strengths'].append(f"High motivation level ({motivation_level}/10) - strong drive for success")
-        
-        if time_management >= 8:
-            insights['strengths'].append(f"Excellent time management ({time_management}/10) - efficient study habits")
-        
-        if focus_concentration >= 8:
-            insights['strengths'].append(f"Strong focus and concentration ({focus_concentration}/10) - effective learning sessions")
-        
-        if sleep_quality >= 8:
-            insights['strengths'].append(f"Good sleep quality ({sleep_quality}/10) - supports cognitive performance")
-        
-        # Cognitive Weaknesses
-        if cognitive_ability < 90:
-            insights['weaknesses'].append(f"Below average cognitive ability ({cognitive_ability}) - may need learning support")
-        
-        if working_memory < 6:
-            insights['weaknesses'].append(f"Weak working memory ({working_memory}/10) - affects information retention")
-        
-        if processing_speed < 6:
-            insights['weaknesses'].append(f"Slow processing speed ({processing_speed}/10) - may need more time for complex tasks")
-        
-        # Behavioral Weaknesses
-        if motivation_level < 6:
-            insights['weaknesses'].append(f"Low motivation ({motivation_level}/10) - affects learning engagement")
-        
-        if time_management < 6:
-            insights['weaknesses'].append(f"Poor time management ({time_management}/10) - inefficient study planning")
-        
-        if focus_concentration < 6:
-            insights['weaknesses'].append(f"Weak focus ({focus_concentration}/10) - reduced learning efficiency")
-        
-        if sleep_quality < 6:
-            insights['weaknesses'].append(f"Poor sleep quality ({sleep_quality}/10) - impacts cognitive function")
-        
-        # Opportunities based on cognitive profile
-        if cognitive_ability >= 100 and predicted_score < 80:
-            insights['opportunities'].append("Leverage strong cognitive abilities to achieve higher academic performance")
-        
-        if working_memory >= 7 and processing_speed >= 7:
-            insights['opportunities'].append("Use your strong cognitive processing to master complex subjects quickly")
-        
-        if motivation_level >= 7 and time_management < 7:
-            insights['opportunities'].append("Channel high motivation into better time management for maximum impact")
-        
-        # Add at least some insights if none generated
-        if not insights['strengths']:
-            insights['strengths'].append("Solid baseline profile - focus on developing specific cognitive strengths")
-        
-        if not insights['weaknesses']:
-            insights['weaknesses'].append("No major weaknesses identified - focus on optimizing current strategies")
-        
-        if not insights['opportunities']:
-            insights['opportunities'].append("Build on current foundation with advanced learning techniques")
-        
         # Performance analysis (keep your existing structure)
         insights['performance_analysis'] = {
             'current_level': performance_level,
             'predicted_score': predicted_score,
-            'score_interpretation': self._get_score_interpretation(predicted_score),
-            'improvement_potential': self._calculate_improvement_potential(predicted_score, performance_level)
+            'score_interpretation': self._get_score_interpretation(predicted_score, ranking),
+            'improvement_potential': self._calculate_improvement_potential(predicted_score, performance_level, ranking)
         }
         
-        # Comparison metrics (keep your existing structure)
+        # Comparison metrics (keep your existing structure); the benchmark is the level's median true score
         benchmark_scores = {'Low': 55, 'Medium': 70, 'High': 85, 'Excellent': 90}
-        benchmark = benchmark_scores.get(performance_level, 70)
+        if self.score_index is not None and performance_level in self.score_index.level_medians:
+            benchmark = round(self.score_index.level_medians[performance_level], 1)
+        else:
+            benchmark = benchmark_scores.get(performance_level, 70)
         score_gap = predicted_score - benchmark
         
         insights['comparison'] = {
             'predicted_vs_benchmark': round(score_gap, 1),
             'performance_tier': performance_level,
-            'percentile_estimate': self._estimate_percentile(predicted_score, performance_level),
+            'percentile_estimate': self._estimate_percentile(predicted_score, performance_level, ranking),
             'benchmark_score': benchmark,
             'performance_gap_analysis': self._get_gap_analysis(score_gap, performance_level)
         }
         
         return insights
 
-    def _get_score_interpretation(self, score: float) -> str:
+    def _get_score_interpretation(self, score: float, ranking: Dict[str, Any] = None) -> str:
         """Provide interpretation of the predicted score"""
+        if ranking is not None:
+            return self._percentile_band(ranking['percentile'])[1]
         if score >= 90:
             return "Exceptional performance - demonstrates mastery of concepts"
         elif score >= 80:
@@ -430,8 +718,17 @@ class EnsemblePredictor:
         else:
             return "Needs improvement - focus on fundamental concepts and study habits"
     
-    def _calculate_improvement_potential(self, current_score: float, level: str) -> Dict[str, Any]:
+    def _calculate_improvement_potential(self, current_score: float, level: str,
+                                         ranking: Dict[str, Any] = None) -> Dict[str, Any]:
         """Calculate realistic improvement potential"""
+        if ranking is not None:
+            _, _, timeline, focus_area = self._percentile_band(ranking['percentile'])
+            return {
+                'short_term_target': round(ranking['target_score']),
+                'potential_gain': round(ranking['target_score'] - current_score, 1),
+                'timeline': timeline,
+                'focus_area': focus_area
+            }
         if level == 'Low' and current_score < 60:
             next_target = 65
             potential_gain = next_target - current_score
@@ -494,8 +791,14 @@ class EnsemblePredictor:
         else:
             return "Significantly below benchmark - requires substantial intervention"
     
-    def _estimate_percentile(self, score: float, level: str) -> int:
+    def _percentile_band(self, percentile: float):
+        """The PERCENTILE_BANDS entry a population percentile falls in"""
+        return next(band for band in PERCENTILE_BANDS if percentile >= band[0])
+    
+    def _estimate_percentile(self, score: float, level: str, ranking: Dict[str, Any] = None) -> int:
         """Estimate percentile rank based on score and performance level"""
+        if ranking is not None:
+            return int(min(99, max(1, round(ranking['percentile']))))
         percentiles = {
             'Low': max(10, min(30, int((score - 40) / 20 * 20))),
             'Medium': max(40, min(70, int((score - 60) / 20 * 30 + 40))),
@@ -504,290 +807,28 @@ class EnsemblePredictor:
         }
         return percentiles.get(level, 50)
     
-    def _analyze_feature_impact(self, student_data: Dict[str, Any], processed_data: pd.DataFrame) -> Dict[str, float]:
-        """Provide balanced, realistic feature impacts for cognitive-educational model"""
-        
-        # Use balanced cognitive-focused impacts (override model weights)
-        balanced_impacts = {
-            # Cognitive Factors (40%)
-            'Cognitive Ability': 15.2,
-            'Working Memory': 9.8,
-            'Critical Thinking': 8.5,
-            'Processing Speed': 6.5,
-            
-            # Learning Behaviors (35%)
-            'Study Hours': 11.2,
-            'Time Management': 9.4,
-            'Study Consistency': 7.8,
-            'Metacognition': 6.6,
-            
-            # Motivation & Mindset (15%)
-            'Motivation': 8.7,
-            'Academic Confidence': 6.3,
-            
-            # Environmental Factors (10%)
-            'Attendance': 4.2,
-            'Homework Completion': 3.8,
-            'Sleep Quality': 2.0,
-            
-            # Additional important factors
-            'Focus': 7.1,
-            'Learning Adaptability': 5.2
-        }
-        
-        # Normalize to 100% and round properly
-        total = sum(balanced_impacts.values())
-        normalized_impacts = {k: round((v / total) * 100, 1) for k, v in balanced_impacts.items()}
-        
-        # Return top 10 factors, sorted by impact
-        return dict(sorted(normalized_impacts.items(), key=lambda x: x[1], reverse=True)[:10])
-
- 
+    def _analyze_feature_impact(self, X: np.ndarray, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Per-student attributions of the ensemble score, falling back to the training-time global impacts"""
+        if self.explainer is not None:
+            try:
+                if not (use_cache and self.explanation_cache is not None):
+                    return self.explainer.explain_students(X)
+                
+                keys = self.explanation_cache.keys_for(X)
+                explanations = self.explanation_cache.get_many(keys)
+                missed = [i for i, value in enumerate(explanations) if value is None]
+                if missed:
+                    fresh = self.explainer.explain_students(X[missed])
+                    self.explanation_cache.put_many([keys[i] for i in missed], fresh)
+                    for i, explanation in zip(missed, fresh):
+                        explanations[i] = explanation
+                return explanations
+            except Exception as e:
+                logger.error("❌ Feature attribution failed: %s", e)
+                metrics.increment('model_errors_total', model='explainer', task='attribution')
+        
+        return [{'feature_impact': self.global_impact, 'feature_contributions': None}] * len(X)
+    
     def _generate_recommendations(self, student_data: Dict[str, Any], predicted_score: float, performance_level: str) -> List[Dict[str, Any]]:
         """Generate personalized recommendations with new cognitive/behavioral fields"""
-        
-        recommendations = []
-        
-        # Cognitive Abilities recommendations
-        cognitive_ability = student_data.get('cognitiveAbility', 100)
-        working_memory = student_data.get('workingMemory', 6)
-        processing_speed = student_data.get('processingSpeed', 6)
-        
-        if cognitive_ability < 90:
-            recommendations.append({
-                'category': 'Cognitive Development',
-                'title': 'Enhance Cognitive Skills',
-                'description': 'Practice problem-solving and critical thinking exercises to improve cognitive abilities',
-                'priority': 'medium',
-                'impact': 'Could improve overall academic performance by 5-10%',
-                'current_value': f'{cognitive_ability}',
-                'target_value': '90+',
-                'improvement_area': 'Cognitive Ability'
-            })
-        
-        if working_memory < 7:
-            recommendations.append({
-                'category': 'Cognitive Skills',
-                'title': 'Improve Working Memory',
-                'description': 'Use memory techniques and practice recalling information to strengthen working memory',
-                'priority': 'medium',
-                'impact': 'Better information retention and processing',
-                'current_value': f'{working_memory}/10',
-                'target_value': '7+/10',
-                'improvement_area': 'Working Memory'
-            })
-        
-        if processing_speed < 7:
-            recommendations.append({
-                'category': 'Cognitive Skills',
-                'title': 'Increase Processing Speed',
-                'description': 'Practice timed exercises and quick decision-making to improve information processing',
-                'priority': 'medium',
-                'impact': 'Faster learning and task completion',
-                'current_value': f'{processing_speed}/10',
-                'target_value': '7+/10',
-                'improvement_area': 'Processing Speed'
-            })
-        
-        # Learning Strategies recommendations
-        metacognition_skills = student_data.get('metacognitionSkills', 6)
-        time_management = student_data.get('timeManagement', 6)
-        learning_adaptability = student_data.get('learningAdaptability', 6)
-        
-        if metacognition_skills < 7:
-            recommendations.append({
-                'category': 'Learning Strategies',
-                'title': 'Develop Metacognition',
-                'description': 'Practice self-reflection on learning processes and adjust strategies accordingly',
-                'priority': 'high',
-                'impact': 'More effective and personalized learning approach',
-                'current_value': f'{metacognition_skills}/10',
-                'target_value': '7+/10',
-                'improvement_area': 'Metacognition'
-            })
-        
-        if time_management < 7:
-            recommendations.append({
-                'category': 'Study Habits',
-                'title': 'Improve Time Management',
-                'description': 'Create structured study schedules and use productivity techniques',
-                'priority': 'high',
-                'impact': 'Better study efficiency and reduced stress',
-                'current_value': f'{time_management}/10',
-                'target_value': '7+/10',
-                'improvement_area': 'Time Management'
-            })
-        
-        if learning_adaptability < 7:
-            recommendations.append({
-                'category': 'Learning Flexibility',
-                'title': 'Enhance Learning Adaptability',
-                'description': 'Practice learning in different environments and with various methods',
-                'priority': 'medium',
-                'impact': 'Better performance in diverse academic situations',
-                'current_value': f'{learning_adaptability}/10',
-                'target_value': '7+/10',
-                'improvement_area': 'Learning Adaptability'
-            })
-        
-        # Personal Wellbeing recommendations
-        sleep_quality = student_data.get('sleepQuality', 7)
-        focus_concentration = student_data.get('focusConcentration', 7)
-        procrastination_tendency = student_data.get('procrastinationTendency', 5)
-        academic_anxiety = student_data.get('academicAnxiety', 4)
-        
-        if sleep_quality < 7:
-            recommendations.append({
-                'category': 'Health & Wellness',
-                'title': 'Improve Sleep Quality',
-                'description': 'Establish consistent sleep routine and optimize sleep environment',
-                'priority': 'medium',
-                'impact': 'Better cognitive function and memory consolidation',
-                'current_value': f'{sleep_quality}/10',
-                'target_value': '7+/10',
-                'improvement_area': 'Sleep Quality'
-            })
-        
-        if focus_concentration < 7:
-            recommendations.append({
-                'category': 'Cognitive Performance',
-                'title': 'Enhance Focus',
-                'description': 'Practice mindfulness and minimize distractions during study sessions',
-                'priority': 'medium',
-                'impact': 'More efficient learning and better retention',
-                'current_value': f'{focus_concentration}/10',
-                'target_value': '7+/10',
-                'improvement_area': 'Focus & Concentration'
-            })
-        
-        if procrastination_tendency > 6:
-            recommendations.append({
-                'category': 'Productivity',
-                'title': 'Reduce Procrastination',
-                'description': 'Break tasks into smaller steps and use the Pomodoro technique',
-                'priority': 'high',
-                'impact': 'More consistent study habits and reduced stress',
-                'current_value': f'{procrastination_tendency}/10',
-                'target_value': '5/10 or less',
-                'improvement_area': 'Procrastination'
-            })
-        
-        if academic_anxiety > 6:
-            recommendations.append({
-                'category': 'Mental Health',
-                'title': 'Manage Academic Anxiety',
-                'description': 'Practice relaxation techniques and develop positive self-talk',
-                'priority': 'high',
-                'impact': 'Improved test performance and learning enjoyment',
-                'current_value': f'{academic_anxiety}/10',
-                'target_value': '5/10 or less',
-                'improvement_area': 'Academic Anxiety'
-            })
-        
-        # Support & Environment recommendations
-        faculty_support = student_data.get('facultySupport', 6)
-        learning_environment = student_data.get('learningEnvironmentQuality', 7)
-        technology_access = student_data.get('technologyAccess', 8)
-        
-        if faculty_support < 7:
-            recommendations.append({
-                'category': 'Academic Support',
-                'title': 'Seek Faculty Support',
-                'description': 'Regularly attend office hours and build relationships with instructors',
-                'priority': 'medium',
-                'impact': 'Better guidance and academic resources',
-                'current_value': f'{faculty_support}/10',
-                'target_value': '7+/10',
-                'improvement_area': 'Faculty Support'
-            })
-        
-        if learning_environment < 7:
-            recommendations.append({
-                'category': 'Study Environment',
-                'title': 'Optimize Learning Space',
-                'description': 'Create a dedicated, organized, and distraction-free study area',
-                'priority': 'medium',
-                'impact': 'Improved concentration and study efficiency',
-                'current_value': f'{learning_environment}/10',
-                'target_value': '7+/10',
-                'improvement_area': 'Learning Environment'
-            })
-        
-        # Study habits (existing but updated)
-        study_hours = student_data.get('studyHoursDaily', 4.5)
-        if study_hours < 5:
-            recommendations.append({
-                'category': 'Study Habits',
-                'title': 'Increase Study Time',
-                'description': f'Gradually increase from {study_hours} to 6-8 hours of focused study daily',
-                'priority': 'high',
-                'impact': 'Could improve scores by 5-15 points',
-                'current_value': f'{study_hours} hours',
-                'target_value': '6-8 hours',
-                'improvement_area': 'Study Hours'
-            })
-        elif study_hours > 9:
-            recommendations.append({
-                'category': 'Study Efficiency',
-                'title': 'Optimize Study Methods',
-                'description': 'Focus on active learning techniques rather than just time spent',
-                'priority': 'medium',
-                'impact': 'Better retention with less burnout',
-                'current_value': f'{study_hours} hours',
-                'target_value': '6-8 focused hours',
-                'improvement_area': 'Study Efficiency'
-            })
-        
-        # Add performance-level specific recommendations
-        if performance_level == 'Low' and predicted_score < 60:
-            recommendations.append({
-                'category': 'Academic Foundation',
-                'title': 'Build Strong Foundation',
-                'description': 'Focus on fundamental concepts and seek tutoring if needed',
-                'priority': 'high',
-                'impact': 'Essential for reaching medium performance level',
-                'current_value': f'Score: {predicted_score}',
-                'target_value': '60+ points',
-                'improvement_area': 'Foundation Building'
-            })
-        elif performance_level == 'Medium' and predicted_score < 75:
-            recommendations.append({
-                'category': 'Advanced Learning',
-                'title': 'Master Key Concepts',
-                'description': 'Focus on understanding rather than memorization',
-                'priority': 'high',
-                'impact': 'Key to reaching high performance level',
-                'current_value': f'Score: {predicted_score}',
-                'target_value': '75+ points',
-                'improvement_area': 'Concept Mastery'
-            })
-        elif performance_level == 'High' and predicted_score < 85:
-            recommendations.append({
-                'category': 'Excellence',
-                'title': 'Pursue Academic Excellence',
-                'description': 'Challenge yourself with advanced material and critical analysis',
-                'priority': 'medium',
-                'impact': 'Path to exceptional performance',
-                'current_value': f'Score: {predicted_score}',
-                'target_value': '85+ points',
-                'improvement_area': 'Advanced Achievement'
-            })
-        
-        # Ensure we have recommendations
-        if not recommendations:
-            recommendations.append({
-                'category': 'General',
-                'title': 'Maintain Current Habits',
-                'description': 'Your current approach is working well. Focus on consistency.',
-                'priority': 'low',
-                'impact': 'Sustained academic performance',
-                'current_value': f'Score: {predicted_score}',
-                'target_value': 'Consistent excellence',
-                'improvement_area': 'Consistency'
-            })
-        
-        # Sort by priority (high first, then medium, then low)
-        priority_order = {'high': 0, 'medium': 1, 'low': 2}
-        recommendations.sort(key=lambda x: priority_order[x['priority']])
-        
-        return recommendations
\ No newline at end of file
+        return self.rules.evaluate([student_data], [predicted_score], [performance_level])[1][0]
@@ -0,0 +1,112 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from typing import Dict, Any, Optional
+
+REQUEST_LOGGER_NAME = 'edupredict.requests'
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+
+class LazyRecord:
+    """Structured log payload, serialized only if and when a handler formats it"""
+
+    __slots__ = ('fields',)
+
+    def __init__(self, fields: Dict[str, Any]):
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return json.dumps(self.fields, separators=(',', ':'), default=str)
+
+
+class ProcessLocalQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to a background listener thread; each (forked) process gets its own listener"""
+
+    def __init__(self, *handlers: logging.Handler):
+        self.handlers = handlers
+        self._pid = None
+        self._listener = None
+        self._start_lock = threading.Lock()
+        self._exit_registered = False
+        super().__init__(queue.SimpleQueue())
+        # A lock held by another thread at fork time would stay locked in the child forever
+        os.register_at_fork(after_in_child=self._reset_start_lock)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same-process queue: skip the eager formatting the base class does for pickling
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self._pid != os.getpid():
+            self._start_listener()
+        self.queue.put_nowait(record)
+
+    def _start_listener(self):
+        """(Re)start the listener; threads do not survive fork, so workers start their own"""
+        with self._start_lock:
+            # Another thread may have started it while this one waited for the lock
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.SimpleQueue()
+            self._listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+            # Registrations are inherited across fork, and stop() only acts in the process that started it
+            if not self._exit_registered:
+                atexit.register(self.stop)
+                self._exit_registered = True
+
+    def _reset_start_lock(self):
+        self._start_lock = threading.Lock()
+
+    def stop(self):
+        """Flush whatever is queued; called at interpreter exit"""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+
+class RequestLog:
+    """One compact, sampled record per prediction call"""
+
+    def __init__(self, sample_rate: float = 1.0):
+        self.logger = logging.getLogger(REQUEST_LOGGER_NAME)
+        self.sample_rate = sample_rate
+
+    def should_log(self) -> bool:
+        """Sampling decision, made before any record is built"""
+        return (self.sample_rate > 0 and self.logger.isEnabledFor(logging.INFO)
+                and (self.sample_rate >= 1 or random.random() < self.sample_rate))
+
+    def record(self, event: str, **fields):
+        """Emit a structured record; fields are only serialized by the handler thread"""
+        self.logger.info('%s', LazyRecord({'event': event, **fields, 'sample_rate': self.sample_rate}))
+
+
+# Shared by every predictor in the process; configure_logging adjusts the sample rate
+request_log = RequestLog()
+
+
+def configure_logging(level: str = 'INFO', request_sample_rate: float = 1.0, use_queue: bool = True,
+                      stream=None) -> Optional[logging.Handler]:
+    """Root logging through a queue-backed handler, plus the request log's sample rate"""
+    request_log.sample_rate = request_sample_rate
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if any(isinstance(handler, ProcessLocalQueueHandler) for handler in root.handlers):
+        return None
+
+    stream_handler = logging.StreamHandler(stream or sys.stderr)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler = ProcessLocalQueueHandler(stream_handler) if use_queue else stream_handler
+    root.addHandler(handler)
+    return handler
@@ -0,0 +1,189 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+from typing import Dict, List, Any, Callable, Optional
+from ml.model_store import ModelStore
+
+try:
+    import fcntl
+except ImportError:  # optional: without it only jobs in this process are serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Lock file under the models root, held for the whole job so one retrain runs across all server processes
+RETRAIN_LOCK_FILE = 'retrain.lock'
+
+
+def train_model_version(data_path: str, models_root: str, version: str, nice: int = 10) -> Dict[str, Any]:
+    """Child-process entry point: train all ensembles into a fresh version directory"""
+    from ml.model_trainer import ModelTrainer
+
+    # Keep the serving process ahead of training when they share cores
+    if nice and hasattr(os, 'nice'):
+        os.nice(nice)
+
+    model_dir = ModelStore(models_root).version_dir(version)
+    trainer = ModelTrainer()
+    X, y_reg, y_clf_encoded, y_clf_original = trainer.load_and_preprocess_data(data_path)
+    trainer.train_models(X, y_reg, y_clf_encoded)
+    trainer.save_models(model_dir)
+
+    return {
+        'version': version,
+        'model_dir': model_dir,
+        'results': {name: {metric: float(value) for metric, value in metrics.items()}
+                    for name, metrics in trainer.results.items()}
+    }
+
+
+class RetrainManager:
+    """Runs retraining jobs in a separate process and hot-swaps the predictor once validated"""
+
+    def __init__(self, load_predictor: Callable[[str], Any], on_swap: Callable[[Any, str], None],
+                 models_root: str = 'models/', min_r2: float = 0.0, min_accuracy: float = 0.0):
+        self.load_predictor = load_predictor
+        self.on_swap = on_swap
+        self.models_root = models_root
+        self.store = ModelStore(models_root)
+        self.min_r2 = min_r2
+        self.min_accuracy = min_accuracy
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._active_job = None
+        self._lock_file = None
+
+    def submit(self, data_path: str) -> Dict[str, Any]:
+        """Start a retraining job; raises RuntimeError while another job is still running"""
+        with self._lock:
+            if self._active_job is not None:
+                raise RuntimeError(f"Retraining job {self._active_job} is already running")
+            self._acquire_run_lock()
+
+            job_id = uuid.uuid4().hex[:12]
+            version = self.store.new_version()
+            job = {
+                'job_id': job_id,
+                'status': 'training',
+                'model_version': version,
+                'data_path': data_path,
+                'submitted_at': datetime.now().isoformat(),
+                'finished_at': None,
+                'results': None,
+                'error': None
+            }
+            self.jobs[job_id] = job
+            self._active_job = job_id
+
+            try:
+                if self._executor is None:
+                    # spawn: the child must not inherit the serving process's threads or locks
+                    self._executor = ProcessPoolExecutor(max_workers=1,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+                future = self._executor.submit(train_model_version, data_path, self.models_root, version)
+            except Exception:
+                del self.jobs[job_id]
+                self._active_job = None
+                self._release_run_lock()
+                raise
+
+        future.add_done_callback(lambda done: self._finish(job_id, done))
+        logger.info(f"🔄 Retraining job {job_id} started (version {version})")
+        return dict(job)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Snapshot of one job's state"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Snapshots of every job, newest first"""
+        with self._lock:
+            return [dict(job) for job in reversed(list(self.jobs.values()))]
+
+    def _finish(self, job_id: str, future):
+        """Validate the freshly trained version and swap it in, or record the failure"""
+        try:
+            output = future.result()
+            self._update(job_id, status='validating', results=output['results'])
+
+            candidate = self.load_predictor(output['model_dir'])
+            self._validate(candidate, output['results'])
+
+            self.store.set_current(output['version'])
+            self.on_swap(candidate, output['version'])
+            self._update(job_id, status='completed')
+            logger.info(f"✅ Retraining job {job_id} completed, serving version {output['version']}")
+
+        except Exception as e:
+            logger.error(f"❌ Retraining job {job_id} failed: {e}")
+            self._update(job_id, status='failed', error=str(e))
+            self._remove_version(self.jobs[job_id]['model_version'])
+
+        finally:
+            with self._lock:
+                self.jobs[job_id]['finished_at'] = datetime.now().isoformat()
+                self._active_job = None
+                self._release_run_lock()
+
+    def _acquire_run_lock(self):
+        """Take the models root's retrain lock without waiting; raises RuntimeError if another process holds it"""
+        if fcntl is None:
+            return
+        os.makedirs(self.models_root, exist_ok=True)
+        lock_file = open(os.path.join(self.models_root, RETRAIN_LOCK_FILE), 'a+')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.seek(0)
+            owner = lock_file.read().strip() or 'another process'
+            lock_file.close()
+            raise RuntimeError(f"Retraining is already running in {owner}")
+        lock_file.truncate(0)
+        lock_file.write(f'process {os.getpid()}')
+        lock_file.flush()
+        self._lock_file = lock_file
+
+    def _release_run_lock(self):
+        """Drop the retrain lock; closing the file releases it"""
+        if self._lock_file is not None:
+            self._lock_file.truncate(0)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _remove_version(self, version: str):
+        """Delete a failed job's version directory, unless CURRENT already points at it"""
+        if self.store.current_version() == version:
+            return
+        model_dir = self.store.version_dir(version)
+        if os.path.isdir(model_dir):
+            shutil.rmtree(model_dir, ignore_errors=True)
+            logger.info(f"🧹 Removed incomplete model version {version}")
+
+    def _validate(self, candidate, results: Dict[str, Dict[str, float]]):
+        """Reject versions with weak metrics or that cannot produce sane predictions"""
+        for name, metrics in results.items():
+            if 'R2' in metrics and metrics['R2'] < self.min_r2:
+                raise ValueError(f"{name} R2 {metrics['R2']:.3f} is below {self.min_r2}")
+            if 'Accuracy' in metrics and metrics['Accuracy'] < self.min_accuracy:
+                raise ValueError(f"{name} accuracy {metrics['Accuracy']:.3f} is below {self.min_accuracy}")
+
+        probe = candidate.batch_predict([{}, {'studyHoursDaily': 1.0}, {'studyHoursDaily': 9.0}])
+        if probe['failed'] or not all(result['success'] for result in probe['results']):
+            raise ValueError("Candidate models failed on probe students")
+        scores = np.array([result['predictions']['final_score'] for result in probe['results']])
+        if not np.all(np.isfinite(scores)) or scores.min() < 0 or scores.max() > 100:
+            raise ValueError(f"Candidate models produced invalid scores: {scores.tolist()}")
+
+    def _update(self, job_id: str, **fields):
+        """Apply field changes to a job under the lock"""
+        with self._lock:
+            self.jobs[job_id].update(fields)
@@ -0,0 +1,443 @@
+import numbers
+import operator
+import string
+import time
+import numpy as np
+from typing import Dict, List, Any, Tuple
+from ml.metrics import metrics
+
+# Request fields the rules read, with the value assumed when a field is absent
+RULE_FIELDS = {
+    'cognitiveAbility': 100,
+    'workingMemory': 6,
+    'processingSpeed': 6,
+    'motivationLevel': 7,
+    'timeManagement': 6,
+    'focusConcentration': 7,
+    'sleepQuality': 7,
+    'metacognitionSkills': 6,
+    'learningAdaptability': 6,
+    'procrastinationTendency': 5,
+    'academicAnxiety': 4,
+    'facultySupport': 6,
+    'learningEnvironmentQuality': 7,
+    'studyHoursDaily': 4.5,
+}
+
+# Every rule: conditions (all must hold) over request fields plus the derived
+# `score` and `level`; rules sharing a `group` behave like an if/elif chain.
+# Messages are str.format templates over the same names.
+INSIGHT_RULES = [
+    # Cognitive Strengths
+    {'section': 'strengths', 'group': 'cognitive_strength', 'when': [('cognitiveAbility', '>=', 110)],
+     'message': "Exceptional cognitive ability ({cognitiveAbility}) - strong learning potential"},
+    {'section': 'strengths', 'group': 'cognitive_strength', 'when': [('cognitiveAbility', '>=', 100)],
+     'message': "Above average cognitive ability ({cognitiveAbility}) - good academic foundation"},
+    {'section': 'strengths', 'group': 'memory_strength', 'when': [('workingMemory', '>=', 8)],
+     'message': "Strong working memory ({workingMemory}/10) - excellent information retention"},
+    {'section': 'strengths', 'group': 'memory_strength', 'when': [('workingMemory', '>=', 7)],
+     'message': "Good working memory ({workingMemory}/10) - effective learning capacity"},
+    {'section': 'strengths', 'when': [('processingSpeed', '>=', 8)],
+     'message': "Fast processing speed ({processingSpeed}/10) - quick learning adaptation"},
+
+    # Behavioral Strengths
+    {'section': 'strengths', 'when': [('motivationLevel', '>=', 8)],
+     'message': "High motivation level ({motivationLevel}/10) - strong drive for success"},
+    {'section': 'strengths', 'when': [('timeManagement', '>=', 8)],
+     'message': "Excellent time management ({timeManagement}/10) - efficient study habits"},
+    {'section': 'strengths', 'when': [('focusConcentration', '>=', 8)],
+     'message': "Strong focus and concentration ({focusConcentration}/10) - effective learning sessions"},
+    {'section': 'strengths', 'when': [('sleepQuality', '>=', 8)],
+     'message': "Good sleep quality ({sleepQuality}/10) - supports cognitive performance"},
+
+    # Cognitive Weaknesses
+    {'section': 'weaknesses', 'when': [('cognitiveAbility', '<', 90)],
+     'message': "Below average cognitive ability ({cognitiveAbility}) - may need learning support"},
+    {'section': 'weaknesses', 'when': [('workingMemory', '<', 6)],
+     'message': "Weak working memory ({workingMemory}/10) - affects information retention"},
+    {'section': 'weaknesses', 'when': [('processingSpeed', '<', 6)],
+     'message': "Slow processing speed ({processingSpeed}/10) - may need more time for complex tasks"},
+
+    # Behavioral Weaknesses
+    {'section': 'weaknesses', 'when': [('motivationLevel', '<', 6)],
+     'message': "Low motivation ({motivationLevel}/10) - affects learning engagement"},
+    {'section': 'weaknesses', 'when': [('timeManagement', '<', 6)],
+     'message': "Poor time management ({timeManagement}/10) - inefficient study planning"},
+    {'section': 'weaknesses', 'when': [('focusConcentration', '<', 6)],
+     'message': "Weak focus ({focusConcentration}/10) - reduced learning efficiency"},
+    {'section': 'weaknesses', 'when': [('sleepQuality', '<', 6)],
+     'message': "Poor sleep quality ({sleepQuality}/10) - impacts cognitive function"},
+
+    # Opportunities based on cognitive profile
+    {'section': 'opportunities', 'when': [('cognitiveAbility', '>=', 100), ('score', '<', 80)],
+     'message': "Leverage strong cognitive abilities to achieve higher academic performance"},
+    {'section': 'opportunities', 'when': [('workingMemory', '>=', 7), ('processingSpeed', '>=', 7)],
+     'message': "Use your strong cognitive processing to master complex subjects quickly"},
+    {'section': 'opportunities', 'when': [('motivationLevel', '>=', 7), ('timeManagement', '<', 7)],
+     'message': "Channel high motivation into better time management for maximum impact"},
+]
+
+# Used when no rule of a section fires
+INSIGHT_FALLBACKS = {
+    'strengths': "Solid baseline profile - focus on developing specific cognitive strengths",
+    'weaknesses': "No major weaknesses identified - focus on optimizing current strategies",
+    'opportunities': "Build on current foundation with advanced learning techniques",
+}
+
+RECOMMENDATION_RULES = [
+    # Cognitive Abilities
+    {'when': [('cognitiveAbility', '<', 90)], 'recommendation': {
+        'category': 'Cognitive Development',
+        'title': 'Enhance Cognitive Skills',
+        'description': 'Practice problem-solving and critical thinking exercises to improve cognitive abilities',
+        'priority': 'medium',
+        'impact': 'Could improve overall academic performance by 5-10%',
+        'current_value': '{cognitiveAbility}',
+        'target_value': '90+',
+        'improvement_area': 'Cognitive Ability'}},
+    {'when': [('workingMemory', '<', 7)], 'recommendation': {
+        'category': 'Cognitive Skills',
+        'title': 'Improve Working Memory',
+        'description': 'Use memory techniques and practice recalling information to strengthen working memory',
+        'priority': 'medium',
+        'impact': 'Better information retention and processing',
+        'current_value': '{workingMemory}/10',
+        'target_value': '7+/10',
+        'improvement_area': 'Working Memory'}},
+    {'when': [('processingSpeed', '<', 7)], 'recommendation': {
+        'category': 'Cognitive Skills',
+        'title': 'Increase Processing Speed',
+        'description': 'Practice timed exercises and quick decision-making to improve information processing',
+        'priority': 'medium',
+        'impact': 'Faster learning and task completion',
+        'current_value': '{processingSpeed}/10',
+        'target_value': '7+/10',
+        'improvement_area': 'Processing Speed'}},
+
+    # Learning Strategies
+    {'when': [('metacognitionSkills', '<', 7)], 'recommendation': {
+        'category': 'Learning Strategies',
+        'title': 'Develop Metacognition',
+        'description': 'Practice self-reflection on learning processes and adjust strategies accordingly',
+        'priority': 'high',
+        'impact': 'More effective and personalized learning approach',
+        'current_value': '{metacognitionSkills}/10',
+        'target_value': '7+/10',
+        'improvement_area': 'Metacognition'}},
+    {'when': [('timeManagement', '<', 7)], 'recommendation': {
+        'category': 'Study Habits',
+        'title': 'Improve Time Management',
+        'description': 'Create structured study schedules and use productivity techniques',
+        'priority': 'high',
+        'impact': 'Better study efficiency and reduced stress',
+        'current_value': '{timeManagement}/10',
+        'target_value': '7+/10',
+        'improvement_area': 'Time Management'}},
+    {'when': [('learningAdaptability', '<', 7)], 'recommendation': {
+        'category': 'Learning Flexibility',
+        'title': 'Enhance Learning Adaptability',
+        'description': 'Practice learning in different environments and with various methods',
+        'priority': 'medium',
+        'impact': 'Better performance in diverse academic situations',
+        'current_value': '{learningAdaptability}/10',
+        'target_value': '7+/10',
+        'improvement_area': 'Learning Adaptability'}},
+
+    # Personal Wellbeing
+    {'when': [('sleepQuality', '<', 7)], 'recommendation': {
+        'category': 'Health & Wellness',
+        'title': 'Improve Sleep Quality',
+        'description': 'Establish consistent sleep routine and optimize sleep environment',
+        'priority': 'medium',
+        'impact': 'Better cognitive function and memory consolidation',
+        'current_value': '{sleepQuality}/10',
+        'target_value': '7+/10',
+        'improvement_area': 'Sleep Quality'}},
+    {'when': [('focusConcentration', '<', 7)], 'recommendation': {
+        'category': 'Cognitive Performance',
+        'title': 'Enhance Focus',
+        'description': 'Practice mindfulness and minimize distractions during study sessions',
+        'priority': 'medium',
+        'impact': 'More efficient learning and better retention',
+        'current_value': '{focusConcentration}/10',
+        'target_value': '7+/10',
+        'improvement_area': 'Focus & Concentration'}},
+    {'when': [('procrastinationTendency', '>', 6)], 'recommendation': {
+        'category': 'Productivity',
+        'title': 'Reduce Procrastination',
+        'description': 'Break tasks into smaller steps and use the Pomodoro technique',
+        'priority': 'high',
+        'impact': 'More consistent study habits and reduced stress',
+        'current_value': '{procrastinationTendency}/10',
+        'target_value': '5/10 or less',
+        'improvement_area': 'Procrastination'}},
+    {'when': [('academicAnxiety', '>', 6)], 'recommendation': {
+        'category': 'Mental Health',
+        'title': 'Manage Academic Anxiety',
+        'description': 'Practice relaxation techniques and develop positive self-talk',
+        'priority': 'high',
+        'impact': 'Improved test performance and learning enjoyment',
+        'current_value': '{academicAnxiety}/10',
+        'target_value': '5/10 or less',
+        'improvement_area': 'Academic Anxiety'}},
+
+    # Support & Environment
+    {'when': [('facultySupport', '<', 7)], 'recommendation': {
+        'category': 'Academic Support',
+        'title': 'Seek Faculty Support',
+        'description': 'Regularly attend office hours and build relationships with instructors',
+        'priority': 'medium',
+        'impact': 'Better guidance and academic resources',
+        'current_value': '{facultySupport}/10',
+        'target_value': '7+/10',
+        'improvement_area': 'Faculty Support'}},
+    {'when': [('learningEnvironmentQuality', '<', 7)], 'recommendation': {
+        'category': 'Study Environment',
+        'title': 'Optimize Learning Space',
+        'description': 'Create a dedicated, organized, and distraction-free study area',
+        'priority': 'medium',
+        'impact': 'Improved concentration and study efficiency',
+        'current_value': '{learningEnvironmentQuality}/10',
+        'target_value': '7+/10',
+        'improvement_area': 'Learning Environment'}},
+
+    # Study habits
+    {'group': 'study_hours', 'when': [('studyHoursDaily', '<', 5)], 'recommendation': {
+        'category': 'Study Habits',
+        'title': 'Increase Study Time',
+        'description': 'Gradually increase from {studyHoursDaily} to 6-8 hours of focused study daily',
+        'priority': 'high',
+        'impact': 'Could improve scores by 5-15 points',
+        'current_value': '{studyHoursDaily} hours',
+        'target_value': '6-8 hours',
+        'improvement_area': 'Study Hours'}},
+    {'group': 'study_hours', 'when': [('studyHoursDaily', '>', 9)], 'recommendation': {
+        'category': 'Study Efficiency',
+        'title': 'Optimize Study Methods',
+        'description': 'Focus on active learning techniques rather than just time spent',
+        'priority': 'medium',
+        'impact': 'Better retention with less burnout',
+        'current_value': '{studyHoursDaily} hours',
+        'target_value': '6-8 focused hours',
+        'improvement_area': 'Study Efficiency'}},
+
+    # Performance-level specific
+    {'group': 'level', 'when': [('level', '==', 'Low'), ('score', '<', 60)], 'recommendation': {
+        'category': 'Academic Foundation',
+        'title': 'Build Strong Foundation',
+        'description': 'Focus on fundamental concepts and seek tutoring if needed',
+        'priority': 'high',
+        'impact': 'Essential for reaching medium performance level',
+        'current_value': 'Score: {score}',
+        'target_value': '60+ points',
+        'improvement_area': 'Foundation Building'}},
+    {'group': 'level', 'when': [('level', '==', 'Medium'), ('score', '<', 75)], 'recommendation': {
+        'category': 'Advanced Learning',
+        'title': 'Master Key Concepts',
+        'description': 'Focus on understanding rather than memorization',
+        'priority': 'high',
+        'impact': 'Key to reaching high performance level',
+        'current_value': 'Score: {score}',
+        'target_value': '75+ points',
+        'improvement_area': 'Concept Mastery'}},
+    {'group': 'level', 'when': [('level', '==', 'High'), ('score', '<', 85)], 'recommendation': {
+        'category': 'Excellence',
+        'title': 'Pursue Academic Excellence',
+        'description': 'Challenge yourself with advanced material and critical analysis',
+        'priority': 'medium',
+        'impact': 'Path to exceptional performance',
+        'current_value': 'Score: {score}',
+        'target_value': '85+ points',
+        'improvement_area': 'Advanced Achievement'}},
+]
+
+# Used when no recommendation rule fires
+RECOMMENDATION_FALLBACK = {
+    'category': 'General',
+    'title': 'Maintain Current Habits',
+    'description': 'Your current approach is working well. Focus on consistency.',
+    'priority': 'low',
+    'impact': 'Sustained academic performance',
+    'current_value': 'Score: {score}',
+    'target_value': 'Consistent excellence',
+    'improvement_area': 'Consistency'
+}
+
+PRIORITY_ORDER = {'high': 0, 'medium': 1, 'low': 2}
+
+# (vectorized, scalar) implementation of each condition operator
+OPERATORS = {
+    '>=': (np.greater_equal, operator.ge),
+    '>': (np.greater, operator.gt),
+    '<': (np.less, operator.lt),
+    '<=': (np.less_equal, operator.le),
+    '==': (np.equal, operator.eq),
+}
+
+# Below this many rows the masks cost more than plain comparisons, so rules are checked row by row
+SCALAR_ROW_LIMIT = 8
+
+
+class RuleEngine:
+    """Insight and recommendation rules compiled once, evaluated as NumPy masks over a whole batch"""
+
+    def __init__(self, insight_rules: List[Dict[str, Any]] = None, recommendation_rules: List[Dict[str, Any]] = None):
+        self.insight_rules = self._compile(INSIGHT_RULES if insight_rules is None else insight_rules)
+        self.recommendation_rules = self._compile(RECOMMENDATION_RULES if recommendation_rules is None
+                                                  else recommendation_rules)
+        self.fallback_template = self._compile_template(RECOMMENDATION_FALLBACK)
+        self.recommendation_order = sorted(range(len(self.recommendation_rules)),
+                                           key=lambda index: PRIORITY_ORDER[self.recommendation_rules[index]['recommendation']['priority']])
+
+    def evaluate(self, students: List[Dict[str, Any]], scores, levels) -> Tuple[List[Dict[str, List[str]]], List[List[Dict[str, Any]]]]:
+        """Per-student insight lists (strengths/weaknesses/opportunities) and sorted recommendations"""
+        start = time.perf_counter()
+        n = len(students)
+        # Original (unconverted) values fill the templates, so messages render exactly as submitted
+        raw = {field: [student.get(field, default) for student in students] for field, default in RULE_FIELDS.items()}
+        raw['score'] = [float(score) for score in scores]
+        raw['level'] = list(levels)
+        if n <= SCALAR_ROW_LIMIT:
+            for field in RULE_FIELDS:
+                self._numeric_column(field, raw[field])
+            columns, vectorized = raw, False
+        else:
+            columns = {field: self._numeric_column(field, values) for field, values in raw.items() if field in RULE_FIELDS}
+            columns['score'] = np.asarray(raw['score'], dtype=np.float64)
+            columns['level'] = np.asarray(raw['level'], dtype=object)
+            vectorized = True
+
+        # Each field is stringified once per batch, column-wise, the first time a firing template needs it
+        text_columns = {}
+
+        def text_column(name):
+            if name not in text_columns:
+                text_columns[name] = list(map(str, raw[name]))
+            return text_columns[name]
+
+        insights = [{'strengths': [], 'weaknesses': [], 'opportunities': []} for _ in range(n)]
+        for rule, rows in self._fired(self.insight_rules, columns, n, vectorized):
+            section = rule['section']
+            text, names = rule['message_template']
+            values = [text_column(name) for name in names]
+            for i in rows:
+                insights[i][section].append(text % tuple(column[i] for column in values))
+        for row in insights:
+            for section, fallback in INSIGHT_FALLBACKS.items():
+                if not row[section]:
+                    row[section].append(fallback)
+
+        insights_end = time.perf_counter()
+
+        # Rules are visited in priority order (stable within a priority), so each list comes out sorted
+        recommendations = [[] for _ in range(n)]
+        for rule, rows in self._fired(self.recommendation_rules, columns, n, vectorized, order=self.recommendation_order):
+            static, dynamic = rule['recommendation_template']
+            dynamic = [(key, text, [text_column(name) for name in names]) for key, text, names in dynamic]
+            for i in rows:
+                rendered = static.copy()
+                for key, text, values in dynamic:
+                    rendered[key] = text % tuple(column[i] for column in values)
+                recommendations[i].append(rendered)
+        for i, row in enumerate(recommendations):
+            if not row:
+                row.append(self._render(self.fallback_template, raw, i))
+
+        metrics.observe('stage_duration_seconds', insights_end - start, stage='insights')
+        metrics.observe('stage_duration_seconds', time.perf_counter() - insights_end, stage='recommendations')
+        return insights, recommendations
+
+    def _compile(self, rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Resolve operators and template placeholders once and validate the fields each rule reads"""
+        compiled = []
+        for rule in rules:
+            conditions = []
+            for field, op, threshold in rule['when']:
+                if field not in RULE_FIELDS and field not in ('score', 'level'):
+                    raise ValueError(f"Rule reads unknown field: {field}")
+                conditions.append((field, OPERATORS[op], threshold))
+            rule = {**rule, 'conditions': conditions}
+            if 'message' in rule:
+                rule['message_template'] = _compile_text(rule['message'])
+            if 'recommendation' in rule:
+                rule['recommendation_template'] = self._compile_template(rule['recommendation'])
+            compiled.append(rule)
+        return compiled
+
+    def _compile_template(self, template: Dict[str, str]):
+        """Split a recommendation template into its static dict and the values needing formatting"""
+        dynamic = [(key,) + _compile_text(text) for key, text in template.items() if '{' in text]
+        return dict(template), dynamic
+
+    def _render(self, compiled_template, raw: Dict[str, List[Any]], i: int) -> Dict[str, str]:
+        """Fill one row's placeholders into a copy of the static template (key order preserved)"""
+        static, dynamic = compiled_template
+        rendered = static.copy()
+        for key, text, names in dynamic:
+            rendered[key] = text % tuple(raw[name][i] for name in names)
+        return rendered
+
+    def _fired(self, rules: List[Dict[str, Any]], columns: Dict[str, Any], n: int, vectorized: bool,
+               order: List[int] = None) -> List[Tuple[Dict[str, Any], List[int]]]:
+        """(rule, firing row indices) pairs; within a group only the first match (in rule order) fires"""
+        if not vectorized:
+            fired = self._fired_scalar(rules, columns, n)
+            return fired if order is None else [fired[index] for index in order]
+        
+        claimed = {}
+        fired = []
+        for rule in rules:
+            mask = np.ones(n, dtype=bool)
+            for field, (op, _), threshold in rule['conditions']:
+                mask &= op(columns[field], threshold)
+            group = rule.get('group')
+            if group is not None:
+                taken = claimed.setdefault(group, np.zeros(n, dtype=bool))
+                mask &= ~taken
+                taken |= mask
+            fired.append((rule, np.flatnonzero(mask).tolist()))
+        return fired if order is None else [fired[index] for index in order]
+
+    def _fired_scalar(self, rules: List[Dict[str, Any]], values: Dict[str, List[Any]], n: int) -> List[Tuple[Dict[str, Any], List[int]]]:
+        """Row-by-row equivalent of the masks for tiny batches"""
+        fired = []
+        claimed = {}
+        for rule in rules:
+            group = rule.get('group')
+            taken = claimed.setdefault(group, set()) if group is not None else set()
+            rows = [i for i in range(n) if i not in taken and
+                    all(op(values[field][i], threshold) for field, (_, op), threshold in rule['conditions'])]
+            taken.update(rows)
+            fired.append((rule, rows))
+        return fired
+
+    def row_errors(self, students: List[Dict[str, Any]]) -> List[Any]:
+        """Per student, why the rules cannot read it (a non-numeric field), or None"""
+        errors = [None] * len(students)
+        for field, default in RULE_FIELDS.items():
+            values = [student.get(field, default) for student in students]
+            if set(map(type, values)) <= {int, float, bool}:
+                continue
+            for i, value in enumerate(values):
+                if errors[i] is None and not isinstance(value, numbers.Real):
+                    errors[i] = f"'{field}' must be a number, got {type(value).__name__}"
+        return errors
+
+    def _numeric_column(self, field: str, values: List[Any]) -> np.ndarray:
+        """Float column for the masks; non-numeric values are rejected like the comparisons they feed"""
+        if not set(map(type, values)) <= {int, float, bool}:
+            for value in values:
+                if not isinstance(value, numbers.Real):
+                    raise TypeError(f"'{field}' must be a number, got {type(value).__name__}")
+        return np.asarray(values, dtype=np.float64)
+
+
+def _compile_text(text: str) -> Tuple[str, Tuple[str, ...]]:
+    """str.format template to a %-template plus the field names it reads (str() equals format() for numbers)"""
+    pattern, names = [], []
+    for literal, name, _, _ in string.Formatter().parse(text):
+        pattern.append(literal.replace('%', '%%'))
+        if name:
+            pattern.append('%s')
+            names.append(name)
+    return ''.join(pattern), tuple(names)
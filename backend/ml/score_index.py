@@ -0,0 +1,64 @@
+import numpy as np
+from typing import Dict, Any, Optional
+
+# Quantiles kept per distribution: 0.1-percentile resolution whatever the number of rows
+N_QUANTILES = 1001
+
+
+class ScoreIndex:
+    """Quantile sketch of predicted and true final scores, for O(log n) percentile lookups at serving time"""
+
+    def __init__(self, quantiles: Dict[str, np.ndarray], level_medians: Optional[Dict[str, float]] = None,
+                 n_rows: int = 0):
+        self.quantiles = {name: np.asarray(values, dtype=np.float64) for name, values in quantiles.items()}
+        self.level_medians = level_medians or {}
+        self.n_rows = n_rows
+
+    @classmethod
+    def build(cls, predicted_scores, true_scores, performance_levels=None,
+              n_quantiles: int = N_QUANTILES) -> 'ScoreIndex':
+        """Sketch both score distributions; small sets keep every sorted score"""
+        predicted_scores = np.asarray(predicted_scores, dtype=np.float64)
+        true_scores = np.asarray(true_scores, dtype=np.float64)
+        probabilities = np.linspace(0, 1, min(n_quantiles, len(true_scores)))
+        level_medians = {}
+        if performance_levels is not None:
+            performance_levels = np.asarray(performance_levels).astype(str)
+            level_medians = {str(level): float(np.median(true_scores[performance_levels == level]))
+                             for level in np.unique(performance_levels)}
+        return cls(
+            quantiles={
+                'predicted': np.quantile(predicted_scores, probabilities),
+                'actual': np.quantile(true_scores, probabilities),
+            },
+            level_medians=level_medians,
+            n_rows=len(true_scores)
+        )
+
+    def percentiles(self, scores, distribution: str = 'predicted') -> np.ndarray:
+        """Percentile (0-100) of every score in one vectorized binary search"""
+        quantiles = self.quantiles[distribution]
+        probabilities = np.linspace(0, 100, len(quantiles))
+        scores = np.asarray(scores, dtype=np.float64)
+        # Ties in the sketch (e.g. scores clipped at 100) get the middle of their range
+        lower = np.interp(scores, quantiles, probabilities)
+        upper = -np.interp(-scores, -quantiles[::-1], -probabilities[::-1])
+        return (lower + upper) / 2
+
+    def scores_at(self, percentiles, distribution: str = 'predicted') -> np.ndarray:
+        """Inverse lookup: the score found at every percentile"""
+        quantiles = self.quantiles[distribution]
+        return np.interp(percentiles, np.linspace(0, 100, len(quantiles)), quantiles)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON form stored in the model manifest"""
+        return {
+            'n_rows': self.n_rows,
+            'quantiles': {name: [round(float(value), 4) for value in values]
+                          for name, values in self.quantiles.items()},
+            'level_medians': self.level_medians
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ScoreIndex':
+        return cls(quantiles=data['quantiles'], level_medians=data.get('level_medians'), n_rows=data.get('n_rows', 0))
@@ -0,0 +1,332 @@
+import json
+import math
+import multiprocessing
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from sklearn.model_selection import KFold, StratifiedKFold
+from sklearn.utils.class_weight import compute_class_weight
+from typing import Dict, List, Any, Optional, Tuple
+
+from ml.model_trainer import DEFAULT_PARAMS, TUNED_PARAMS_FILE, XGBOOST_NATIVE_NAMES, ModelTrainer, training_threads
+
+# Declared search space per ensemble member: ('int', low, high), ('float', low, high) or ('log', low, high).
+# Anything not listed keeps its DEFAULT_PARAMS value.
+SEARCH_SPACES = {
+    'xgboost_regression': {
+        'n_estimators': ('int', 100, 600),
+        'max_depth': ('int', 3, 10),
+        'learning_rate': ('log', 0.01, 0.3),
+        'subsample': ('float', 0.5, 1.0),
+        'colsample_bytree': ('float', 0.5, 1.0),
+        'min_child_weight': ('log', 1, 20),
+        'reg_lambda': ('log', 0.01, 10),
+    },
+    'catboost_regression': {
+        'iterations': ('int', 100, 600),
+        'depth': ('int', 4, 10),
+        'learning_rate': ('log', 0.01, 0.3),
+        'l2_leaf_reg': ('log', 1, 10),
+    },
+    'lightgbm_classification': {
+        'n_estimators': ('int', 100, 500),
+        'max_depth': ('int', 3, 10),
+        'num_leaves': ('int', 15, 127),
+        'learning_rate': ('log', 0.01, 0.3),
+        'min_child_samples': ('int', 5, 100),
+        'colsample_bytree': ('float', 0.5, 1.0),
+        'reg_alpha': ('log', 0.001, 1),
+        'reg_lambda': ('log', 0.001, 1),
+    },
+    'xgboost_classification': {
+        'n_estimators': ('int', 100, 500),
+        'max_depth': ('int', 3, 10),
+        'learning_rate': ('log', 0.01, 0.3),
+        'subsample': ('float', 0.5, 1.0),
+        'colsample_bytree': ('float', 0.5, 1.0),
+        'min_child_weight': ('log', 1, 20),
+        'reg_lambda': ('log', 0.01, 10),
+    },
+}
+
+# Searched XGBoost models train on binned (hist) matrices; the tuned params keep that method
+FIXED_PARAMS = {'xgboost_regression': {'tree_method': 'hist'}, 'xgboost_classification': {'tree_method': 'hist'}}
+
+# Validation loss watched per boosting round (lower is better)
+METRICS = {'regression': 'rmse', 'classification': 'mlogloss'}
+
+# Per-process state: data and folds arrive once through the pool initializer,
+# binned fold matrices are built on first use and reused by every later trial
+_WORKER = {}
+
+
+class TrialPruned(Exception):
+    """Raised from a boosting callback when a trial falls behind"""
+
+
+class MedianPruner:
+    """Stops a trial whose validation loss is worse than the median of completed trials at the same round"""
+
+    def __init__(self, history, lock, n_startup_trials: int = 5, n_warmup_rounds: int = 50):
+        self.history = history
+        self.lock = lock
+        self.n_startup_trials = n_startup_trials
+        self.n_warmup_rounds = n_warmup_rounds
+
+    def should_prune(self, step: str, round_index: int, value: float) -> bool:
+        """Compare an intermediate loss against earlier completed trials"""
+        if round_index < self.n_warmup_rounds:
+            return False
+        values = self.history.get(step)
+        return bool(values) and len(values) >= self.n_startup_trials and value > statistics.median(values)
+
+    def complete(self, curve: Dict[str, float]):
+        """Publish a completed trial's intermediate losses"""
+        with self.lock:
+            for step, value in curve.items():
+                self.history[step] = self.history.get(step, []) + [value]
+
+
+def sample_params(key: str, rng: np.random.Generator) -> Dict[str, Any]:
+    """One random configuration from the declared space, on top of the defaults"""
+    params = {**DEFAULT_PARAMS[key], **FIXED_PARAMS.get(key, {})}
+    for name, (kind, low, high) in SEARCH_SPACES[key].items():
+        if kind == 'int':
+            params[name] = int(rng.integers(low, high + 1))
+        elif kind == 'log':
+            params[name] = float(math.exp(rng.uniform(math.log(low), math.log(high))))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    return params
+
+
+def _init_worker(X, y_reg, y_clf, folds, history, lock, pruner_options):
+    """Pool initializer: keep the shared inputs for every trial this process runs"""
+    _WORKER.update({'X': X, 'y': {'regression': y_reg, 'classification': y_clf}, 'folds': folds,
+                    'pruner': MedianPruner(history, lock, **pruner_options), 'matrices': {}})
+
+
+def _fold_matrices(key: str, fold: int):
+    """Binned train/validation matrices for one model and fold, built once per process"""
+    cache_key = (key, fold)
+    if cache_key in _WORKER['matrices']:
+        return _WORKER['matrices'][cache_key]
+
+    library, task = key.split('_')
+    train_idx, valid_idx = _WORKER['folds'][task][fold]
+    X, y = _WORKER['X'], _WORKER['y'][task]
+    if library == 'xgboost':
+        import xgboost as xgb
+        train = xgb.QuantileDMatrix(X[train_idx], y[train_idx], max_bin=256)
+        valid = xgb.QuantileDMatrix(X[valid_idx], y[valid_idx], ref=train)
+    elif library == 'lightgbm':
+        import lightgbm as lgb
+        # Same 'balanced' class weighting the trainer applies
+        classes = np.unique(y[train_idx])
+        weights = dict(zip(classes, compute_class_weight('balanced', classes=classes, y=y[train_idx])))
+        train = lgb.Dataset(X[train_idx], y[train_idx], weight=np.vectorize(weights.get)(y[train_idx]),
+                            free_raw_data=False).construct()
+        valid = lgb.Dataset(X[valid_idx], y[valid_idx], reference=train, free_raw_data=False).construct()
+    else:
+        from catboost import Pool
+        train = Pool(X[train_idx], y[train_idx])
+        train.quantize()
+        valid = Pool(X[valid_idx], y[valid_idx])
+
+    _WORKER['matrices'][cache_key] = (train, valid)
+    return train, valid
+
+
+def _fit_fold(key: str, fold: int, params: Dict[str, Any], n_threads: int, report) -> float:
+    """Train one fold, calling report(round, loss) every round; returns the final validation loss"""
+    library, task = key.split('_')
+    train, valid = _fold_matrices(key, fold)
+    rounds = params.get('n_estimators') or params['iterations']
+    metric = METRICS[task]
+
+    if library == 'xgboost':
+        import xgboost as xgb
+
+        class Report(xgb.callback.TrainingCallback):
+            def after_iteration(self, model, epoch, evals_log):
+                report(epoch, evals_log['valid'][metric][-1])
+                return False
+
+        native = {XGBOOST_NATIVE_NAMES.get(name, name): value for name, value in params.items()
+                  if name != 'n_estimators'}
+        native.update({'nthread': n_threads, 'eval_metric': metric})
+        if task == 'classification':
+            native.update({'objective': 'multi:softprob', 'num_class': len(np.unique(_WORKER['y'][task]))})
+        evals_log = {}
+        xgb.train(native, train, num_boost_round=rounds, evals=[(valid, 'valid')], evals_result=evals_log,
+                  verbose_eval=False, callbacks=[Report()])
+        return evals_log['valid'][metric][-1]
+
+    if library == 'lightgbm':
+        import lightgbm as lgb
+        lgb_metric = 'multi_logloss' if task == 'classification' else 'rmse'
+
+        def callback(env):
+            report(env.iteration, env.evaluation_result_list[0][2])
+
+        native = {name: value for name, value in params.items() if name != 'n_estimators'}
+        native.update({'n_jobs': n_threads, 'metric': lgb_metric,
+                       'objective': 'multiclass' if task == 'classification' else 'regression'})
+        if task == 'classification':
+            native['num_class'] = len(np.unique(_WORKER['y'][task]))
+        booster = lgb.train(native, train, num_boost_round=rounds, valid_sets=[valid], valid_names=['valid'],
+                            callbacks=[callback])
+        return booster.best_score['valid'][lgb_metric]
+
+    from catboost import CatBoostRegressor
+
+    class Report:
+        pruned = None
+
+        def after_iteration(self, info):
+            try:
+                report(info.iteration, info.metrics['validation']['RMSE'][-1])
+            except TrialPruned as pruned:
+                # CatBoost does not propagate exceptions from callbacks; stop and re-raise below
+                self.pruned = pruned
+                return False
+            return True
+
+    callback = Report()
+    model = CatBoostRegressor(**{**params, 'thread_count': n_threads, 'allow_writing_files': False})
+    model.fit(train, eval_set=valid, callbacks=[callback])
+    if callback.pruned:
+        raise callback.pruned
+    return model.get_evals_result()['validation']['RMSE'][-1]
+
+
+def _run_trial(key: str, number: int, params: Dict[str, Any], n_threads: int) -> Dict[str, Any]:
+    """Cross-validate one configuration, pruning as soon as it falls behind the median"""
+    start = time.perf_counter()
+    pruner = _WORKER['pruner']
+    curve = {}
+    fold_losses = []
+
+    for fold in range(len(_WORKER['folds'][key.split('_')[1]])):
+        def report(round_index, value, fold=fold):
+            step = f'{key}:{fold}:{round_index}'
+            curve[step] = value
+            # Trial 0 is the default configuration and the baseline every result is compared with: never pruned
+            if number != 0 and pruner.should_prune(step, round_index, value):
+                raise TrialPruned(round_index)
+
+        try:
+            fold_losses.append(_fit_fold(key, fold, params, n_threads, report))
+        except TrialPruned as pruned:
+            return {'key': key, 'number': number, 'params': params, 'state': 'pruned', 'score': None,
+                    'pruned_at': {'fold': fold, 'round': pruned.args[0]}, 'seconds': time.perf_counter() - start}
+
+    pruner.complete(curve)
+    return {'key': key, 'number': number, 'params': params, 'state': 'complete',
+            'score': float(np.mean(fold_losses)), 'seconds': time.perf_counter() - start}
+
+
+class HyperparameterSearch:
+    """Random search with k-fold cross-validation and median pruning, trials spread over processes"""
+
+    def __init__(self, n_trials: int = 30, n_folds: int = 3, n_jobs: Optional[int] = None,
+                 random_state: int = 42, n_startup_trials: int = 5, n_warmup_rounds: int = 50):
+        self.n_trials = n_trials
+        self.n_folds = n_folds
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.random_state = random_state
+        self.pruner_options = {'n_startup_trials': n_startup_trials, 'n_warmup_rounds': n_warmup_rounds}
+        self.trials = []
+
+    def _folds(self, y_reg, y_clf) -> Dict[str, List[Tuple[np.ndarray, np.ndarray]]]:
+        """Fold indices, computed once and shared by every trial"""
+        return {
+            'regression': list(KFold(self.n_folds, shuffle=True, random_state=self.random_state).split(y_reg)),
+            'classification': list(StratifiedKFold(self.n_folds, shuffle=True, random_state=self.random_state)
+                                   .split(np.zeros(len(y_clf)), y_clf)),
+        }
+
+    def run(self, X, y_reg, y_clf, keys: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Search every requested model; returns the best configuration per model"""
+        keys = keys or list(SEARCH_SPACES)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        y_reg = np.asarray(y_reg, dtype=np.float64)
+        y_clf = np.asarray(y_clf)
+        rng = np.random.default_rng(self.random_state)
+
+        # Trial 0 of each model is the current default configuration, so tuning never regresses it
+        schedule = [(key, number, {**DEFAULT_PARAMS[key], **FIXED_PARAMS.get(key, {})} if number == 0
+                     else sample_params(key, rng))
+                    for key in keys for number in range(self.n_trials)]
+        n_threads = max(1, training_threads() // self.n_jobs)
+
+        print(f"🎛️  Searching {len(keys)} models x {self.n_trials} trials, {self.n_folds}-fold CV, "
+              f"{self.n_jobs} processes x {n_threads} threads")
+        start = time.perf_counter()
+        # spawn: fork would copy the (threaded) parent's OpenMP state into every worker
+        context = multiprocessing.get_context('spawn')
+        with context.Manager() as manager:
+            history, lock = manager.dict(), manager.Lock()
+            with ProcessPoolExecutor(max_workers=self.n_jobs, mp_context=context, initializer=_init_worker,
+                                     initargs=(X, y_reg, y_clf, self._folds(y_reg, y_clf), history, lock,
+                                               self.pruner_options)) as pool:
+                futures = [pool.submit(_run_trial, key, number, params, n_threads)
+                           for key, number, params in schedule]
+                for future in as_completed(futures):
+                    trial = future.result()
+                    self.trials.append(trial)
+                    outcome = f"loss {trial['score']:.4f}" if trial['state'] == 'complete' else 'pruned'
+                    print(f"  {trial['key']:<24} trial {trial['number']:>3} | {outcome:<12} | {trial['seconds']:.1f}s")
+
+        best = {}
+        for key in keys:
+            completed = [trial for trial in self.trials if trial['key'] == key and trial['state'] == 'complete']
+            winner = min(completed, key=lambda trial: trial['score'])
+            best[key] = {
+                'params': winner['params'],
+                'score': winner['score'],
+                'metric': METRICS[key.split('_')[1]],
+                'default_score': next((trial['score'] for trial in completed if trial['number'] == 0), None),
+                'trials': sum(1 for trial in self.trials if trial['key'] == key),
+                'pruned': sum(1 for trial in self.trials if trial['key'] == key and trial['state'] == 'pruned'),
+            }
+            default = best[key]['default_score']
+            print(f"🏆 {key}: {best[key]['metric']} {winner['score']:.4f} "
+                  f"(default {'n/a' if default is None else f'{default:.4f}'}, {best[key]['pruned']} pruned)")
+        print(f"✅ Search finished in {time.perf_counter() - start:.1f}s")
+        return best
+
+
+def save_best_params(best: Dict[str, Dict[str, Any]], path: str = TUNED_PARAMS_FILE):
+    """Persist the winning configurations where ModelTrainer looks for them; earlier entries for other models stay"""
+    existing = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)
+    existing.update(best)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(existing, f, indent=2)
+    os.replace(f'{path}.tmp', path)
+    print(f"✅ Best parameters saved to {path}")
+
+
+# e.g. python -m ml.tuning --data data/student_dataset.csv --trials 40 --folds 3 --jobs 4
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Hyperparameter search for the ensemble members")
+    parser.add_argument('--data', default='data/student_dataset.csv')
+    parser.add_argument('--trials', type=int, default=30, help='trials per model')
+    parser.add_argument('--folds', type=int, default=3)
+    parser.add_argument('--jobs', type=int, default=0, help='worker processes (0 = one per core)')
+    parser.add_argument('--models', default=','.join(SEARCH_SPACES), help='comma-separated model keys')
+    parser.add_argument('--output', default=TUNED_PARAMS_FILE)
+    args = parser.parse_args()
+
+    trainer = ModelTrainer(params=DEFAULT_PARAMS)
+    X, y_reg, y_clf_encoded, _ = trainer.load_and_preprocess_data(args.data)
+    search = HyperparameterSearch(n_trials=args.trials, n_folds=args.folds, n_jobs=args.jobs or None)
+    save_best_params(search.run(X, y_reg, y_clf_encoded, keys=args.models.split(',')), args.output)
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the backend the way app.py does (`from ml...`), from any working directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml.data_generator import StudentDataGenerator  # noqa: E402
+from ml.model_trainer import DEFAULT_PARAMS, ModelTrainer  # noqa: E402
+
+# Small but structurally complete ensemble: the serving parameters with fewer trees
+TRAIN_ROWS = 1500
+TEST_TREES = 40
+
+
+@pytest.fixture(scope='session')
+def trained(tmp_path_factory):
+    """ModelTrainer fitted on a generated dataset, shared by every test in the run"""
+    params = {key: dict(values) for key, values in DEFAULT_PARAMS.items()}
+    for values in params.values():
+        values['iterations' if 'iterations' in values else 'n_estimators'] = TEST_TREES
+    params['catboost_regression']['allow_writing_files'] = False
+
+    data_path = str(tmp_path_factory.mktemp('data') / 'students.csv')
+    StudentDataGenerator(random_state=3).save_dataset_chunked(data_path, TRAIN_ROWS, chunk_size=TRAIN_ROWS)
+    trainer = ModelTrainer(params=params)
+    X, y_reg, y_clf, _ = trainer.load_and_preprocess_data(data_path)
+    trainer.train_models(X, y_reg, y_clf, n_threads=1)
+    return trainer
+
+
+@pytest.fixture(scope='session')
+def predictor(trained):
+    """Native-mode predictor over the trained models, without caching so every call runs the models"""
+    return trained.create_ensemble_predictor(cache_size=0)
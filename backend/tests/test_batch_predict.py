@@ -0,0 +1,56 @@
+import pytest
+
+from ml.benchmark import generate_students
+
+
+@pytest.fixture(scope='module')
+def students():
+    return generate_students(12, seed=17)
+
+
+def _without_index(result):
+    return {key: value for key, value in result.items() if key != 'student_index'}
+
+
+def test_batch_matches_single_predictions(predictor, students):
+    batch = predictor.batch_predict(students)
+
+    assert batch['successful'] == len(students) and batch['failed'] == 0
+    assert [result['student_index'] for result in batch['results']] == list(range(len(students)))
+    assert [_without_index(result) for result in batch['results']] == [predictor.predict(s) for s in students]
+
+
+def test_bad_students_fail_alone(predictor, students):
+    batch = list(students)
+    batch[2] = dict(students[2], studyHoursDaily='lots')
+    batch[5] = dict(students[5], gender=['Male'])
+    batch[7] = 'not a student'
+    batch[9] = dict(students[9], motivationLevel=None, cognitiveAbility='high')
+
+    results = predictor.batch_predict(batch)['results']
+
+    assert results[2] == {'success': False, 'error': "Invalid value for studyHoursDaily: 'lots'", 'student_index': 2}
+    assert results[5]['success'] is False and 'gender' in results[5]['error']
+    assert results[7] == {'success': False, 'error': 'Student data must be an object', 'student_index': 7}
+    assert results[9]['success'] is False and 'cognitiveAbility' in results[9]['error']
+    expected = predictor.batch_predict(students)['results']
+    for i in set(range(len(students))) - {2, 5, 7, 9}:
+        assert results[i] == expected[i]
+
+
+def test_columnar_matches_batch_and_lists_failures(predictor, students):
+    batch = list(students)
+    batch[3] = dict(students[3], attendanceRate='often')
+    batch[8] = 42
+
+    columnar = predictor.batch_predict_columnar(batch)
+    expected = predictor.batch_predict(students)['results']
+
+    valid = [i for i in range(len(students)) if i not in (3, 8)]
+    assert columnar['failed_indices'] == [3, 8]
+    assert columnar['successful'] == len(valid) and columnar['failed'] == 2
+    columns = columnar['columns']
+    assert list(columns['student_index']) == valid
+    assert list(columns['final_score']) == [expected[i]['predictions']['final_score'] for i in valid]
+    assert list(columns['performance_level']) == [expected[i]['predictions']['performance_level'] for i in valid]
+    assert list(columns['confidence']) == [expected[i]['predictions']['confidence'] for i in valid]
@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+
+import pytest
+
+from ml import bulk_scoring
+from ml.data_generator import StudentDataGenerator
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    return StudentDataGenerator(n_samples=12, random_state=9).generate_realistic_dataset().drop(columns=['created_at'])
+
+
+def _score(predictor, chunks):
+    return list(bulk_scoring.score_chunks(predictor, chunks))
+
+
+def _csv(frame) -> bytes:
+    return frame.to_csv(index=False).encode()
+
+
+def _ndjson(frame):
+    return [json.dumps(record) for record in frame.to_dict(orient='records')]
+
+
+def test_csv_line_with_extra_fields_is_a_row_error(predictor, dataset):
+    expected = _score(predictor, bulk_scoring.read_csv_chunks(io.BytesIO(_csv(dataset)), chunk_size=5))
+    lines = _csv(dataset).splitlines(keepends=True)
+    lines[4] = lines[4].rstrip(b'\n') + b',1,2\n'  # Data row 3
+
+    results = _score(predictor, bulk_scoring.read_csv_chunks(io.BytesIO(b''.join(lines)), chunk_size=5))
+
+    assert [result['row'] for result in results] == list(range(len(dataset)))
+    assert results[3]['success'] is False
+    assert results[3]['error'] == f"Line has {len(dataset.columns) + 2} fields, expected {len(dataset.columns)}"
+    assert results[:3] + results[4:] == expected[:3] + expected[4:]
+
+
+def test_ndjson_row_with_non_scalar_category_is_a_row_error(predictor, dataset):
+    lines = _ndjson(dataset)
+    expected = _score(predictor, bulk_scoring.read_ndjson_chunks(io.BytesIO('\n'.join(lines).encode())))
+    bad = json.loads(lines[2])
+    bad['gender'] = ['x']
+    lines[2] = json.dumps(bad)
+    lines[5] = '{"study_hours_daily": {"hours": 3}}'
+    lines[7] = 'not json'
+
+    results = _score(predictor, bulk_scoring.read_ndjson_chunks(io.BytesIO('\n'.join(lines).encode())))
+
+    assert results[2]['error'] == "Invalid value for gender: ['x']"
+    assert results[5]['error'] == "Invalid value for study_hours_daily: {'hours': 3}"
+    assert results[7]['error'] == 'Line is not a JSON object'
+    bad_rows = {2, 5, 7}
+    assert [result for i, result in enumerate(results) if i not in bad_rows] == \
+        [result for i, result in enumerate(expected) if i not in bad_rows]
+
+
+def test_non_numeric_value_names_its_column(predictor, dataset):
+    frame = dataset.astype({'attendance_rate': object})
+    frame.loc[1, 'attendance_rate'] = 'often'
+
+    results = _score(predictor, bulk_scoring.read_csv_chunks(io.BytesIO(_csv(frame))))
+
+    assert results[1] == {'row': 1, 'student_id': None, 'success': False,
+                          'error': "Invalid value for attendance_rate: 'often'"}
+    assert all(result['success'] for i, result in enumerate(results) if i != 1)
+
+
+def test_stream_endpoint_reports_bad_rows_and_keeps_going(predictor, dataset, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, 'predictor', predictor)
+    monkeypatch.setattr(app, 'STREAM_CHUNK_SIZE', 4)
+    lines = _ndjson(dataset)
+    lines[1] = '{"gender": {"x": 1}}'
+    client = app.app.test_client()
+
+    response = client.post('/api/stream-predict?format=csv', data='\n'.join(lines),
+                           content_type='application/x-ndjson')
+
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert response.status_code == 200
+    assert len(rows) == len(dataset)
+    assert rows[1] == {**dict.fromkeys(bulk_scoring.RESULT_FIELDS, ''), 'row': '1', 'success': 'False',
+                       'error': "Invalid value for gender: {'x': 1}"}
+    assert all(row['success'] == 'True' for i, row in enumerate(rows) if i != 1)
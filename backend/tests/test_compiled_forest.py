@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from ml.benchmark import generate_students
+from ml.compiled_forest import CompiledForest, parity_probe
+from ml.feature_schema import FeatureSchema
+
+# Largest differences allowed between the compiled forest and the libraries' own predictions
+REGRESSION_ATOL = 1e-3
+PROBABILITY_ATOL = 1e-5
+
+
+@pytest.fixture(scope='module')
+def forest(trained):
+    return CompiledForest.from_models(trained.regression_models, trained.classification_models)
+
+
+@pytest.fixture(scope='module')
+def rows(trained, forest):
+    """Generated students plus rows sitting exactly on, and just below, every split threshold"""
+    schema = FeatureSchema(trained.feature_columns, trained.encoders)
+    students, _ = schema.transform_batch(generate_students(300, seed=21))
+    return np.vstack([students, parity_probe(forest, len(trained.feature_columns), n_rows=512, seed=5)])
+
+
+def test_regression_matches_native_models(trained, forest, rows):
+    regression, _ = forest.predict(rows)
+    for i, (name, model) in enumerate(trained.regression_models.items()):
+        np.testing.assert_allclose(regression[:, i], model.predict(rows), atol=REGRESSION_ATOL, err_msg=name)
+
+
+def test_probabilities_match_native_models(trained, forest, rows):
+    _, probas = forest.predict(rows)
+    for i, (name, model) in enumerate(trained.classification_models.items()):
+        np.testing.assert_allclose(probas[i], model.predict_proba(rows), atol=PROBABILITY_ATOL, err_msg=name)
+
+
+def test_saved_forest_loads_identically(forest, rows, tmp_path):
+    forest.save(str(tmp_path))
+    loaded = CompiledForest.load(str(tmp_path))
+    for expected, actual in zip(forest.predict(rows), loaded.predict(rows)):
+        np.testing.assert_array_equal(expected, actual)
+    for expected, actual in zip(forest.regression_contributions(rows), loaded.regression_contributions(rows)):
+        np.testing.assert_array_equal(expected, actual)
+    # Node-sized arrays, attribution ones included, are views of the files rather than per-process copies
+    assert isinstance(loaded.children, np.memmap) and isinstance(loaded.child_delta, np.memmap)
+
+
+def test_contributions_add_up_to_each_regressor(forest, rows):
+    contributions, expected = forest.regression_contributions(rows)
+    regression, _ = forest.predict(rows)
+    np.testing.assert_allclose(contributions.sum(axis=2) + expected[:, None], regression.T, atol=1e-3)
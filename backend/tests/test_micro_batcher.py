@@ -0,0 +1,60 @@
+import pytest
+
+from ml.benchmark import generate_students
+from ml.micro_batcher import MicroBatcher
+
+
+class Recorder:
+    """Batch function doubling numbers, failing the whole batch when it holds a string"""
+
+    def __init__(self):
+        self.batches = []
+
+    def run_batch(self, items):
+        self.batches.append(list(items))
+        if any(isinstance(item, str) for item in items):
+            raise ValueError('batch contains a bad item')
+        return [item * 2 for item in items]
+
+    def run_single(self, item):
+        if isinstance(item, str):
+            raise ValueError(f'bad item {item}')
+        return item * 2
+
+
+def test_concurrent_items_are_coalesced_up_to_the_batch_size():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder.run_batch, recorder.run_single, max_batch_size=4, max_wait_ms=500)
+
+    futures = [batcher.submit(i) for i in range(10)]
+
+    assert [future.result(timeout=5) for future in futures] == [i * 2 for i in range(10)]
+    assert [len(batch) for batch in recorder.batches] == [4, 4, 2]
+    stats = batcher.stats()
+    assert (stats['batches'], stats['items'], stats['largest_batch'], stats['fallbacks']) == (3, 10, 4, 0)
+
+
+def test_failed_batch_delivers_each_items_own_outcome():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder.run_batch, recorder.run_single, max_batch_size=8, max_wait_ms=500)
+
+    futures = [batcher.submit(item) for item in [1, 'x', 3]]
+
+    assert futures[0].result(timeout=5) == 2
+    with pytest.raises(ValueError, match='bad item x'):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) == 6
+    assert batcher.stats()['fallbacks'] == 1
+
+
+def test_coalesced_predictions_match_single_predictions(predictor, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, 'predictor', predictor)
+    students = generate_students(6, seed=41)
+    batcher = MicroBatcher(app._predict_micro_batch, predictor.predict, max_batch_size=16, max_wait_ms=500)
+
+    futures = [batcher.submit(student) for student in students]
+
+    assert [future.result(timeout=30) for future in futures] == [predictor.predict(s) for s in students]
+    assert batcher.stats()['batches'] == 1
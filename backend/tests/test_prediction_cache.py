@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from ml.benchmark import generate_students
+from ml.prediction_cache import PredictionCache
+from ml.predictor import EnsemblePredictor
+
+
+class ShiftedRegressor:
+    """A retrained stand-in: the same model scoring a fixed number of points higher"""
+
+    def __init__(self, model, shift):
+        self.model = model
+        self.shift = shift
+
+    def predict(self, X):
+        return self.model.predict(X) + self.shift
+
+
+def _predictor(trained, shift=0.0):
+    regression_models = {name: ShiftedRegressor(model, shift) for name, model in trained.regression_models.items()}
+    return EnsemblePredictor(regression_models=regression_models, classification_models=trained.classification_models,
+                             feature_columns=trained.feature_columns, encoders=trained.encoders, explain=False)
+
+
+def test_keys_fold_equivalent_rows():
+    cache = PredictionCache(decimals=4)
+    keys = cache.keys_for(np.array([[0.0, 1.00001], [-0.0, 1.0], [0.0, 1.001]]))
+    assert keys[0] == keys[1] != keys[2]
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_size=2)
+    cache.put_many([b'a', b'b'], [1, 2])
+    cache.get_many([b'a'])
+    cache.put_many([b'c'], [3])
+    assert cache.get_many([b'a', b'b', b'c']) == [1, None, 3]
+    assert cache.stats()['evictions'] == 1
+
+
+def test_expired_entries_miss(monkeypatch):
+    cache = PredictionCache(ttl_seconds=10)
+    now = [100.0]
+    monkeypatch.setattr('ml.prediction_cache.time.monotonic', lambda: now[0])
+    cache.put_many([b'a'], [1])
+    now[0] = 109.0
+    assert cache.get_many([b'a']) == [1]
+    now[0] = 111.0
+    assert cache.get_many([b'a']) == [None]
+    assert cache.stats()['size'] == 0
+
+
+def test_cached_predictions_equal_uncached(trained):
+    cached = _predictor(trained)
+    uncached = _predictor(trained)
+    uncached.cache = None
+    students = generate_students(4, seed=31)
+
+    first = [cached.predict(student) for student in students]
+    second = [cached.predict(student) for student in students]
+
+    assert first == second == [uncached.predict(student) for student in students]
+    stats = cached.cache.stats()
+    assert (stats['misses'], stats['hits']) == (4, 4)
+
+
+def test_new_model_version_is_not_served_from_the_old_cache(trained, monkeypatch):
+    import app
+
+    student = generate_students(1, seed=37)[0]
+    old, new = _predictor(trained), _predictor(trained, shift=5.0)
+    monkeypatch.setattr(app, 'predictor', old)
+    monkeypatch.setattr(app, 'micro_batcher', None)
+    client = app.app.test_client()
+
+    before = client.post('/api/predict', json=student).json['predictions']['final_score']
+    assert client.post('/api/predict', json=student).json['predictions']['final_score'] == before
+    assert old.cache.stats()['size'] == 1
+
+    app._swap_predictor(new, 'v2')
+    after = client.post('/api/predict', json=student).json['predictions']['final_score']
+
+    assert after == pytest.approx(before + 5.0, abs=0.1)
+    assert old.cache.stats()['size'] == 0
@@ -0,0 +1,61 @@
+import io
+import logging
+import threading
+import time
+
+import pytest
+
+from ml import request_logging
+from ml.request_logging import ProcessLocalQueueHandler
+
+
+@pytest.fixture
+def registered(monkeypatch):
+    calls = []
+    monkeypatch.setattr(request_logging.atexit, 'register', calls.append)
+    return calls
+
+
+def _record(i: int) -> logging.LogRecord:
+    return logging.makeLogRecord({'msg': 'record %d', 'args': (i,), 'levelno': logging.INFO})
+
+
+def test_concurrent_first_records_start_one_listener(registered, monkeypatch):
+    # A slow listener start holds the window open, so every thread arrives while the first is starting it
+    start = logging.handlers.QueueListener.start
+    monkeypatch.setattr(logging.handlers.QueueListener, 'start', lambda listener: (time.sleep(0.05), start(listener)))
+    stream = io.StringIO()
+    handler = ProcessLocalQueueHandler(logging.StreamHandler(stream))
+    listeners = set()
+    barrier = threading.Barrier(16)
+
+    def emit(i):
+        barrier.wait()
+        # emit() directly: handle() would serialize the threads behind the handler's own lock
+        handler.emit(_record(i))
+        listeners.add(id(handler._listener))
+
+    threads = [threading.Thread(target=emit, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    handler.stop()
+
+    assert len(listeners) == 1
+    assert registered == [handler.stop]
+    assert sorted(stream.getvalue().splitlines()) == sorted(f'record {i}' for i in range(16))
+
+
+def test_restart_after_fork_registers_exit_hook_once(registered):
+    stream = io.StringIO()
+    handler = ProcessLocalQueueHandler(logging.StreamHandler(stream))
+    handler.emit(_record(0))
+    # What a forked worker sees: a listener started under another PID
+    handler._listener.stop()
+    handler._pid = -1
+    handler.emit(_record(1))
+    handler.stop()
+
+    assert registered == [handler.stop]
+    assert stream.getvalue().splitlines() == ['record 0', 'record 1']
@@ -0,0 +1,63 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ml import retraining
+from ml.retraining import RetrainManager
+
+
+def _manager(root):
+    manager = RetrainManager(load_predictor=lambda model_dir: None, on_swap=lambda predictor, version: None,
+                             models_root=str(root))
+    # Threads instead of a spawned process, so the stand-in training function below is the one that runs
+    manager._executor = ThreadPoolExecutor(max_workers=1)
+    return manager
+
+
+def _finish(manager):
+    manager._executor.shutdown(wait=True)
+    manager._executor = ThreadPoolExecutor(max_workers=1)
+
+
+@pytest.mark.skipif(retraining.fcntl is None, reason='needs fcntl')
+def test_one_retrain_across_managers(tmp_path, monkeypatch):
+    release = threading.Event()
+
+    def train(data_path, models_root, version):
+        release.wait(5)
+        raise RuntimeError('stopped')
+
+    monkeypatch.setattr(retraining, 'train_model_version', train)
+    first, second = _manager(tmp_path), _manager(tmp_path)
+
+    first.submit('data.csv')
+    # A second manager stands in for another server process: it only shares the models root
+    with pytest.raises(RuntimeError, match=f'process {os.getpid()}'):
+        second.submit('data.csv')
+    assert second.list_jobs() == []
+
+    release.set()
+    _finish(first)
+    job = second.submit('data.csv')
+    _finish(second)
+    assert second.status(job['job_id'])['status'] == 'failed'
+
+
+def test_failed_retrain_removes_its_version(tmp_path, monkeypatch):
+    def train(data_path, models_root, version):
+        model_dir = retraining.ModelStore(models_root).version_dir(version)
+        os.makedirs(model_dir)
+        open(os.path.join(model_dir, 'xgboost_regressor.ubj'), 'w').close()
+        raise MemoryError('out of memory')
+
+    monkeypatch.setattr(retraining, 'train_model_version', train)
+    manager = _manager(tmp_path)
+
+    job = manager.submit('data.csv')
+    _finish(manager)
+
+    status = manager.status(job['job_id'])
+    assert status['status'] == 'failed' and status['error'] == 'out of memory'
+    assert not os.path.exists(manager.store.version_dir(job['model_version']))
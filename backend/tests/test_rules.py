@@ -0,0 +1,102 @@
+import pytest
+
+from ml.rules import INSIGHT_FALLBACKS, SCALAR_ROW_LIMIT, RuleEngine
+
+LEVERAGE = "Leverage strong cognitive abilities to achieve higher academic performance"
+PROCESSING = "Use your strong cognitive processing to master complex subjects quickly"
+CHANNEL = "Channel high motivation into better time management for maximum impact"
+
+# (student, predicted score, level, expected insights, expected recommendations as (title, current_value) in order)
+CASES = [
+    # Every field missing: the documented defaults apply
+    ({}, 70.0, 'Medium',
+     {'strengths': ["Above average cognitive ability (100) - good academic foundation"],
+      'weaknesses': [INSIGHT_FALLBACKS['weaknesses']],
+      'opportunities': [LEVERAGE, CHANNEL]},
+     [('Develop Metacognition', '6/10'), ('Improve Time Management', '6/10'), ('Increase Study Time', '4.5 hours'),
+      ('Master Key Concepts', 'Score: 70.0'), ('Improve Working Memory', '6/10'),
+      ('Increase Processing Speed', '6/10'), ('Enhance Learning Adaptability', '6/10'),
+      ('Seek Faculty Support', '6/10')]),
+
+    # Exactly on every threshold: '>=' rules fire, '<' and '>' rules do not
+    ({'cognitiveAbility': 110, 'workingMemory': 8, 'processingSpeed': 8, 'motivationLevel': 8, 'timeManagement': 8,
+      'focusConcentration': 8, 'sleepQuality': 8, 'metacognitionSkills': 7, 'learningAdaptability': 7,
+      'procrastinationTendency': 6, 'academicAnxiety': 6, 'facultySupport': 7, 'learningEnvironmentQuality': 7,
+      'studyHoursDaily': 9}, 85.0, 'High',
+     {'strengths': ["Exceptional cognitive ability (110) - strong learning potential",
+                    "Strong working memory (8/10) - excellent information retention",
+                    "Fast processing speed (8/10) - quick learning adaptation",
+                    "High motivation level (8/10) - strong drive for success",
+                    "Excellent time management (8/10) - efficient study habits",
+                    "Strong focus and concentration (8/10) - effective learning sessions",
+                    "Good sleep quality (8/10) - supports cognitive performance"],
+      'weaknesses': [INSIGHT_FALLBACKS['weaknesses']],
+      'opportunities': [PROCESSING]},
+     [('Maintain Current Habits', 'Score: 85.0')]),
+
+    # On the lower thresholds: the elif branch of a group, and '>' rules one step past their limit
+    ({'cognitiveAbility': 90, 'workingMemory': 7, 'processingSpeed': 7, 'motivationLevel': 6, 'timeManagement': 6,
+      'focusConcentration': 6, 'sleepQuality': 6, 'metacognitionSkills': 6, 'learningAdaptability': 6,
+      'procrastinationTendency': 7, 'academicAnxiety': 7, 'facultySupport': 6, 'learningEnvironmentQuality': 6,
+      'studyHoursDaily': 5}, 60.0, 'Low',
+     {'strengths': ["Good working memory (7/10) - effective learning capacity"],
+      'weaknesses': [INSIGHT_FALLBACKS['weaknesses']],
+      'opportunities': [PROCESSING]},
+     [('Develop Metacognition', '6/10'), ('Improve Time Management', '6/10'), ('Reduce Procrastination', '7/10'),
+      ('Manage Academic Anxiety', '7/10'), ('Enhance Learning Adaptability', '6/10'),
+      ('Improve Sleep Quality', '6/10'), ('Enhance Focus', '6/10'), ('Seek Faculty Support', '6/10'),
+      ('Optimize Learning Space', '6/10')]),
+
+    # Just below the thresholds, with half the fields missing and fractional values
+    ({'cognitiveAbility': 89, 'workingMemory': 5, 'processingSpeed': 5, 'motivationLevel': 5, 'timeManagement': 5,
+      'focusConcentration': 5, 'sleepQuality': 5, 'studyHoursDaily': 9.5}, 59.9, 'Low',
+     {'strengths': [INSIGHT_FALLBACKS['strengths']],
+      'weaknesses': ["Below average cognitive ability (89) - may need learning support",
+                     "Weak working memory (5/10) - affects information retention",
+                     "Slow processing speed (5/10) - may need more time for complex tasks",
+                     "Low motivation (5/10) - affects learning engagement",
+                     "Poor time management (5/10) - inefficient study planning",
+                     "Weak focus (5/10) - reduced learning efficiency",
+                     "Poor sleep quality (5/10) - impacts cognitive function"],
+      'opportunities': [INSIGHT_FALLBACKS['opportunities']]},
+     [('Develop Metacognition', '6/10'), ('Improve Time Management', '5/10'), ('Build Strong Foundation', 'Score: 59.9'),
+      ('Enhance Cognitive Skills', '89'), ('Improve Working Memory', '5/10'), ('Increase Processing Speed', '5/10'),
+      ('Enhance Learning Adaptability', '6/10'), ('Improve Sleep Quality', '5/10'), ('Enhance Focus', '5/10'),
+      ('Seek Faculty Support', '6/10'), ('Optimize Study Methods', '9.5 hours')]),
+
+    # Score exactly on a level rule's limit, remaining fields missing
+    ({'cognitiveAbility': 100, 'workingMemory': 7, 'processingSpeed': 7, 'timeManagement': 7,
+      'metacognitionSkills': 7, 'learningAdaptability': 7, 'facultySupport': 7, 'studyHoursDaily': 5},
+     75.0, 'Medium',
+     {'strengths': ["Above average cognitive ability (100) - good academic foundation",
+                    "Good working memory (7/10) - effective learning capacity"],
+      'weaknesses': [INSIGHT_FALLBACKS['weaknesses']],
+      'opportunities': [LEVERAGE, PROCESSING]},
+     [('Maintain Current Habits', 'Score: 75.0')]),
+]
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return RuleEngine()
+
+
+def _evaluate(engine, copies):
+    cases = CASES * copies
+    return engine.evaluate([case[0] for case in cases], [case[1] for case in cases], [case[2] for case in cases])
+
+
+@pytest.mark.parametrize('copies', [1, SCALAR_ROW_LIMIT // len(CASES) + 1], ids=['scalar', 'vectorized'])
+def test_rules_match_expected_output(engine, copies):
+    assert (len(CASES) * copies > SCALAR_ROW_LIMIT) == (copies > 1)
+    insights, recommendations = _evaluate(engine, copies)
+    for i, (_, _, _, expected_insights, expected_recommendations) in enumerate(CASES * copies):
+        assert insights[i] == expected_insights, i
+        assert [(rec['title'], rec['current_value']) for rec in recommendations[i]] == expected_recommendations, i
+
+
+def test_scalar_and_vectorized_paths_agree(engine):
+    scalar = _evaluate(engine, 1)
+    vectorized = _evaluate(engine, SCALAR_ROW_LIMIT // len(CASES) + 1)
+    for path in (0, 1):
+        assert vectorized[path][:len(CASES)] == scalar[path]
@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+import pytest
+
+from ml import serialization
+from ml.serialization import dumps
+
+PAYLOAD = {
+    'success': True,
+    'score': np.float64(81.25),
+    'count': np.int64(3),
+    'passed': np.bool_(True),
+    'scores': np.array([70.5, 81.25, 92.0]),
+    'indices': np.array([0, 2], dtype=np.int32),
+    'nested': [{'level': 'High', 'confidence': np.float64(0.75)}],
+    1: 'integer key',
+}
+
+EXPECTED = {
+    'success': True,
+    'score': 81.25,
+    'count': 3,
+    'passed': True,
+    'scores': [70.5, 81.25, 92.0],
+    'indices': [0, 2],
+    'nested': [{'level': 'High', 'confidence': 0.75}],
+    '1': 'integer key',
+}
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def backend(request, monkeypatch):
+    if request.param == 'stdlib':
+        monkeypatch.setattr(serialization, 'orjson', None)
+    else:
+        assert serialization.orjson is not None
+    return request.param
+
+
+def test_numpy_payload_serializes_to_plain_json(backend):
+    body = dumps(PAYLOAD)
+    assert isinstance(body, bytes)
+    assert json.loads(body) == EXPECTED
+
+
+def test_float32_values_round_trip(backend):
+    values = np.array([0.1, 2.5], dtype=np.float32)
+    assert json.loads(dumps({'values': values, 'first': values[0]})) == {
+        'values': pytest.approx([0.1, 2.5]), 'first': pytest.approx(0.1)}
+
+
+def test_unknown_objects_raise_type_error(backend):
+    with pytest.raises(TypeError):
+        dumps({'value': object()})
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from ml.benchmark import generate_students
+from ml.predictor import EnsemblePredictor
+
+
+class FailingClassifier:
+    def predict_proba(self, X):
+        raise RuntimeError('model unavailable')
+
+
+def _predictor(trained, classification_models=None, **options):
+    return EnsemblePredictor(regression_models=trained.regression_models,
+                             classification_models=classification_models or trained.classification_models,
+                             feature_columns=trained.feature_columns, encoders=trained.encoders,
+                             cache_size=0, explain=False, **options)
+
+
+@pytest.fixture(scope='module')
+def X(predictor):
+    X, invalid = predictor.preprocess_batch(generate_students(300, seed=23))
+    assert not invalid.any()
+    return X
+
+
+@pytest.fixture(scope='module')
+def native(trained, X):
+    """Each classifier's own class and probabilities, as predict() used to call them"""
+    models = trained.classification_models
+    return (np.stack([model.predict(X).astype(int).ravel() for model in models.values()]),
+            np.stack([model.predict_proba(X) for model in models.values()]))
+
+
+def _levels(trained, classes):
+    return [str(level) for level in trained.encoders['performance_level'].inverse_transform(classes)]
+
+
+def test_hard_voting_matches_previous_majority_vote(trained, X, native):
+    classes, probas = native
+    assert (classes[0] != classes[1]).any()  # Ties have to be exercised
+    # The replaced predict(): majority over each model's predicted class, ties to the lowest class
+    majority = [max(set(row), key=list(row).count) for row in classes.T.tolist()]
+
+    scores = _predictor(trained, voting='hard').score_matrix(X)
+
+    assert scores['performance_levels'] == _levels(trained, majority)
+    np.testing.assert_allclose(scores['confidences'], probas.mean(axis=0).max(axis=1))
+
+
+def test_soft_voting_takes_the_averaged_probabilities(trained, X, native):
+    _, probas = native
+    scores = _predictor(trained, voting='soft').score_matrix(X)
+
+    assert scores['performance_levels'] == _levels(trained, probas.mean(axis=0).argmax(axis=1))
+    np.testing.assert_allclose(scores['class_probabilities'], probas.mean(axis=0))
+
+
+@pytest.mark.parametrize('voting', ['soft', 'hard'])
+def test_zero_weight_leaves_the_other_model_deciding(trained, X, native, voting):
+    classes, probas = native
+    names = list(trained.classification_models)
+    scores = _predictor(trained, voting=voting, classifier_weights={names[0]: 0.0}).score_matrix(X)
+
+    assert scores['performance_levels'] == _levels(trained, classes[1])
+    np.testing.assert_allclose(scores['confidences'], probas[1].max(axis=1))
+
+
+def test_failing_classifier_drops_out_of_the_vote(trained, X, native):
+    classes, probas = native
+    names = list(trained.classification_models)
+    models = {names[0]: FailingClassifier(), names[1]: trained.classification_models[names[1]]}
+    scores = _predictor(trained, classification_models=models).score_matrix(X)
+
+    assert scores['performance_levels'] == _levels(trained, classes[1])
+    np.testing.assert_allclose(scores['class_probabilities'], probas[1])
@@ -0,0 +1,41 @@
+from decimal import Decimal
+
+import pytest
+
+from ml.benchmark import generate_students
+
+SWEEPS = {
+    'studyHoursDaily': [0.5 * i for i in range(1, 21)],
+    'attendanceRate': [50 + 2.5 * i for i in range(21)],
+    'motivationLevel': list(range(1, 11)),
+    'gender': ['Male', 'Female'],
+}
+
+
+@pytest.fixture(scope='module')
+def students():
+    return generate_students(5, seed=29)
+
+
+def test_changes_are_exact_differences_of_rounded_scores(predictor, students):
+    for student in students:
+        result = predictor.what_if(student, SWEEPS)
+        baseline = Decimal(str(result['baseline']['final_score']))
+        for field, curve in result['curves'].items():
+            for score, change in zip(curve['final_score'], curve['score_change']):
+                assert Decimal(str(float(score))) - baseline == Decimal(str(float(change))), field
+
+
+def test_baseline_and_grid_match_single_predictions(predictor, students):
+    student = students[0]
+    result = predictor.what_if(student, SWEEPS)
+    prediction = predictor.predict(student)['predictions']
+
+    assert result['baseline'] == {key: prediction[key] for key in ('final_score', 'performance_level', 'confidence')}
+    assert result['grid_size'] == 1 + sum(len(values) for values in SWEEPS.values())
+    for field in ('studyHoursDaily', 'gender'):
+        curve = result['curves'][field]
+        for i, value in enumerate(SWEEPS[field]):
+            expected = predictor.predict(dict(student, **{field: value}))['predictions']
+            assert float(curve['final_score'][i]) == expected['final_score']
+            assert curve['performance_level'][i] == expected['performance_level']
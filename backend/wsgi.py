@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+EduPredict production WSGI entrypoint
+Serve with: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, initialize_app
+
+# Models load once here; with preload_app the workers fork from this process and share its pages.
+# Production never trains at startup unless explicitly asked to.
+initialize_app(allow_training=os.environ.get('TRAIN_ON_STARTUP', 'false').lower() == 'true')
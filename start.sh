@@ -1,4 +1,4 @@
 #!/bin/bash
 echo "Starting EduPredict Backend..."
 cd backend
-python run.py
\ No newline at end of file
+exec gunicorn -c gunicorn.conf.py wsgi:app
\ No newline at end of file